@@ -0,0 +1,95 @@
+"""
+Bank account resolution (account number + bank code -> account name),
+memoized so vendor onboarding resolves an account once: the account
+field check, the registration or settings form and any retry all ask
+about the same (bank_code, account_number).
+
+Paystack's answers are cached, names for RESOLVED_TTL and "could not
+resolve" for UNRESOLVED_TTL (a typo fixed a minute later should not
+stay rejected). Not reaching Paystack is not an answer and is never
+cached. Concurrent lookups of one account share a single upstream call.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+RESOLVER_CACHE_SIZE = 4096
+RESOLVED_TTL = 24 * 3600
+UNRESOLVED_TTL = 120
+
+
+class _Lookup:
+    def __init__(self):
+        self.done = threading.Event()
+        self.outcome = None
+        self.error = None
+
+
+class AccountResolver:
+    """
+    `fetch(account_number, bank_code)` returns (True, account_name) or
+    (False, message) from Paystack, or raises when it cannot tell.
+    """
+
+    def __init__(self, fetch, size=RESOLVER_CACHE_SIZE, resolved_ttl=RESOLVED_TTL,
+                 unresolved_ttl=UNRESOLVED_TTL):
+        self.fetch = fetch
+        self.size = size
+        self.resolved_ttl = resolved_ttl
+        self.unresolved_ttl = unresolved_ttl
+
+        self._entries = OrderedDict()  # key -> (expires_at, outcome)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = self.fetches = self.coalesced = 0
+
+    def resolve(self, account_number, bank_code):
+        key = (bank_code, account_number)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            lookup = self._inflight.get(key)
+            if lookup is None:
+                lookup = self._inflight[key] = _Lookup()
+                self.fetches += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            lookup.done.wait()
+            if lookup.error is not None:
+                raise lookup.error
+            return lookup.outcome
+
+        try:
+            lookup.outcome = self.fetch(account_number, bank_code)
+        except Exception as e:
+            lookup.error = e
+            raise
+        else:
+            ttl = self.resolved_ttl if lookup.outcome[0] else self.unresolved_ttl
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, lookup.outcome)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+            return lookup.outcome
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            lookup.done.set()
+
+    def forget(self, account_number, bank_code):
+        with self._lock:
+            self._entries.pop((bank_code, account_number), None)
+
+    def stats(self):
+        with self._lock:
+            return {"cached": len(self._entries), "hits": self.hits,
+                    "fetches": self.fetches, "coalesced": self.coalesced}
@@ -0,0 +1,621 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import combinations
+
+from sqlalchemy import delete, func, or_, select, text, tuple_
+from sqlalchemy.dialects.sqlite import insert
+
+from models import (
+    db, User, Order, OrderItem, Food, FoodCategory, Rating, Payment,
+    RevenueRollup, FoodOrderCount, FoodPairCount
+)
+
+# An order counts towards revenue from the moment it is paid, including
+# after the vendor moves it on through the delivery lifecycle.
+PAID_STATUSES = ("paid", "accepted", "ready", "delivered")
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# =========================
+# REVENUE ROLLUPS
+# =========================
+
+def rollup_buckets(day):
+    """(granularity, bucket) keys a paid order on `day` contributes to."""
+    week_start = day - timedelta(days=day.weekday())
+    return [
+        ("day", day.strftime("%Y-%m-%d")),
+        ("week", week_start.strftime("%Y-%m-%d")),
+        ("month", day.strftime("%Y-%m")),
+        ("year", day.strftime("%Y")),
+    ]
+
+
+def _bump_rollup(granularity, bucket, revenue, order_count):
+    row = db.session.get(RevenueRollup, (granularity, bucket))
+    if row is None:
+        row = RevenueRollup(granularity=granularity, bucket=bucket,
+                            revenue=0, order_count=0)
+        db.session.add(row)
+    row.revenue += revenue
+    row.order_count += order_count
+
+
+def record_paid_order(order, sign=1):
+    """
+    Adds a freshly paid order to the revenue rollups and the food combo
+    index; sign=-1 takes an order that stopped counting back out. Runs
+    inside the caller's transaction so both commit together with the
+    order.
+    """
+    day = (order.order_date or datetime.now()).date()
+    for granularity, bucket in rollup_buckets(day):
+        _bump_rollup(granularity, bucket, sign * (order.total_amount or 0), sign)
+
+    # items whose food was deleted are not counted, as in rebuild_food_combos()
+    food_names = {item.food.name for item in order.items if item.food}
+    record_food_combos(day, food_names, sign)
+
+
+def record_order_status(order, old_status):
+    """
+    Adds `order` to the rollups when a status change takes it into
+    PAID_STATUSES, and takes it back out when one takes it out (an
+    admin cancelling a paid order, say). The payment worker records the
+    pending -> paid move itself.
+    """
+    was_paid, is_paid = old_status in PAID_STATUSES, order.status in PAID_STATUSES
+    if was_paid != is_paid:
+        record_paid_order(order, 1 if is_paid else -1)
+
+
+def rebuild_revenue_rollups():
+    """
+    Recomputes every rollup row from the orders table: one GROUP BY per
+    day, with weeks, months and years derived from the daily rows.
+    """
+    RevenueRollup.query.delete()
+
+    rows = db.session.query(
+        func.strftime("%Y-%m-%d", Order.order_date).label("period"),
+        func.sum(Order.total_amount),
+        func.count(Order.id)
+    ).filter(
+        Order.status.in_(PAID_STATUSES)
+    ).group_by("period").all()
+
+    totals = {}
+    for period, revenue, order_count in rows:
+        day = datetime.strptime(period, "%Y-%m-%d").date()
+        for key in rollup_buckets(day):
+            current = totals.get(key, (0, 0))
+            totals[key] = (current[0] + (revenue or 0), current[1] + order_count)
+
+    db.session.add_all(
+        RevenueRollup(granularity=g, bucket=b, revenue=r, order_count=c)
+        for (g, b), (r, c) in totals.items()
+    )
+    db.session.commit()
+
+    return len(rows)
+
+
+def _rollup_map(granularity, since=None):
+    query = db.session.query(
+        RevenueRollup.bucket, RevenueRollup.revenue
+    ).filter(RevenueRollup.granularity == granularity)
+
+    if since:
+        query = query.filter(RevenueRollup.bucket >= since)
+
+    return dict(query.all())
+
+# =========================
+# FOOD COMBO INDEX
+# =========================
+
+def _combo_rows(day, food_names, count=1):
+    """Per-food and per-pair count rows for one order, in both buckets."""
+    names = sorted(food_names)
+    food_rows, pair_rows = [], []
+    for bucket in ("all", day.strftime("%Y-%m-%d")):
+        food_rows += [{"bucket": bucket, "food_name": f, "count": count} for f in names]
+        pair_rows += [{"bucket": bucket, "food_a": a, "food_b": b, "count": count}
+                      for a, b in combinations(names, 2)]
+    return food_rows, pair_rows
+
+
+def upsert_counts(model, rows):
+    """
+    Inserts count rows, adding to `count` where the primary key already
+    exists. Rows a negative count brings down to zero are deleted, as a
+    rebuild would not have them.
+    """
+    if not rows:
+        return
+    stmt = insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.name for c in model.__table__.primary_key],
+        set_={"count": model.count + stmt.excluded["count"]}
+    )
+    db.session.execute(stmt, rows)
+
+    if any(row["count"] < 0 for row in rows):
+        key = [c.name for c in model.__table__.primary_key]
+        db.session.execute(
+            delete(model).where(
+                model.count <= 0,
+                tuple_(*(getattr(model, k) for k in key)).in_([tuple(row[k] for k in key) for row in rows])
+            )
+        )
+
+
+def record_food_combos(day, food_names, sign=1):
+    """Adds one paid order's distinct food names to the combo index (sign=-1 removes them)."""
+    food_rows, pair_rows = _combo_rows(day, food_names, sign)
+    upsert_counts(FoodOrderCount, food_rows)
+    upsert_counts(FoodPairCount, pair_rows)
+
+
+def rebuild_food_combos():
+    """Recomputes the food combo index from every paid order."""
+    FoodOrderCount.query.delete()
+    FoodPairCount.query.delete()
+
+    rows = db.session.query(
+        OrderItem.order_id,
+        Order.order_date,
+        Food.name
+    ).join(Food).join(Order).filter(
+        Order.status.in_(PAID_STATUSES)
+    ).all()
+
+    orders_foods = {}
+    for order_id, order_date, food_name in rows:
+        day, names = orders_foods.setdefault(order_id, (order_date.date(), set()))
+        names.add(food_name)
+
+    food_totals, pair_totals = {}, {}
+    for day, names in orders_foods.values():
+        food_rows, pair_rows = _combo_rows(day, names)
+        for r in food_rows:
+            key = (r["bucket"], r["food_name"])
+            food_totals[key] = food_totals.get(key, 0) + 1
+        for r in pair_rows:
+            key = (r["bucket"], r["food_a"], r["food_b"])
+            pair_totals[key] = pair_totals.get(key, 0) + 1
+
+    if food_totals:
+        db.session.execute(insert(FoodOrderCount), [
+            {"bucket": b, "food_name": f, "count": c}
+            for (b, f), c in food_totals.items()
+        ])
+    if pair_totals:
+        db.session.execute(insert(FoodPairCount), [
+            {"bucket": b, "food_a": fa, "food_b": fb, "count": c}
+            for (b, fa, fb), c in pair_totals.items()
+        ])
+    db.session.commit()
+
+    return len(orders_foods)
+
+# =========================
+# ANALYTICS HELPERS
+# =========================
+
+def get_daily_revenue(days=7):
+    """Revenue for each of the last `days` days (including today)."""
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+
+    revenue_map = _rollup_map("day", start_date.strftime("%Y-%m-%d"))
+
+    labels, values = [], []
+    for i in range(days):
+        d = start_date + timedelta(days=i)
+        labels.append(d.strftime("%a %d"))
+        values.append(revenue_map.get(d.strftime("%Y-%m-%d"), 0))
+
+    return labels, values
+
+
+def get_weekly_revenue(weeks=4):
+    """Revenue for each of the last `weeks` weeks (Mon–Sun buckets)."""
+    today = datetime.now().date()
+    this_week_start = today - timedelta(days=today.weekday())
+    range_start = this_week_start - timedelta(weeks=weeks - 1)
+
+    revenue_map = _rollup_map("week", range_start.strftime("%Y-%m-%d"))
+
+    labels, values = [], []
+    for i in range(weeks):
+        week_start = range_start + timedelta(weeks=i)
+        labels.append(week_start.strftime("%b %d"))
+        values.append(revenue_map.get(week_start.strftime("%Y-%m-%d"), 0))
+
+    return labels, values
+
+
+def get_monthly_revenue(months=12):
+    """Revenue for each of the last `months` months."""
+    today = datetime.now()
+    year, month = today.year, today.month
+
+    year_months = []
+    for _ in range(months):
+        year_months.append((year, month))
+        month -= 1
+        if month == 0:
+            month = 12
+            year -= 1
+    year_months.reverse()
+
+    first_year, first_month = year_months[0]
+    revenue_map = _rollup_map("month", f"{first_year:04d}-{first_month:02d}")
+
+    labels, values = [], []
+    for (yr, mo) in year_months:
+        key = f"{yr:04d}-{mo:02d}"
+        labels.append(f"{MONTH_NAMES[mo - 1]} {str(yr)[2:]}")
+        values.append(revenue_map.get(key, 0))
+
+    return labels, values
+
+
+def get_yearly_revenue():
+    """Revenue totals grouped by calendar year."""
+    rows = db.session.query(
+        RevenueRollup.bucket, RevenueRollup.revenue
+    ).filter(
+        RevenueRollup.granularity == "year"
+    ).order_by(RevenueRollup.bucket).all()
+
+    if not rows:
+        return [str(datetime.now().year)], [0]
+
+    return [r[0] for r in rows], [r[1] or 0 for r in rows]
+
+
+def get_food_combo_matrix(top_n=8, days=None):
+    """
+    Builds a co-occurrence matrix of the most frequently ordered foods —
+    how often pairs of items show up together in the same order.
+    Reads the food combo index; pass `days` to only count the last
+    `days` days (including today).
+    """
+    if days:
+        today = datetime.now().date()
+        since = (today - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        food_bucket = FoodOrderCount.bucket.between(since, today.strftime("%Y-%m-%d"))
+        pair_bucket = FoodPairCount.bucket.between(since, today.strftime("%Y-%m-%d"))
+    else:
+        food_bucket = FoodOrderCount.bucket == "all"
+        pair_bucket = FoodPairCount.bucket == "all"
+
+    total = func.sum(FoodOrderCount.count)
+    top_foods = [r[0] for r in db.session.query(
+        FoodOrderCount.food_name, total
+    ).filter(food_bucket).group_by(
+        FoodOrderCount.food_name
+    ).order_by(total.desc(), FoodOrderCount.food_name).limit(top_n).all()]
+
+    matrix = {f: {g: 0 for g in top_foods} for f in top_foods}
+
+    if top_foods:
+        pairs = db.session.query(
+            FoodPairCount.food_a, FoodPairCount.food_b, func.sum(FoodPairCount.count)
+        ).filter(
+            pair_bucket,
+            FoodPairCount.food_a.in_(top_foods),
+            FoodPairCount.food_b.in_(top_foods)
+        ).group_by(FoodPairCount.food_a, FoodPairCount.food_b).all()
+
+        for f1, f2, count in pairs:
+            matrix[f1][f2] = count
+            matrix[f2][f1] = count
+
+    combo_matrix = [[matrix[f1][f2] for f2 in top_foods] for f1 in top_foods]
+
+    return top_foods, combo_matrix
+
+
+# =========================
+# ANALYTICS QUERY ENGINE
+# =========================
+
+def get_data_version():
+    """
+    (etag, last_modified) for the analytics data. Both move whenever an
+    order is paid or a vendor is rated; the etag also moves when a
+    status change takes an order in or out of the paid totals, and rolls
+    over daily because the revenue and combo windows end today.
+    """
+    payment_id, paid_at, rating_id, rated_at, paid_orders, paid_revenue = db.session.query(
+        db.session.query(func.max(Payment.id)).scalar_subquery(),
+        db.session.query(func.max(Payment.created_at)).scalar_subquery(),
+        db.session.query(func.max(Rating.id)).scalar_subquery(),
+        db.session.query(func.max(Rating.created_at)).scalar_subquery(),
+        db.session.query(func.sum(RevenueRollup.order_count)).filter(
+            RevenueRollup.granularity == "year").scalar_subquery(),
+        db.session.query(func.sum(RevenueRollup.revenue)).filter(
+            RevenueRollup.granularity == "year").scalar_subquery()
+    ).one()
+
+    etag = (f"{payment_id or 0}-{rating_id or 0}-{paid_orders or 0}-{round(paid_revenue or 0)}"
+            f"-{datetime.now().date():%Y%m%d}")
+    last_modified = max((d for d in (paid_at, rated_at) if d), default=None)
+
+    return etag, last_modified
+
+
+def get_kpis():
+    """Total paid orders, revenue and average order value, from the yearly rollups."""
+    total_orders, total_revenue = db.session.query(
+        func.sum(RevenueRollup.order_count),
+        func.sum(RevenueRollup.revenue)
+    ).filter(RevenueRollup.granularity == "year").one()
+
+    total_orders = total_orders or 0
+    total_revenue = total_revenue or 0
+
+    return {
+        "total_orders": total_orders,
+        "total_revenue": total_revenue,
+        "avg_order_value": (total_revenue / total_orders) if total_orders else 0,
+    }
+
+
+def get_food_popularity(general_limit=10, category=None):
+    """
+    Food order counts for the "General" chart and every FoodCategory,
+    from a single (category, food name, count) grouped pass.
+    Foods are grouped by name so identically-named items sold by
+    different vendors merge into one bar instead of duplicating.
+
+    Returns a list of {"key", "label", "labels", "values"} series,
+    "general" first, then one per category in creation order. Pass
+    `category` to only compute that one series.
+    """
+    query = db.session.query(
+        FoodCategory.name,
+        Food.name,
+        func.count(OrderItem.id)
+    ).select_from(OrderItem).join(
+        Food, OrderItem.food_id == Food.id
+    ).join(
+        FoodCategory, Food.category_id == FoodCategory.id
+    ).join(
+        Order, OrderItem.order_id == Order.id
+    ).filter(
+        Order.status.in_(PAID_STATUSES)
+    )
+
+    if category and category != "general":
+        query = query.filter(FoodCategory.name == category)
+        categories = [category]
+    else:
+        categories = get_category_names()
+
+    rows = query.group_by(FoodCategory.name, Food.name).all()
+
+    general = {}
+    by_category = {name: {} for name in categories}
+    for category_name, food_name, total in rows:
+        general[food_name] = general.get(food_name, 0) + total
+        by_category.setdefault(category_name, {})[food_name] = total
+
+    def series(key, label, counts, limit=None):
+        ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        return {
+            "key": key,
+            "label": label,
+            "labels": [name for name, _ in ranked],
+            "values": [total for _, total in ranked],
+        }
+
+    if category == "general":
+        return [series("general", "General", general, general_limit)]
+    if category:
+        return [series(category, category, by_category[category])]
+
+    return [series("general", "General", general, general_limit)] + [
+        series(name, name, counts) for name, counts in by_category.items()
+    ]
+
+
+def get_category_names():
+    return [c[0] for c in db.session.query(FoodCategory.name).order_by(FoodCategory.id)]
+
+
+def get_vendor_popularity():
+    """
+    Paid order count and average rating per vendor in one grouped pass.
+
+    Returns (popular_vendor, highest_rated_vendor, by_orders, by_rating):
+    the two leaders are rows with business_name, total_orders and
+    avg_rating (or None), the rankings are (labels, values) pairs.
+    """
+    order_counts = db.session.query(
+        Order.vendor_id.label("vendor_id"),
+        func.count(Order.id).label("total_orders")
+    ).filter(
+        Order.status.in_(PAID_STATUSES)
+    ).group_by(Order.vendor_id).subquery()
+
+    ratings = db.session.query(
+        Rating.vendor_id.label("vendor_id"),
+        func.avg(Rating.rating).label("avg_rating")
+    ).group_by(Rating.vendor_id).subquery()
+
+    rows = db.session.query(
+        User.business_name,
+        func.coalesce(order_counts.c.total_orders, 0).label("total_orders"),
+        ratings.c.avg_rating
+    ).outerjoin(
+        order_counts, order_counts.c.vendor_id == User.id
+    ).outerjoin(
+        ratings, ratings.c.vendor_id == User.id
+    ).filter(
+        or_(order_counts.c.vendor_id.isnot(None), ratings.c.vendor_id.isnot(None))
+    ).all()
+
+    ordered = sorted((r for r in rows if r.total_orders), key=lambda r: -r.total_orders)
+    rated = sorted((r for r in rows if r.avg_rating is not None), key=lambda r: -r.avg_rating)
+
+    return (
+        ordered[0] if ordered else None,
+        rated[0] if rated else None,
+        ([r.business_name for r in ordered], [r.total_orders for r in ordered]),
+        ([r.business_name for r in rated], [round(r.avg_rating, 1) for r in rated]),
+    )
+
+
+# =========================
+# QUERY PLAN CHECK
+# =========================
+
+ORDER_INDEXES = ("ix_orders_status_order_date", "ix_orders_vendor_id_status")
+
+def _analytics_order_queries():
+    """Representative statements for the filters the analytics code runs on orders."""
+    since = datetime.combine(datetime.now().date() - timedelta(days=27), datetime.min.time())
+    return {
+        "paid orders since a date": select(
+            Order.order_date, Order.total_amount
+        ).where(
+            Order.status.in_(PAID_STATUSES), Order.order_date >= since
+        ),
+        "paid revenue per day (rollup backfill)": select(
+            func.strftime("%Y-%m-%d", Order.order_date).label("period"),
+            func.sum(Order.total_amount),
+            func.count(Order.id)
+        ).where(
+            Order.status.in_(PAID_STATUSES)
+        ).group_by("period"),
+        "paid orders per vendor": select(
+            Order.vendor_id, func.count(Order.id)
+        ).where(
+            Order.status.in_(PAID_STATUSES)
+        ).group_by(Order.vendor_id),
+        "one vendor's paid orders": select(
+            Order.id
+        ).where(
+            Order.vendor_id == 1, Order.status.in_(PAID_STATUSES)
+        ),
+    }
+
+
+def explain_analytics_queries():
+    """
+    EXPLAIN QUERY PLAN for each analytics filter on orders, with the
+    table forced to a full scan (before) and as the planner picks it
+    (after). Returns (name, before, after, uses_index) tuples.
+    """
+    results = []
+    for name, stmt in _analytics_order_queries().items():
+        sql = str(stmt.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        before_sql = sql.replace("FROM orders", "FROM orders NOT INDEXED")
+
+        before = [r[-1] for r in db.session.execute(text("EXPLAIN QUERY PLAN " + before_sql))]
+        after = [r[-1] for r in db.session.execute(text("EXPLAIN QUERY PLAN " + sql))]
+        uses_index = any(ix in line for line in after for ix in ORDER_INDEXES)
+
+        results.append((name, before, after, uses_index))
+
+    return results
+
+# =========================
+# ANALYTICS SNAPSHOTS
+# =========================
+
+class AnalyticsSnapshotter:
+    """
+    Keeps the latest precomputed analytics payload and serves it
+    instantly (stale-while-revalidate). A single background thread
+    refreshes it every `interval` seconds, or sooner when a request finds
+    it stale, so concurrent requests never recompute the same payload.
+
+    `compute()` builds the payload and `version()` returns the cheap data
+    version (see get_data_version); when the version has not moved since
+    the last snapshot, a refresh only renews the timestamp.
+    """
+
+    def __init__(self, app, compute, version, interval=60):
+        self.app = app
+        self.compute = compute
+        self.version = version
+        self.interval = interval
+
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Nothing to serve yet: the first caller computes, the rest wait for it.
+            self.refresh()
+            self._start()
+            return self._snapshot
+
+        if time.time() - snapshot["computed_at"] > self.interval:
+            self._start()
+            self._wake.set()
+
+        return snapshot
+
+    def refresh(self):
+        requested_at = time.time()
+
+        with self._lock:
+            current = self._snapshot
+            if current and current["computed_at"] >= requested_at:
+                return current  # refreshed by someone else while we waited
+
+            with self.app.app_context():
+                version = self.version()
+
+                if current and current["version"] == version:
+                    # data unchanged: reuse the payload, only its age resets
+                    payload = current["payload"]
+                    compute_seconds = current["compute_seconds"]
+                else:
+                    started = time.perf_counter()
+                    payload = self.compute()
+                    compute_seconds = time.perf_counter() - started
+
+            self._snapshot = {
+                "payload": payload,
+                "version": version,
+                # the data version alone: the same in every worker process, and
+                # only moves when the payload is recomputed, so 304s keep working
+                "etag": version[0],
+                "last_modified": version[1],
+                "computed_at": time.time(),
+                "compute_seconds": compute_seconds,
+            }
+            return self._snapshot
+
+    def _start(self):
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="analytics-snapshotter", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as exc:
+                # keep serving the last good snapshot
+                print(f"Analytics snapshot refresh failed: {exc}")
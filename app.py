@@ -1,19 +1,48 @@
-from flask import Flask, render_template, request, redirect, url_for, session, abort, flash
+from flask import Flask, render_template, request, redirect, url_for, session, abort, flash, send_file
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from flask_migrate import Migrate
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models import db, User, Food, Order, FoodCategory, OrderItem, Payment, Rating
+from models import db, User, Food, Order, FoodCategory, OrderItem, Payment, Rating, DeliveryRun, PaymentEvent
+from analytics import (
+    get_daily_revenue, get_weekly_revenue, get_monthly_revenue, get_yearly_revenue,
+    get_food_combo_matrix, record_paid_order, rebuild_revenue_rollups, rebuild_food_combos,
+    get_kpis, get_food_popularity, get_vendor_popularity, get_category_names, get_data_version,
+    AnalyticsSnapshotter, explain_analytics_queries
+)
+from vendor_stats import (
+    get_vendor_stats, get_vendor_analytics, record_vendor_payment, record_vendor_rating,
+    rebuild_vendor_stats, recompute_vendor_ratings, load_vendor_cards,
+    vendor_card_query, vendor_cards
+)
+from revenue_explorer import explore_revenue, MAX_RANGE_DAYS
+from geo import VendorLocationIndex, NEARBY_RADIUS_KM, DISTANCE_ENGINES
+from menu_cache import MenuCache
+from order_status import set_order_status, status_change_error
+from query_budget import init_query_budget, query_budget
+from pagination import keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from delivery_runs import ready_orders, plan_runs, dispatch_run, complete_run, RUN_RADIUS_KM, MAX_RUN_STOPS
+from search import (
+    foods_matching, users_matching, search_catalogue, split_near_me, rebuild_search_index,
+    include_in_migrations
+)
+from order_quotes import (
+    read_cart, cart_foods, build_quote, sign_quote, load_quote, quote_is_current, price_again,
+    bump_menu_version, MAX_ITEM_QUANTITY
+)
 from dotenv import load_dotenv
-from paystackapi.transaction import Transaction
+from paystack_client import PaystackClient, PaystackError, DEFAULT_BASE_URL
+from bank_list import BankList, BANK_LIST_TTL
+from account_resolver import AccountResolver
+from receipts import ReceiptRenderer, receipt_filename, RECEIPT_WORKERS
+from payment_events import (
+    PaymentWorker, UnprocessableEvent, record_event, event_data, valid_signature, SIGNATURE_HEADER
+)
 import os
-from sqlalchemy import func, or_
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-import requests
+import json
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime, timedelta
-from geopy.distance import geodesic
 from flask_socketio import SocketIO, emit
 
 
@@ -38,6 +67,13 @@ login_manager.login_view = "login"
 
 app.config["PAYSTACK_PUBLIC_KEY"] = os.getenv("PAYSTACK_PUBLIC_KEY")
 app.config["PAYSTACK_SECRET_KEY"] = os.getenv("PAYSTACK_SECRET_KEY")
+# point at a local stand-in (benchmarks/paystack_stub.py) to develop offline
+app.config["PAYSTACK_BASE_URL"] = os.getenv("PAYSTACK_BASE_URL", DEFAULT_BASE_URL)
+# extra attempts for idempotent Paystack calls (GET, PUT) on timeouts and 5xx
+app.config["PAYSTACK_RETRIES"] = int(os.getenv("PAYSTACK_RETRIES", 2))
+# seconds before the cached bank list is refreshed, and where it is kept (default: instance folder)
+app.config["BANK_LIST_TTL"] = int(os.getenv("BANK_LIST_TTL", BANK_LIST_TTL))
+app.config["BANK_LIST_PATH"] = os.getenv("BANK_LIST_PATH")
 # =========================
 # CONFIG
 # =========================
@@ -47,42 +83,63 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, "static/uploads/vendor_logos")
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
 
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///ocfods.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///ocfods.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# SQL statements allowed per request; enforced when set, and always in testing
+app.config["QUERY_BUDGET"] = int(os.getenv("QUERY_BUDGET", 0))
+# rows per page on the order, user, food and vendor lists (?per_page= overrides, up to MAX_PAGE_SIZE)
+app.config["PAGE_SIZE"] = int(os.getenv("PAGE_SIZE", DEFAULT_PAGE_SIZE))
+# where receipt PDFs are kept (outside static/: only /orders/<id>/receipt serves them), and
+# processes rendering them after payment (0: only on first download)
+app.config["RECEIPT_DIR"] = os.getenv("RECEIPT_DIR", os.path.join(app.instance_path, "receipts"))
+app.config["RECEIPT_WORKERS"] = int(os.getenv("RECEIPT_WORKERS", RECEIPT_WORKERS))
 
 db.init_app(app)
-migrate = Migrate(app, db)
+init_query_budget(app)
+migrate = Migrate(app, db, include_object=include_in_migrations)
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+receipts = ReceiptRenderer(app.config["RECEIPT_DIR"], UPLOAD_FOLDER, workers=app.config["RECEIPT_WORKERS"])
+
 PLATFORM_COMMISSION_PERCENT = 5  # platform keeps 5% of food subtotal, vendor gets the rest
 
-PAYSTACK_BASE = "https://api.paystack.co"
+paystack = PaystackClient(
+    app.config["PAYSTACK_SECRET_KEY"],
+    base_url=app.config["PAYSTACK_BASE_URL"],
+    retries=app.config["PAYSTACK_RETRIES"]
+)
 
-def paystack_headers():
-    return {
-        "Authorization": f"Bearer {app.config['PAYSTACK_SECRET_KEY']}",
-        "Content-Type": "application/json"
-    }
+def fetch_banks():
+    data = paystack.list_banks()
+    if not data.get("status"):
+        raise PaystackError(data.get("message", "Bank list unavailable"))
+    return data["data"]
+
+bank_list = BankList(
+    fetch_banks,
+    app.config["BANK_LIST_PATH"] or os.path.join(app.instance_path, "paystack_banks.json"),
+    ttl=app.config["BANK_LIST_TTL"]
+)
 
 def list_banks():
-    resp = requests.get(f"{PAYSTACK_BASE}/bank?country=nigeria", headers=paystack_headers())
-    data = resp.json()
-    if data.get("status"):
-        return data["data"]
-    return []
+    """Paystack's banks from the bank list cache; never waits on Paystack."""
+    return bank_list.get()
 
-def verify_bank_account(account_number, bank_code):
-    """Returns (True, account_name) if valid, else (False, error_message)"""
-    resp = requests.get(
-        f"{PAYSTACK_BASE}/bank/resolve",
-        params={"account_number": account_number, "bank_code": bank_code},
-        headers=paystack_headers()
-    )
-    data = resp.json()
+def resolve_bank_account(account_number, bank_code):
+    data = paystack.resolve_account(account_number, bank_code)
     if data.get("status"):
         return True, data["data"]["account_name"]
     return False, data.get("message", "Could not verify account")
 
+bank_accounts = AccountResolver(resolve_bank_account)
+
+def verify_bank_account(account_number, bank_code):
+    """Returns (True, account_name) if valid, else (False, error_message)"""
+    try:
+        return bank_accounts.resolve(account_number, bank_code)
+    except PaystackError:
+        return False, "Could not reach Paystack to verify the account. Try again shortly."
+
 def create_or_update_subaccount(vendor, account_name):
     """Creates a Paystack subaccount for the vendor, or updates it if one exists."""
     payload = {
@@ -92,18 +149,14 @@ def create_or_update_subaccount(vendor, account_name):
         "percentage_charge": PLATFORM_COMMISSION_PERCENT
     }
 
-    if vendor.subaccount_code:
-        resp = requests.put(
-            f"{PAYSTACK_BASE}/subaccount/{vendor.subaccount_code}",
-            json=payload, headers=paystack_headers()
-        )
-    else:
-        resp = requests.post(
-            f"{PAYSTACK_BASE}/subaccount",
-            json=payload, headers=paystack_headers()
-        )
+    try:
+        if vendor.subaccount_code:
+            data = paystack.update_subaccount(vendor.subaccount_code, payload)
+        else:
+            data = paystack.create_subaccount(payload)
+    except PaystackError:
+        return None
 
-    data = resp.json()
     if data.get("status"):
         return data["data"]["subaccount_code"]
     return None
@@ -135,337 +188,178 @@ def landing_page():
 def about():
     return render_template("about.html")
 
-# =========================
-# ANALYTICS HELPERS
-# =========================
-
-def get_daily_revenue(days=7):
-    """Revenue for each of the last `days` days (including today)."""
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=days - 1)
-
-    rows = db.session.query(
-        func.strftime("%Y-%m-%d", Order.order_date).label("period"),
-        func.sum(Order.total_amount)
-    ).filter(
-        Order.status == "paid",
-        Order.order_date >= datetime.combine(start_date, datetime.min.time())
-    ).group_by("period").all()
-
-    revenue_map = {r[0]: (r[1] or 0) for r in rows}
-
-    labels, values = [], []
-    for i in range(days):
-        d = start_date + timedelta(days=i)
-        labels.append(d.strftime("%a %d"))
-        values.append(revenue_map.get(d.strftime("%Y-%m-%d"), 0))
-
-    return labels, values
-
-
-def get_weekly_revenue(weeks=4):
-    """Revenue for each of the last `weeks` weeks (Mon–Sun buckets)."""
-    today = datetime.now().date()
-    this_week_start = today - timedelta(days=today.weekday())
-    range_start = this_week_start - timedelta(weeks=weeks - 1)
-
-    rows = db.session.query(
-        Order.order_date,
-        Order.total_amount
-    ).filter(
-        Order.status == "paid",
-        Order.order_date >= datetime.combine(range_start, datetime.min.time())
-    ).all()
-
-    buckets = [0] * weeks
-    labels = [
-        (range_start + timedelta(weeks=i)).strftime("%b %d")
-        for i in range(weeks)
-    ]
-
-    for order_date, amount in rows:
-        delta_days = (order_date.date() - range_start).days
-        index = delta_days // 7
-        if 0 <= index < weeks:
-            buckets[index] += (amount or 0)
-
-    return labels, buckets
-
-
-def get_monthly_revenue(months=12):
-    """Revenue for each of the last `months` months."""
-    today = datetime.now()
-    year, month = today.year, today.month
-
-    year_months = []
-    for _ in range(months):
-        year_months.append((year, month))
-        month -= 1
-        if month == 0:
-            month = 12
-            year -= 1
-    year_months.reverse()
-
-    rows = db.session.query(
-        func.strftime("%Y-%m", Order.order_date).label("period"),
-        func.sum(Order.total_amount)
-    ).filter(
-        Order.status == "paid"
-    ).group_by("period").all()
-
-    revenue_map = {r[0]: (r[1] or 0) for r in rows}
-
-    month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                   "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-
-    labels, values = [], []
-    for (yr, mo) in year_months:
-        key = f"{yr:04d}-{mo:02d}"
-        labels.append(f"{month_names[mo - 1]} {str(yr)[2:]}")
-        values.append(revenue_map.get(key, 0))
-
-    return labels, values
-
-
-def get_yearly_revenue():
-    """Revenue totals grouped by calendar year."""
-    rows = db.session.query(
-        func.strftime("%Y", Order.order_date).label("period"),
-        func.sum(Order.total_amount)
-    ).filter(
-        Order.status == "paid"
-    ).group_by("period").order_by("period").all()
-
-    if not rows:
-        return [str(datetime.now().year)], [0]
-
-    return [r[0] for r in rows], [r[1] or 0 for r in rows]
-
-
-def get_food_combo_matrix(top_n=8):
-    """
-    Builds a co-occurrence matrix of the most frequently ordered foods —
-    how often pairs of items show up together in the same order.
-    """
-    rows = db.session.query(
-        OrderItem.order_id,
-        Food.name
-    ).join(Food).join(Order).filter(
-        Order.status == "paid"
-    ).all()
-
-    orders_foods = {}
-    for order_id, food_name in rows:
-        orders_foods.setdefault(order_id, set()).add(food_name)
-
-    food_counts = {}
-    for foods in orders_foods.values():
-        for f in foods:
-            food_counts[f] = food_counts.get(f, 0) + 1
-
-    top_foods = sorted(food_counts, key=food_counts.get, reverse=True)[:top_n]
-
-    matrix = {f: {g: 0 for g in top_foods} for f in top_foods}
-
-    for foods in orders_foods.values():
-        relevant = [f for f in foods if f in top_foods]
-        for f1 in relevant:
-            for f2 in relevant:
-                if f1 != f2:
-                    matrix[f1][f2] += 1
-
-    combo_matrix = [[matrix[f1][f2] for f2 in top_foods] for f1 in top_foods]
-
-    return top_foods, combo_matrix
-
-
 # =========================
 # ANALYTICS ROUTE
 # =========================
 
 @app.route("/analytics")
 def analytics():
+    # The page is a shell; every chart loads itself from /api/analytics/<chart>
+    return render_template(
+        "analytics.html",
+        food_categories=get_category_names()
+    )
 
-    # TOTAL ORDERS
-    total_orders = Order.query.filter_by(status="paid").count()
-
-    # TOTAL REVENUE
-    total_revenue = db.session.query(
-        func.sum(Order.total_amount)
-    ).filter(
-        Order.status == "paid"
-    ).scalar() or 0
-
-    # AVERAGE ORDER VALUE
-    avg_order_value = (total_revenue / total_orders) if total_orders else 0
-
-    # MOST POPULAR VENDOR
-    popular_vendor = db.session.query(
-        User.business_name,
-        func.count(Order.id).label("total_orders")
-    ).join(
-        Order, Order.vendor_id == User.id
-    ).filter(
-        Order.status == "paid"
-    ).group_by(
-        User.id
-    ).order_by(
-        func.count(Order.id).desc()
-    ).first()
-
-    # HIGHEST RATED VENDOR
-    highest_rated_vendor = db.session.query(
-        User.business_name,
-        func.avg(Rating.rating).label("avg_rating")
-    ).join(
-        Rating, Rating.vendor_id == User.id
-    ).group_by(
-        User.id
-    ).order_by(
-        func.avg(Rating.rating).desc()
-    ).first()
-
-    # ==============================================
-    # FOOD ORDER INTELLIGENCE
-    # grouped by Food.name so identically-named items
-    # sold by different vendors merge into one bar
-    # instead of duplicating
-    # ==============================================
-
-    def foods_by_category(category_name=None, limit=None):
-        query = db.session.query(
-            Food.name,
-            func.count(OrderItem.food_id).label("total")
-        ).join(
-            OrderItem
-        ).join(
-            Order
-        ).filter(
-            Order.status == "paid"
-        )
-
-        if category_name:
-            query = query.join(FoodCategory).filter(
-                FoodCategory.name == category_name
-            )
-
-        query = query.group_by(Food.name).order_by(
-            func.count(OrderItem.food_id).desc()
-        )
-
-        if limit:
-            query = query.limit(limit)
-
-        return query.all()
-
-    general_foods = foods_by_category(limit=10)
-    main_foods = foods_by_category("Main Dish")
-    sauce_foods = foods_by_category("Sauce")
-    topping_foods = foods_by_category("Topping")
-    drink_foods = foods_by_category("Drink")
+# =========================
+# ANALYTICS API
+# =========================
 
-    general_labels = [f.name for f in general_foods]
-    general_values = [f.total for f in general_foods]
+REVENUE_GRANULARITIES = {
+    "daily": lambda: get_daily_revenue(7),
+    "weekly": lambda: get_weekly_revenue(4),
+    "monthly": lambda: get_monthly_revenue(12),
+    "yearly": get_yearly_revenue,
+}
 
-    main_labels = [f.name for f in main_foods]
-    main_values = [f.total for f in main_foods]
+def build_analytics_payload():
+    """Every chart on the analytics page, with default filters."""
+    popular_vendor, highest_rated_vendor, by_orders, by_rating = get_vendor_popularity()
+    combo_labels, combo_matrix = get_food_combo_matrix(top_n=8)
 
-    sauce_labels = [f.name for f in sauce_foods]
-    sauce_values = [f.total for f in sauce_foods]
+    revenue = {}
+    for granularity, helper in REVENUE_GRANULARITIES.items():
+        labels, values = helper()
+        revenue[granularity] = {"granularity": granularity, "labels": labels, "values": values}
 
-    topping_labels = [f.name for f in topping_foods]
-    topping_values = [f.total for f in topping_foods]
+    return {
+        "kpis": get_kpis(),
+        "revenue": revenue,
+        "foods": {"series": get_food_popularity(general_limit=10)},
+        "vendors": {
+            "popular_vendor": popular_vendor and {
+                "business_name": popular_vendor.business_name,
+                "total_orders": popular_vendor.total_orders,
+            },
+            "highest_rated_vendor": highest_rated_vendor and {
+                "business_name": highest_rated_vendor.business_name,
+                "avg_rating": round(highest_rated_vendor.avg_rating, 1),
+            },
+            "orders": {"labels": by_orders[0], "values": by_orders[1]},
+            "rating": {"labels": by_rating[0], "values": by_rating[1]},
+        },
+        "combo": {"labels": combo_labels, "matrix": combo_matrix},
+    }
 
-    drink_labels = [f.name for f in drink_foods]
-    drink_values = [f.total for f in drink_foods]
+app.config["ANALYTICS_SNAPSHOT_INTERVAL"] = int(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", 60))
 
-    # ==============================================
-    # VENDOR POPULARITY (by orders + by rating)
-    # ==============================================
+analytics_snapshots = AnalyticsSnapshotter(
+    app,
+    compute=build_analytics_payload,
+    version=get_data_version,
+    interval=app.config["ANALYTICS_SNAPSHOT_INTERVAL"]
+)
+
+def analytics_kpis_chart(snapshot):
+    return dict(
+        snapshot["payload"]["kpis"],
+        snapshot={
+            "computed_at": snapshot["computed_at"],
+            "compute_seconds": round(snapshot["compute_seconds"], 3),
+        }
+    )
 
-    vendor_order_data = db.session.query(
-        User.business_name,
-        func.count(Order.id)
-    ).join(
-        Order, Order.vendor_id == User.id
-    ).filter(
-        Order.status == "paid"
-    ).group_by(
-        User.id
-    ).order_by(
-        func.count(Order.id).desc()
-    ).all()
+def analytics_revenue_chart(snapshot):
+    granularity = request.args.get("granularity", "daily")
+    if granularity not in REVENUE_GRANULARITIES:
+        abort(400)
 
-    vendor_labels = [v[0] for v in vendor_order_data]
-    vendor_values = [v[1] for v in vendor_order_data]
-
-    vendor_rating_data = db.session.query(
-        User.business_name,
-        func.avg(Rating.rating)
-    ).join(
-        Rating, Rating.vendor_id == User.id
-    ).group_by(
-        User.id
-    ).order_by(
-        func.avg(Rating.rating).desc()
-    ).all()
+    return snapshot["payload"]["revenue"][granularity]
+
+def analytics_foods_chart(snapshot):
+    foods = snapshot["payload"]["foods"]
+    category = request.args.get("category")
+    if not category:
+        return foods
+
+    series = [s for s in foods["series"] if s["key"] == category]
+    return {"series": series or [{"key": category, "label": category, "labels": [], "values": []}]}
+
+def analytics_vendors_chart(snapshot):
+    return snapshot["payload"]["vendors"]
+
+def analytics_combo_chart(snapshot):
+    # optional ?days=30 limits the heatmap to recent orders; that window
+    # is not part of the snapshot, so it is computed from the combo index
+    days = request.args.get("days", type=int)
+    if not days:
+        return snapshot["payload"]["combo"]
+
+    labels, matrix = get_food_combo_matrix(top_n=8, days=days)
+    return {"labels": labels, "matrix": matrix}
+
+ANALYTICS_CHARTS = {
+    "kpis": analytics_kpis_chart,
+    "revenue": analytics_revenue_chart,
+    "foods": analytics_foods_chart,
+    "vendors": analytics_vendors_chart,
+    "combo": analytics_combo_chart,
+}
+
+@app.route("/api/analytics/<chart>")
+def analytics_api(chart):
+    if chart not in ANALYTICS_CHARTS:
+        abort(404)
 
-    vendor_rating_labels = [v[0] for v in vendor_rating_data]
-    vendor_rating_values = [round(v[1], 1) for v in vendor_rating_data]
+    # Served from the latest snapshot; validators identify the snapshot,
+    # so a browser or proxy already holding it gets a 304 without any query.
+    snapshot = analytics_snapshots.get()
+
+    response = app.response_class(status=200)
+    response.set_etag(snapshot["etag"])
+    response.last_modified = snapshot["last_modified"]
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+
+    response.mimetype = "application/json"
+    response.set_data(app.json.dumps(ANALYTICS_CHARTS[chart](snapshot)))
+    return response
+
+def _parse_explorer_date(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        abort(400, description=f"{name} must be YYYY-MM-DD")
+
+@app.route("/api/analytics/revenue-explorer")
+def revenue_explorer_api():
+    """
+    Revenue series for ?start=&end= (YYYY-MM-DD, default the last 30
+    days) and optional repeated ?vendor_id=, computed live.
+    """
+    require_admin()
 
-    # ==============================================
-    # REVENUE TRENDS
-    # ==============================================
+    today = datetime.now().date()
+    end = _parse_explorer_date("end", today)
+    start = _parse_explorer_date("start", end - timedelta(days=29))
+    vendor_ids = sorted(set(request.args.getlist("vendor_id", type=int)))
 
-    daily_labels, daily_values = get_daily_revenue(7)
-    weekly_labels, weekly_values = get_weekly_revenue(4)
-    monthly_labels, monthly_values = get_monthly_revenue(12)
-    yearly_labels, yearly_values = get_yearly_revenue()
+    if start > end:
+        abort(400, description="start must not be after end")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        abort(400, description=f"ranges are limited to {MAX_RANGE_DAYS} days")
 
-    # ==============================================
-    # FOOD COMBO TRENDS
-    # ==============================================
+    version, last_modified = get_data_version()
 
-    combo_labels, combo_matrix = get_food_combo_matrix(top_n=8)
+    response = app.response_class(status=200)
+    response.set_etag(f"{version}-{start:%Y%m%d}-{end:%Y%m%d}-{'.'.join(map(str, vendor_ids))}")
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
 
-    return render_template(
-        "analytics.html",
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
 
-        total_orders=total_orders,
-        total_revenue=total_revenue,
-        avg_order_value=avg_order_value,
-
-        popular_vendor=popular_vendor,
-        highest_rated_vendor=highest_rated_vendor,
-
-        general_labels=general_labels,
-        general_values=general_values,
-        main_labels=main_labels,
-        main_values=main_values,
-        sauce_labels=sauce_labels,
-        sauce_values=sauce_values,
-        topping_labels=topping_labels,
-        topping_values=topping_values,
-        drink_labels=drink_labels,
-        drink_values=drink_values,
-
-        vendor_labels=vendor_labels,
-        vendor_values=vendor_values,
-        vendor_rating_labels=vendor_rating_labels,
-        vendor_rating_values=vendor_rating_values,
-
-        daily_labels=daily_labels,
-        daily_values=daily_values,
-        weekly_labels=weekly_labels,
-        weekly_values=weekly_values,
-        monthly_labels=monthly_labels,
-        monthly_values=monthly_values,
-        yearly_labels=yearly_labels,
-        yearly_values=yearly_values,
-
-        combo_labels=combo_labels,
-        combo_matrix=combo_matrix,
-    )
+    response.mimetype = "application/json"
+    response.set_data(app.json.dumps(explore_revenue(start, end, vendor_ids)))
+    return response
 
 # Student Registration
 @app.route("/register/student", methods=["GET", "POST"])
@@ -632,7 +526,9 @@ def food_setup():
                     category_id=category_obj.id
                 ))
 
+        bump_menu_version(current_user.id)
         db.session.commit()
+        menus.invalidate(current_user.id)
         flash("Menu saved successfully", "success")
         return redirect(url_for("vendor_menu"))
 
@@ -642,12 +538,16 @@ def food_setup():
 
 # Vendor dashboard
 @app.route("/vendor/dashboard")
+@query_budget(8)
 @login_required
 def vendor_dashboard():
     if current_user.role != "vendor":
         abort(403)
 
-    pending_orders = Order.query.filter_by(
+    pending_orders = Order.query.options(
+        joinedload(Order.customer),
+        selectinload(Order.items).joinedload(OrderItem.food)
+    ).filter_by(
         vendor_id=current_user.id,
         status="paid"
     ).order_by(Order.order_date.desc()).all()
@@ -656,27 +556,27 @@ def vendor_dashboard():
         vendor_id=current_user.id
     ).all()
 
-    total_earned = db.session.query(
-        func.sum(Payment.vendor_amount)
-    ).join(Order).filter(
-        Order.vendor_id == current_user.id,
-        Payment.payment_status == "successful"
-    ).scalar() or 0
-
-    completed_payouts = db.session.query(
-        func.count(Payment.id)
-    ).join(Order).filter(
-        Order.vendor_id == current_user.id,
-        Payment.payment_status == "successful"
-    ).scalar() or 0
+    stats = get_vendor_stats(current_user.id)
 
     return render_template(
         "vendor/vendor_dashboard.html",
         vendor=current_user,
         pending_orders=pending_orders,
         menu_items=menu_items,
-        total_earned=total_earned,
-        completed_payouts=completed_payouts
+        total_earned=stats.earned,
+        completed_payouts=stats.payouts
+    )
+
+# Vendor analytics
+@app.route("/vendor/analytics")
+@login_required
+def vendor_analytics():
+    user = require_vendor()
+
+    return render_template(
+        "vendor/vendor_analytics.html",
+        vendor=user,
+        **get_vendor_analytics(user.id)
     )
 
 # Login applies to all users
@@ -716,6 +616,24 @@ def login():
 
     return render_template("login.html")
 
+app.config["DISTANCE_ENGINE"] = os.getenv("DISTANCE_ENGINE", "exact")
+if app.config["DISTANCE_ENGINE"] not in DISTANCE_ENGINES:
+    raise RuntimeError(f"DISTANCE_ENGINE must be one of {', '.join(DISTANCE_ENGINES)}")
+
+vendor_locations = VendorLocationIndex()
+menus = MenuCache()
+
+def student_location():
+    """
+    The student's (lat, lng) from ?lat=&lng=, remembered in the session
+    for later visits, or None if the browser has not shared it yet.
+    """
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    if lat is not None and lng is not None and -90 <= lat <= 90 and -180 <= lng <= 180:
+        session["location"] = [lat, lng]
+    return session.get("location")
+
 # Student dashboard
 @app.route("/student/dashboard")
 @login_required
@@ -723,20 +641,21 @@ def studash():
     if current_user.role != "student":
         abort(403)
 
-    vendors = User.query.filter_by(role="vendor", is_active=True).all()
+    vendors = load_vendor_cards(User.query.filter_by(role="vendor", is_active=True))
 
-    for vendor in vendors:
-        avg_rating, rating_count = (
-            db.session.query(
-                func.avg(Rating.rating),
-                func.count(Rating.id)
-            )
-            .filter(Rating.vendor_id == vendor.id)
-            .first()
-        )
+    # nearby vendors first, nearest (or cheapest) first; the rest keep
+    # their order after them
+    location = student_location()
+    sort = request.args.get("sort", "distance")
+    if location:
+        nearby = {v["vendor_id"]: v for v in vendor_locations.nearest(*location)}
+        for vendor in vendors:
+            estimate = nearby.get(vendor.id)
+            vendor.distance_km = estimate and estimate["distance_km"]
+            vendor.delivery_estimate = estimate and estimate["fee"]
 
-        vendor.avg_rating = avg_rating or 0
-        vendor.rating_count = rating_count or 0
+        key = "delivery_estimate" if sort == "fee" else "distance_km"
+        vendors.sort(key=lambda v: (getattr(v, key) is None, getattr(v, key) or 0, v.distance_km or 0))
 
     rate_order = request.args.get("rate_order")
     unrated_orders = Order.query.filter(
@@ -750,30 +669,26 @@ def studash():
     return render_template(
         "student/studash.html",
         vendors=vendors,
+        location=location,
+        sort=sort,
+        nearby_radius_km=NEARBY_RADIUS_KM,
         rate_order=rate_order,
         unrated_orders=unrated_orders
     )
 
 @app.route("/student/stu_food")
 def stu_food():
-    foods = Food.query.filter_by(availability=True).all()
-
-    grouped_foods = {}
-    for food in foods:
-        category = food.category.name
-        grouped_foods.setdefault(category, []).append(food)
-
     return render_template(
         "student/stu_food.html",
-        grouped_foods=grouped_foods,
-        foods=foods,
+        grouped_foods=menus.all_foods(),
         student = current_user)
 
 @app.route("/student/orders")
+@query_budget(4)
 @login_required
 def student_orders():
-    orders = Order.query.filter_by(customer_id=current_user.id).all()
-    return render_template("student/stu_orders.html", orders=orders)
+    page = list_page(Order.query.filter_by(customer_id=current_user.id), Order.order_date, Order.id)
+    return render_template("student/stu_orders.html", orders=page.items, page=page)
 
 @app.route("/student/dashboard/<int:vendor_id>/menu")
 @login_required
@@ -781,63 +696,131 @@ def stud_vend_menu(vendor_id):
     if current_user.role != "student":
         abort(403)
 
-    vendor = User.query.filter_by(id=vendor_id, role="vendor", is_active=True).first_or_404()
+    menu = menus.vendor_menu(vendor_id)
+    if menu is None:
+        abort(404)
 
-    foods = Food.query.filter_by(
-        vendor_id=vendor.id,
-        availability=True
-    ).all()
+    # delivery estimate from the location shared on the dashboard, if any
+    location = session.get("location")
+    delivery_quote = location and vendor_locations.quotes(*location).get(vendor_id)
 
     return render_template(
         "student/stu_vend_menu.html",
-        vendor=vendor,
-        foods=foods
+        vendor=menu["vendor"],
+        categories=menu["categories"],
+        delivery_quote=delivery_quote,
+        max_quantity=MAX_ITEM_QUANTITY
     )
 
+@app.route("/api/delivery/quotes")
+@login_required
+def delivery_quotes_api():
+    """
+    Estimated distance and transportation fee from every active vendor
+    (or just the repeated ?vendor_id= ones) to ?lat=&lng=, defaulting to
+    the location shared on the dashboard. Nearest first.
+    """
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    if lat is None or lng is None:
+        if not session.get("location"):
+            abort(400, description="lat and lng are required")
+        lat, lng = session["location"]
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        abort(400, description="lat/lng out of range")
+
+    quotes = vendor_locations.quotes(lat, lng)
+    vendor_ids = request.args.getlist("vendor_id", type=int)
+    if vendor_ids:
+        quotes = {v: quotes[v] for v in vendor_ids if v in quotes}
+
+    return {
+        "quotes": sorted(
+            ({"vendor_id": vendor_id, **quote} for vendor_id, quote in quotes.items()),
+            key=lambda q: q["distance_km"]
+        )
+    }
+
+@app.route("/api/search")
+@login_required
+def search_api():
+    """
+    Available foods and active vendors matching ?q=, every word as a
+    prefix, best match first. With a location (?lat=&lng= or the one
+    shared on the dashboard) results carry the delivery estimate, and a
+    query like "jollof near me" keeps only those within NEARBY_RADIUS_KM,
+    nearest first.
+    """
+    if current_user.role != "student":
+        abort(403)
+
+    text, near_me = split_near_me(request.args.get("q", ""))
+    foods, vendors = search_catalogue(text)
+
+    location = student_location()
+    if location:
+        quotes = vendor_locations.quotes(*location)
+        for result in foods + vendors:
+            result.update(quotes.get(result["vendor_id"], {"distance_km": None, "fee": None}))
+
+        if near_me:
+            def nearby(results):
+                return sorted(
+                    (r for r in results
+                     if r["distance_km"] is not None and r["distance_km"] <= NEARBY_RADIUS_KM),
+                    key=lambda r: r["distance_km"]
+                )
+            foods, vendors = nearby(foods), nearby(vendors)
+
+    return {"q": text, "near_me": near_me, "located": bool(location),
+            "foods": foods, "vendors": vendors}
+
+@app.route("/api/admin/paystack")
+@login_required
+def paystack_stats_api():
+    """
+    Circuit state and per-endpoint call latency histograms of this
+    process's Paystack client, and its account resolution cache counts.
+    """
+    require_admin()
+    return {**paystack.stats(), "account_resolver": bank_accounts.stats()}
+
 @app.route("/order/place", methods=["POST"])
 @login_required
 def place_order():
     if current_user.role != "student":
         abort(403)
 
-    food_ids = request.form.getlist("food_ids")
-    vendor_id = request.form.get("vendor_id")
-    
-    if not food_ids:
+    vendor_id = request.form.get("vendor_id", type=int)
+    back = request.referrer or url_for("studash")
+
+    try:
+        cart = read_cart(request.form)
+    except ValueError as e:
+        flash(str(e), "warning")
+        return redirect(back)
+
+    if not cart:
         flash("Please select at least one food item", "warning")
-        return redirect(request.referrer)
-    
-    foods = Food.query.filter(Food.id.in_(food_ids)).all()
-    
-    
-    subtotal = sum(food.price for food in foods)
+        return redirect(back)
 
+    vendor = User.query.filter_by(id=vendor_id, role="vendor", is_active=True).first_or_404()
+    lines = cart_foods(vendor.id, cart)
+    if lines is None:
+        flash("Some items are no longer available from this vendor", "warning")
+        return redirect(back)
 
     customer_latitude = request.form.get("customer_latitude")
     customer_longitude = request.form.get("customer_longitude")
-    vendor = User.query.get(vendor_id)
-    #vendor coordinates
-    vendor_coords = (vendor.latitude, vendor.longitude)
-    
-    #customer coordinates
-    customer_coords = ( customer_latitude, customer_longitude)
-
-    #calculate distance
-    distance_km = geodesic(vendor_coords, customer_coords).km
 
-    # Calculate transportation fee
-    transportation_fee = distance_km * vendor.delivery_fee_km
-    
-    total = subtotal + transportation_fee
+    quote = build_quote(current_user.id, vendor, lines, customer_latitude, customer_longitude)
+    return render_order_review(quote)
 
+def render_order_review(quote):
     return render_template(
         "student/order_review.html",
-        foods=foods,
-        subtotal=subtotal,
-        transportation_fee=transportation_fee,
-        total=total,
-        customer_latitude=customer_latitude,
-        customer_longitude=customer_longitude,
+        quote=quote,
+        signed_quote=sign_quote(quote)
     )
 
 @app.route("/order/confirm", methods=["POST"])
@@ -846,60 +829,45 @@ def confirm_order():
     if current_user.role != "student":
         abort(403)
 
-    food_ids = request.form.getlist("food_ids")
-    foods = Food.query.filter(Food.id.in_(food_ids)).all()
-
-    if not foods:
+    # The review page carries the signed quote from place_order; while it
+    # is fresh and the vendor's menu is unchanged the order is inserted
+    # exactly as quoted, with no food, vendor or distance work here.
+    quote, fresh = load_quote(request.form.get("quote"), current_user.id)
+    if quote is None:
         abort(400)
 
-    vendor_id = foods[0].vendor_id
-    vendor = User.query.get(vendor_id)
-
-    subtotal = sum(food.price for food in foods)
-
-    customer_latitude = float(request.form.get("customer_latitude"))
-    customer_longitude = float(request.form.get("customer_longitude"))
-
-    #vendor coordinates
-    vendor_coords = (vendor.latitude, vendor.longitude)
-    
-    #customer coordinates
-    customer_coords = ( customer_latitude, customer_longitude)
-
-    #calculate distance
-    distance_km = geodesic(vendor_coords, customer_coords).km
-
-    # Calculate transportation fee
-    transportation_fee = distance_km * vendor.delivery_fee_km
-
-    # Final total
-    total_amount = subtotal + transportation_fee
-
-    order = Order(
-        customer_id=current_user.id,
-        vendor_id=vendor_id,
-        total_amount=total_amount,
-        customer_latitude=customer_latitude,
-        customer_longitude=customer_longitude,
-        delivery_distance_km=distance_km,
-        transportation_fee=transportation_fee, 
-        status="pending"
-    )
-
-    db.session.add(order)
-    db.session.flush()  # get order.id
+    if not (fresh and quote_is_current(quote)):
+        repriced = price_again(quote)
+        if repriced is None:
+            flash("These items are no longer available", "warning")
+            return redirect(url_for("studash"))
 
-    for food in foods:
-        db.session.add(OrderItem(
-            order_id=order.id,
-            food_id=food.id,
-            quantity=1,
-            subtotal=food.price
-        ))
+        if round(repriced["total"], 2) != round(quote["total"], 2):
+            flash("Prices have changed since you reviewed this order. Please check the new total.", "warning")
+            return render_order_review(repriced)
+        quote = repriced
+
+    # one INSERT for the order, one executemany INSERT for all its
+    # items, one transaction
+    order_id = db.session.execute(insert(Order).returning(Order.id), {
+        "customer_id": current_user.id,
+        "vendor_id": quote["vendor_id"],
+        "total_amount": quote["total"],
+        "customer_latitude": quote["latitude"],
+        "customer_longitude": quote["longitude"],
+        "delivery_distance_km": quote["distance_km"],
+        "transportation_fee": quote["fee"],
+        "status": "pending",
+    }).scalar_one()
+
+    db.session.execute(insert(OrderItem), [
+        {"order_id": order_id, "food_id": food_id, "quantity": quantity, "subtotal": price * quantity}
+        for food_id, _, price, quantity in quote["items"]
+    ])
 
     db.session.commit()
 
-    return redirect(url_for("payment_page", order_id=order.id))
+    return redirect(url_for("payment_page", order_id=order_id))
 
 @app.route("/payment/<int:order_id>")
 @login_required
@@ -920,18 +888,11 @@ def initiate_payment(order_id):
         flash("This vendor hasn't set up a payout account yet. Please contact support.", "danger")
         return redirect(url_for("studash"))
 
-    # defing callback and test
-    url = "https://api.paystack.co/transaction/initialize"
-    
-    headers = {
-        "Authorization": f"Bearer {app.config['PAYSTACK_SECRET_KEY']}",
-        "Content-Type": "application/json"
-    }
-
+    reference = f"ORD_{order.id}_{int(datetime.now().timestamp())}"
     data = {
         "email": current_user.email,
         "amount": int(order.total_amount * 100),
-        "reference": f"ORD_{order.id}_{int(datetime.now().timestamp())}", 
+        "reference": reference,
         "callback_url": url_for("verify_payment", _external=True),
         "bearer": "subaccount",
         "metadata": {
@@ -940,102 +901,186 @@ def initiate_payment(order_id):
         }
     }
 
-    response = requests.post(url, json=data, headers=headers)
-    res = response.json()
+    try:
+        res = paystack.initialize_transaction(data)
+    except PaystackError:
+        flash("Paystack is not responding right now. Please try again in a moment.", "danger")
+        return redirect(url_for("studash"))
 
-    if res["status"]:
+    if res.get("status"):
+        # lets verify_payment find the order before Paystack's webhook arrives
+        order.transaction_ref = reference
+        db.session.commit()
         return redirect(res["data"]["authorization_url"])
 
     flash("Payment initialization failed", "danger")
     return redirect(url_for("studash"))
 
-def generate_receipt(order):
-    # Folder to save receipts
-    receipt_folder = os.path.join("static", "receipts")
-    os.makedirs(receipt_folder, exist_ok=True)
-
-    filename = f"receipt_{order.id}.pdf"
-    filepath = os.path.join(receipt_folder, filename)
-
-    # Create PDF
-    doc = SimpleDocTemplate(filepath)
-    styles = getSampleStyleSheet()
-
-    elements = []
-
-    # title
-    elements.append(Paragraph("SEAMLESS Receipt", styles["Title"]))
-    elements.append(Paragraph("Food Order Receipt", styles["Normal"]))
-    elements.append(Spacer(1, 10))
-
-    #vendor info
-    vendor = order.vendor
-    elements.append(Paragraph(f"Vendor: {vendor.business_name}", styles["Normal"]))
-
-    # Vendor logo (if exists)
-    if vendor.logo:
-        logo_path = os.path.join("static/uploads/vendor_logos", vendor.logo)
-        if os.path.exists(logo_path):
-            elements.append(Image(logo_path, width=80, height=80))
+# =========================
+# PAYMENT FINALIZATION
+# =========================
 
-    elements.append(Spacer(1, 10))
+def payment_order_id(reference, data):
+    """The order a Paystack charge pays for, from its metadata, reference or referrer."""
+    metadata = data.get("metadata")
 
-    # ORDER INFO
-    elements.append(Paragraph(f"Order ID: {order.id}", styles["Normal"]))
-    elements.append(Paragraph(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles["Normal"]))
-    elements.append(Paragraph(f"Vendor: {order.vendor.business_name}", styles["Normal"]))
-    elements.append(Paragraph(f"Transaction Ref: {getattr(order, 'transaction_ref', 'N/A')}", styles["Normal"]))    
-    elements.append(Spacer(1, 10))
+    if isinstance(metadata, dict) and metadata.get("order_id"):
+        return int(metadata["order_id"])
 
-    # TABLE DATA
-    data = [["Item", "Qty", "Price (₦)", "Subtotal (₦)"]]
+    # references made by initiate_payment: ORD_<order id>_<timestamp>
+    if reference and reference.startswith("ORD_"):
+        try:
+            return int(reference.split("_")[1])
+        except (IndexError, ValueError):
+            pass
 
-    subtotal = 0
+    # inline checkout adds the payment page URL, /payment/<order id>
+    if isinstance(metadata, dict) and metadata.get("referrer"):
+        try:
+            return int(metadata["referrer"].rstrip("/").split("/")[-1])
+        except ValueError:
+            pass
 
-    for item in order.items:
-        data.append([
-            item.food.name,
-            str(item.quantity),
-            f"{item.food.price:.2f}",
-            f"{item.subtotal:.2f}"
-        ])
-        subtotal += item.subtotal
+    return None
 
-    # Transport fee 
-    transportation_fee = 0
+def finalize_payment(event):
+    """
+    Applies a stored Paystack event, without committing: a successful
+    charge marks its order paid and records the payment, once, however
+    often the event arrives. after_payment does the rest.
+    """
+    if event.event != "charge.success":
+        return "ignored"
 
-    data.append(["", "", "Subtotal", f"{subtotal:.2f}"])
-    data.append(["", "", "Transport", f"{transportation_fee:.2f}"])
-    data.append(["", "", "Total", f"{order.total_amount:.2f}"])
+    data = event_data(event)
+    if data.get("status", "success") != "success":
+        return "ignored"
 
-    table = Table(data, hAlign="LEFT")
+    order_id = payment_order_id(event.reference, data)
+    order = db.session.get(Order, order_id) if order_id else None
+    if not order:
+        raise UnprocessableEvent(f"no order for reference {event.reference}")
+    event.order_id = order.id
+
+    if (data.get("amount") or 0) < int(order.total_amount * 100):
+        raise UnprocessableEvent(f"paid {data.get('amount')} kobo for order {order.id} of ₦{order.total_amount}")
+
+    # only the first event to move the order out of "pending" pays it
+    paid = db.session.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.status == "pending")
+        .values(status="paid", transaction_ref=event.reference)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not paid:
+        return "ignored"
+    db.session.refresh(order)
+
+    # Paystack returns the split breakdown in data["fees_split"] when a subaccount was used
+    fees_split = data.get("fees_split") or {}
+    vendor_amount = fees_split.get("subaccount", 0) / 100 if fees_split else 0
+    platform_amount = order.total_amount - vendor_amount
+
+    if not vendor_amount:
+        vendor_amount = order.total_amount * (1 - PLATFORM_COMMISSION_PERCENT / 100)
+        platform_amount = order.total_amount - vendor_amount
+
+    payment = Payment(
+        order_id=order.id,
+        payment_method="paystack",
+        payment_status="successful",
+        vendor_amount=vendor_amount,
+        platform_amount=platform_amount,
+        subaccount_code=order.vendor.subaccount_code
+        )
+    db.session.add(payment)
+    record_paid_order(order)
+    record_vendor_payment(order, payment)
+    order.receipt_file = receipt_filename(order.id)
+    return "processed"
+
+def verify_reference(reference):
+    """Looks a reference up on Paystack and stores a successful charge as an event (its id, or None)."""
+    response = paystack.verify_transaction(reference)
+    data = response.get("data") or {}
+    if not response.get("status") or data.get("status") != "success":
+        return None
+    return record_event("charge.success", data.get("reference") or reference,
+                        json.dumps({"event": "charge.success", "data": data}), source="verify")
+
+def after_payment(event):
+    """Receipt and vendor notification for a newly paid order, once its payment is committed."""
+    order = db.session.get(Order, event.order_id)
+    receipts.prerender(order)
+
+    socketio.emit(
+        "new_order",
+        {
+            "order_id": order.id,
+            "customer": order.customer.name,
+            "total": order.total_amount
+        }
+    )
 
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.darkgreen),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-        ("GRID", (0, 0), (-1, -1), 1, colors.black),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-    ]))
+payments = PaymentWorker(app, finalize_payment, verify=verify_reference, after=after_payment)
 
-    elements.append(table)
-    elements.append(Spacer(1, 20))
+@app.before_request
+def start_payment_worker():
+    # under a WSGI server the first request starts the worker, whose first
+    # sweep picks up events stored or claimed before the restart
+    if not app.testing:
+        payments.start()
 
-    
-    #FOOTER
+@app.route("/payment/webhook", methods=["POST"])
+def payment_webhook():
+    """
+    Paystack's event notifications. Stored and acknowledged at once; the
+    payment worker finalizes the order.
+    """
+    body = request.get_data()
+    if not valid_signature(body, request.headers.get(SIGNATURE_HEADER), app.config["PAYSTACK_SECRET_KEY"]):
+        abort(401)
 
-    elements.append(Paragraph("Thank you for ordering with CampusEats!", styles["Italic"]))
-    elements.append(Paragraph("Contact: support@campuseats.com", styles["Normal"]))
+    try:
+        payload = json.loads(body)
+        event, reference = payload["event"], str(payload["data"]["reference"])
+    except (ValueError, KeyError, TypeError):
+        abort(400)
 
-    doc.build(elements)
+    event_id = record_event(event, reference, body.decode())
+    db.session.commit()
+    if event_id:
+        payments.enqueue(event_id)
+    return "", 200
 
-    return filename
+def payment_state(reference):
+    """("paid" | "pending" | "failed", order or None) for a reference the student came back with."""
+    event = PaymentEvent.query.filter_by(reference=reference, event="charge.success").first()
 
+    order = None
+    if event and event.order_id:
+        order = db.session.get(Order, event.order_id)
+    if order is None:
+        order = Order.query.filter_by(transaction_ref=reference).first()
 
+    if order and order.customer_id != current_user.id:
+        abort(404)
+    if order and order.status != "pending":
+        return "paid", order
+    if event and event.status == "failed":
+        return "failed", order
+    return "pending", order
 
 @app.route("/payment/verify", methods=["GET"])
 @app.route("/payment/verify/<reference>", methods=["GET"])
+@query_budget(6)
 @login_required
 def verify_payment(reference=None):
+    """
+    Where Paystack sends the student back. Only reads the payment state
+    the webhook left; while that has not arrived, a lookup is queued for
+    the payment worker and the page waits for it.
+    """
     if not reference:
         reference = request.args.get("reference")
 
@@ -1043,90 +1088,56 @@ def verify_payment(reference=None):
         flash("No payment reference found", "danger")
         return redirect(url_for("studash"))
 
-    # Verify with Paystack
-    response = Transaction.verify(reference=reference)
-    if not response or not response.get("status"):
-        flash("Payment verification failed", "danger")
-        return redirect(url_for("studash"))
-
-    data = response["data"]
-    order_id = None
-    metadata = data.get("metadata")
-
-    # Check Metadata ---
-    if isinstance(metadata, dict):
-        order_id = metadata.get("order_id")
-    
-    # Check Reference String (ORD_22_12345) ---
-    if not order_id and reference and "ORD_" in reference:
-        try:
-            order_id = reference.split("_")[1]
-        except: pass
-
-    # Check Referrer ---Failsafe ---
-   
-    if not order_id and isinstance(metadata, dict) and 'referrer' in metadata:
-        try:
-            referrer_url = metadata['referrer']
-            # Grabs the last number in the URL (the 22)
-            order_id = referrer_url.rstrip('/').split('/')[-1]
-            print(f"DEBUG: Recovered Order ID {order_id} from Referrer URL")
-        except: pass
-
-    if not order_id:
-        print(f"DEBUG: Still no Order ID. Data: {data}")
-        flash("Transaction verified but Order ID not found", "danger")
+    state, order = payment_state(reference)
+    if state == "paid":
+        flash("Payment successful!", "success")
+        return redirect(url_for("studash", rate_order=order.id))
+    if state == "failed":
+        flash("Payment could not be confirmed. Please contact support with your reference.", "danger")
         return redirect(url_for("studash"))
 
+    payments.request_verify(reference)
+    return render_template("student/payment_pending.html", reference=reference)
 
+@app.route("/payment/status/<reference>")
+@query_budget(4)
+@login_required
+def payment_status(reference):
+    """
+    What the waiting page polls until the payment is finalized. While it
+    is pending, Paystack is asked again (at most every VERIFY_INTERVAL),
+    in case the charge had not settled at the last lookup and no webhook
+    is coming.
+    """
+    state, order = payment_state(reference)
+    if state == "pending":
+        payments.request_verify(reference)
+    return {
+        "status": state,
+        "redirect": url_for("studash", rate_order=order.id) if state == "paid" else url_for("studash"),
+    }
 
-    # Finalize in Database
-    order = db.session.get(Order, int(order_id))
-    if not order:
+@app.route("/orders/<int:order_id>/receipt")
+@login_required
+def order_receipt(order_id):
+    """
+    The order's receipt PDF for its customer, vendor or an admin;
+    rendered on first download if the receipt pool has not done it.
+    """
+    order = Order.query.get_or_404(order_id)
+    if current_user.role != "admin" and current_user.id not in (order.customer_id, order.vendor_id):
+        abort(403)
+    if order.status == "pending":
         abort(404)
 
-    reference = data["reference"]
-    order.transaction_ref = reference
-
-    if order.status != "paid":
-        order.status = "paid"
-        # Paystack returns the split breakdown in data["fees_split"] when a subaccount was used
-        fees_split = data.get("fees_split") or {}
-        vendor_amount = fees_split.get("subaccount", 0) / 100 if fees_split else 0
-        platform_amount = order.total_amount - vendor_amount    
-        
-        if not vendor_amount:
-            vendor_amount = order.total_amount * (1 - PLATFORM_COMMISSION_PERCENT / 100)
-            platform_amount = order.total_amount - vendor_amount
-
-        payment = Payment(
-            order_id=order.id, 
-            payment_method="paystack", 
-            payment_status="successful",
-            vendor_amount=vendor_amount,
-            platform_amount=platform_amount,
-            subaccount_code=order.vendor.subaccount_code
-            )
-        db.session.add(payment)
-        
-        receipt_file = generate_receipt(order)
-        order.receipt_file = receipt_file
-        db.session.commit()
-
-        print("=======EMITTING NEW ORDER=======")
-        print(order.id)
-        socketio.emit(
-        "new_order",
-        {
-            "order_id": order.id,
-            "customer": order.customer.name,
-            "total": order.total_amount
-        }
+    return send_file(
+        receipts.render(order),
+        mimetype="application/pdf",
+        as_attachment="download" in request.args,
+        download_name=receipt_filename(order.id),
+        max_age=3600
     )
 
-    flash("Payment successful!", "success")
-    return redirect(url_for("studash", rate_order=order.id))
-
 # Logout
 @app.route("/logout")
 @login_required
@@ -1153,20 +1164,23 @@ def vendor_menu():
         )
 
 @app.route("/vendor/vendor_orders")
+@query_budget(4)
 def vendor_orders():
     user = require_vendor()
 
-    orders = Order.query.filter(
-        Order.vendor_id == user.id,
-        Order.status.in_(["accepted", "ready", "delivered"])
-    ).order_by(
-        Order.order_date.desc()
-    ).all()
+    page = list_page(
+        Order.query.options(joinedload(Order.customer)).filter(
+            Order.vendor_id == user.id,
+            Order.status.in_(["accepted", "ready", "delivered"])
+        ),
+        Order.order_date, Order.id
+    )
     
     return render_template(
         "vendor/vendor_orders.html",
         vendor=user,
-        orders=orders
+        orders=page.items,
+        page=page
     )
 
 @app.route("/vendor/order/<int:order_id>/take", methods=["POST"])
@@ -1178,7 +1192,12 @@ def take_order(order_id):
 
     order = Order.query.get_or_404(order_id)
 
-    order.status = "accepted"
+    error = status_change_error(order, "accepted")
+    if error:
+        flash(error, "danger")
+        return redirect(url_for("vendor_dashboard"))
+
+    set_order_status(order, "accepted")
 
     db.session.commit()
 
@@ -1192,10 +1211,14 @@ def take_order(order_id):
     )
 
 @app.route("/vendor/order/<int:order_id>")
+@query_budget(6)
 @login_required
 def vendor_order_details(order_id):
 
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(
+        joinedload(Order.customer),
+        selectinload(Order.items).joinedload(OrderItem.food)
+    ).filter_by(id=order_id).first_or_404()
 
     if order.vendor_id != current_user.id:
         abort(403)
@@ -1215,7 +1238,12 @@ def mark_ready(order_id):
 
     order = Order.query.get_or_404(order_id)
 
-    order.status = "ready"
+    error = status_change_error(order, "ready")
+    if error:
+        flash(error, "danger")
+        return redirect(url_for("vendor_orders"))
+
+    set_order_status(order, "ready")
 
     db.session.commit()
 
@@ -1237,7 +1265,12 @@ def mark_delivered(order_id):
 
     order = Order.query.get_or_404(order_id)
 
-    order.status = "delivered"
+    error = status_change_error(order, "delivered")
+    if error:
+        flash(error, "danger")
+        return redirect(url_for("vendor_orders"))
+
+    set_order_status(order, "delivered")
 
     db.session.commit()
 
@@ -1250,6 +1283,62 @@ def mark_delivered(order_id):
         url_for("vendor_orders")
     )
 
+@app.route("/vendor/delivery-runs")
+@query_budget(6)
+def vendor_delivery_runs():
+    user = require_vendor()
+
+    active_runs = DeliveryRun.query.options(
+        selectinload(DeliveryRun.orders).joinedload(Order.customer)
+    ).filter_by(
+        vendor_id=user.id,
+        completed_at=None
+    ).order_by(DeliveryRun.dispatched_at).all()
+
+    return render_template(
+        "vendor/delivery_runs.html",
+        vendor=user,
+        runs=plan_runs(user, ready_orders(user.id)),
+        active_runs=active_runs,
+        radius_km=RUN_RADIUS_KM,
+        max_stops=MAX_RUN_STOPS
+    )
+
+@app.route("/vendor/delivery-runs/dispatch", methods=["POST"])
+def dispatch_delivery_run():
+    user = require_vendor()
+
+    order_ids = request.form.getlist("order_ids", type=int)
+    if len(set(order_ids)) > MAX_RUN_STOPS:
+        flash(f"A run can have at most {MAX_RUN_STOPS} stops", "warning")
+        return redirect(url_for("vendor_delivery_runs"))
+
+    run = dispatch_run(user, order_ids)
+    if run is None:
+        flash("Some of those orders are no longer waiting for delivery, the runs have been re-planned", "warning")
+        return redirect(url_for("vendor_delivery_runs"))
+
+    db.session.commit()
+
+    flash(f"Run #{run.id} dispatched with {len(run.orders)} stop(s)", "success")
+    return redirect(url_for("vendor_delivery_runs"))
+
+@app.route("/vendor/delivery-runs/<int:run_id>/complete", methods=["POST"])
+def complete_delivery_run(run_id):
+    user = require_vendor()
+
+    run = DeliveryRun.query.filter_by(
+        id=run_id,
+        vendor_id=user.id,
+        completed_at=None
+    ).first_or_404()
+
+    complete_run(run)
+    db.session.commit()
+
+    flash(f"Run #{run.id} completed, {len(run.orders)} order(s) delivered", "success")
+    return redirect(url_for("vendor_delivery_runs"))
+
 @app.route("/vendor/settings", methods=["GET", "POST"])
 @login_required
 def vendor_settings():
@@ -1307,7 +1396,11 @@ def vendor_settings():
             else:
                 flash("Account verified but payout setup with Paystack failed. Try again.", "warning")
 
+        # prices, availability, rate and location all feed order quotes
+        bump_menu_version(current_user.id)
         db.session.commit()
+        vendor_locations.invalidate()
+        menus.invalidate(current_user.id)
         flash("Settings updated successfully", "success")
         return redirect(url_for("vendor_settings"))
     
@@ -1389,21 +1482,15 @@ def admin_users():
         query = query.filter_by(role=role)
 
     if q:
-        like = f"%{q}%"
-        query = query.filter(
-            or_(
-                User.name.ilike(like),
-                User.business_name.ilike(like),
-                User.email.ilike(like)
-            )
-        )
+        query = query.filter(users_matching(q))
 
-    users = query.order_by(User.id.desc()).all()
+    page = list_page(query, User.id)
 
     return render_template(
         "admin/admin_users.html",
         admin=admin,
-        users=users,
+        users=page.items,
+        page=page,
         role=role,
         q=q
     )
@@ -1418,40 +1505,28 @@ def admin_vendors():
     query = User.query.filter_by(role="vendor")
 
     if q:
-        query = query.filter(User.business_name.ilike(f"%{q}%"))
-
-    vendors = query.order_by(User.id.desc()).all()
-
-    for vendor in vendors:
-        avg_rating, rating_count = (
-            db.session.query(
-                func.avg(Rating.rating),
-                func.count(Rating.id)
-            )
-            .filter(Rating.vendor_id == vendor.id)
-            .first()
-        )
-        vendor.avg_rating = avg_rating or 0
-        vendor.rating_count = rating_count or 0
-        vendor.order_count = Order.query.filter_by(vendor_id=vendor.id).count()
-        vendor.food_count = Food.query.filter_by(vendor_id=vendor.id).count()
+        query = query.filter(users_matching(q))
+
+    page = list_page(vendor_card_query(query, with_counts=True), User.id)
 
     return render_template(
         "admin/admin_vendors.html",
         admin=admin,
-        vendors=vendors,
+        vendors=vendor_cards(page.items, with_counts=True),
+        page=page,
         q=q
     )
 
 
 @app.route("/admin/admin_vendor/<int:vendor_id>")
+@query_budget(10)
 def admin_vendor_details(vendor_id):
     admin = require_admin()
 
     vendor = User.query.filter_by(id=vendor_id, role="vendor").first_or_404()
 
-    foods = Food.query.filter_by(vendor_id=vendor.id).all()
-    orders = Order.query.filter_by(vendor_id=vendor.id).order_by(
+    foods = Food.query.options(joinedload(Food.category)).filter_by(vendor_id=vendor.id).all()
+    orders = Order.query.options(joinedload(Order.customer)).filter_by(vendor_id=vendor.id).order_by(
         Order.order_date.desc()
     ).all()
     ratings = Rating.query.filter_by(vendor_id=vendor.id).order_by(
@@ -1556,14 +1631,15 @@ def admin_foods():
         query = query.filter_by(category_id=category_id)
 
     if q:
-        query = query.filter(Food.name.ilike(f"%{q}%"))
+        query = query.filter(foods_matching(q))
 
-    foods = query.order_by(Food.id.desc()).all()
+    page = list_page(query, Food.id)
 
     return render_template(
         "admin/admin_foods.html",
         admin=admin,
-        foods=foods,
+        foods=page.items,
+        page=page,
         vendors=User.query.filter_by(role="vendor").all(),
         categories=FoodCategory.query.order_by(FoodCategory.name).all(),
         selected_vendor=vendor_id,
@@ -1573,28 +1649,30 @@ def admin_foods():
 
 
 @app.route("/admin/admin_orders")
+@query_budget(4)
 def admin_orders():
     admin = require_admin()
 
     status = request.args.get("status", "all")
     q = request.args.get("q", "").strip()
 
-    query = Order.query
+    query = Order.query.options(joinedload(Order.customer), joinedload(Order.vendor))
 
     if status != "all":
         query = query.filter_by(status=status)
 
     if q:
-        query = query.join(User, Order.customer_id == User.id).filter(
-            User.name.ilike(f"%{q}%")
-        )
+        query = query.filter(Order.customer_id.in_(
+            db.session.query(User.id).filter(users_matching(q))
+        ))
 
-    orders = query.order_by(Order.order_date.desc()).all()
+    page = list_page(query, Order.order_date, Order.id)
 
     return render_template(
         "admin/admin_orders.html",
         admin=admin,
-        orders=orders,
+        orders=page.items,
+        page=page,
         status=status,
         q=q
     )
@@ -1625,6 +1703,8 @@ def admin_toggle_user(user_id):
 
     user.is_active = not user.is_active
     db.session.commit()
+    vendor_locations.invalidate()
+    menus.invalidate(user.id)
 
     flash(
         f"{'Enabled' if user.is_active else 'Disabled'} {user.name or user.business_name}",
@@ -1638,8 +1718,11 @@ def admin_delete_food(food_id):
     admin = require_admin()
 
     food = Food.query.get_or_404(food_id)
+    vendor_id = food.vendor_id
+    bump_menu_version(vendor_id)
     db.session.delete(food)
     db.session.commit()
+    menus.invalidate(vendor_id)
 
     flash("Food item deleted", "success")
     return redirect(request.referrer or url_for("admin_foods"))
@@ -1651,7 +1734,9 @@ def admin_toggle_food(food_id):
 
     food = Food.query.get_or_404(food_id)
     food.availability = not food.availability
+    bump_menu_version(food.vendor_id)
     db.session.commit()
+    menus.invalidate(food.vendor_id)
 
     flash(
         f"{'Marked available' if food.availability else 'Marked unavailable'}: {food.name}",
@@ -1665,7 +1750,12 @@ def admin_update_order_status(order_id):
     admin = require_admin()
 
     order = Order.query.get_or_404(order_id)
-    order.status = request.form["status"]
+    error = status_change_error(order, request.form.get("status"))
+    if error:
+        flash(error, "danger")
+        return redirect(request.referrer or url_for("admin_orders"))
+
+    set_order_status(order, request.form["status"])
     db.session.commit()
 
     flash(f"Order #{order.id} status updated to {order.status}", "success")
@@ -1684,10 +1774,24 @@ def admin_delete_user(user_id):
 
     db.session.delete(user)
     db.session.commit()
+    vendor_locations.invalidate()
+    menus.invalidate(user_id)
 
     flash("User deleted successfully", "success")
     return redirect(url_for("admin_users"))
 
+@app.route("/admin/rating/<int:rating_id>/delete", methods=["POST"])
+def admin_delete_rating(rating_id):
+    admin = require_admin()
+
+    rating = Rating.query.get_or_404(rating_id)
+    record_vendor_rating(rating, sign=-1)
+    db.session.delete(rating)
+    db.session.commit()
+
+    flash("Rating removed", "success")
+    return redirect(request.referrer or url_for("admin_vendor_details", vendor_id=rating.vendor_id))
+
 @app.route("/payment/callback")
 def payment_callback():
     return "Verified!"
@@ -1726,11 +1830,61 @@ def submit_rating():
     )
 
     db.session.add(rating)
+    record_vendor_rating(rating)
     db.session.commit()
 
     flash("Thanks for your rating!", "success")
     return redirect(url_for("studash"))
 
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Backfill the revenue rollups, food combo index and vendor stats from the orders table."""
+    days = rebuild_revenue_rollups()
+    print(f"Rebuilt revenue rollups from {days} day(s) of paid orders")
+    orders = rebuild_food_combos()
+    print(f"Rebuilt food combo index from {orders} paid order(s)")
+    vendors = rebuild_vendor_stats()
+    print(f"Rebuilt vendor stats for {vendors} vendor(s)")
+
+@app.cli.command("recompute-ratings")
+def recompute_ratings_command():
+    """Repair the stored vendor rating sum, count and average from the ratings table."""
+    drifted = recompute_vendor_ratings()
+    print(f"Recomputed vendor ratings, {drifted} vendor(s) had drifted")
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Create the full-text search tables and triggers if missing and refill them."""
+    foods, users = rebuild_search_index()
+    print(f"Indexed {foods} foods and {users} users")
+
+@app.cli.command("refresh-banks")
+def refresh_banks_command():
+    """Fetch Paystack's bank list now and save it for the payout dropdowns."""
+    if bank_list.refresh():
+        print(f"Saved {len(bank_list.get())} banks to {bank_list.path}")
+    else:
+        print("Could not fetch the bank list from Paystack; the saved list is unchanged")
+
+@app.cli.command("process-payment-events")
+def process_payment_events_command():
+    """Finalize stored Paystack events still pending (e.g. received before a restart)."""
+    handled = total = payments.sweep()
+    while handled:
+        handled = payments.sweep()
+        total += handled
+    failed = PaymentEvent.query.filter_by(status="failed").count()
+    print(f"Processed {total} payment event(s); {failed} failed event(s) on record")
+
+@app.cli.command("explain-analytics")
+def explain_analytics_command():
+    """Show query plans for the analytics order filters without and with indexes."""
+    for name, before, after, uses_index in explain_analytics_queries():
+        print(f"== {name}")
+        print("   before: " + " | ".join(before))
+        print("   after:  " + " | ".join(after))
+        print("   " + ("OK, uses index" if uses_index else "WARNING: no order index used (run flask db upgrade?)"))
+
 def require_vendor():
     if  not current_user.is_authenticated:
         abort(401)
@@ -1749,7 +1903,31 @@ def require_admin():
 
     return current_user
 
+def list_page(query, *keys):
+    """
+    The page of `query` a list view should show, newest first by `keys`
+    (the primary key last), for the request's ?after= cursor and
+    ?per_page= size.
+    """
+    size = request.args.get("per_page", app.config["PAGE_SIZE"], type=int)
+    try:
+        return keyset_page(query, keys, request.args.get("after"), min(max(size, 1), MAX_PAGE_SIZE))
+    except ValueError:
+        abort(400, description="Invalid page cursor")
+
+@app.template_global()
+def page_url(cursor=None):
+    """This list page's URL with its filters kept, starting after `cursor` (or at the newest)."""
+    args = request.args.to_dict()
+    args.pop("after", None)
+    if cursor:
+        args["after"] = cursor
+    return url_for(request.endpoint, **request.view_args, **args)
+
 if __name__ == "__main__":
+    # the reloader's parent process only watches files; the child serving requests runs the worker
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        payments.start()
     socketio.run(
         app,
         debug=True
@@ -0,0 +1,97 @@
+"""
+Paystack's list of Nigerian banks, for the payout account dropdowns.
+
+The list changes a few times a year, so it is kept in memory and in a
+JSON file, and served from there without ever waiting on Paystack: a
+stale list is served as is while one background thread fetches a fresh
+one (stale-while-revalidate), a failed fetch keeps the old list and is
+retried after RETRY_AFTER seconds, and after a restart the file serves
+the list until the first refresh lands, even if Paystack is down.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+BANK_LIST_TTL = 24 * 3600
+RETRY_AFTER = 60
+
+
+class BankList:
+    """
+    `fetch()` returns the banks as a list of dicts from Paystack, or
+    raises. `path` is the JSON file the last good list is kept in.
+    """
+
+    def __init__(self, fetch, path, ttl=BANK_LIST_TTL, retry_after=RETRY_AFTER):
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self.retry_after = retry_after
+
+        self._banks = None
+        self._fetched_at = 0
+        self._failed_at = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self):
+        """The banks as last fetched ([] if never), refreshing in the background when stale."""
+        if not self._loaded:
+            self._load()
+
+        now = time.time()
+        if now - self._fetched_at > self.ttl and now - self._failed_at > self.retry_after:
+            self._start_refresh()
+        return self._banks or []
+
+    def refresh(self):
+        """Fetches the list now; returns True if it was replaced."""
+        try:
+            banks = self.fetch()
+        except Exception as e:
+            self._failed_at = time.time()
+            print(f"Bank list refresh failed: {e}")
+            return False
+        if not banks:
+            self._failed_at = time.time()
+            return False
+
+        fetched_at = time.time()
+        with self._lock:
+            self._banks, self._fetched_at, self._loaded = banks, fetched_at, True
+        self._save(banks, fetched_at)
+        return True
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path) as fh:
+                    saved = json.load(fh)
+                self._banks, self._fetched_at = saved["banks"], saved["fetched_at"]
+            except (OSError, ValueError, KeyError, TypeError):
+                pass  # nothing saved yet, or unreadable: the first refresh rewrites it
+            self._loaded = True
+
+    def _save(self, banks, fetched_at):
+        # write then rename, so a crash or a concurrent reader never sees half a file
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as fh:
+                json.dump({"fetched_at": fetched_at, "banks": banks}, fh)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Bank list not saved to {self.path}: {e}")
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.refresh, name="bank-list-refresh", daemon=True)
+            self._thread.start()
@@ -0,0 +1,134 @@
+"""
+Analytics micro-benchmarks.
+
+Times the analytics helpers and the analytics/admin/vendor route
+handlers against deterministic synthetic databases at several scales
+and records median time and SQL query count per call.
+
+    python benchmarks/bench_analytics.py                       # 10k, 100k orders
+    python benchmarks/bench_analytics.py --scales 10000,1000000
+    python benchmarks/bench_analytics.py --compare old.json new.json
+
+Datasets are cached under benchmarks/data/; results are written as JSON
+to benchmarks/results/analytics-<commit>.json unless --output is given.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from common import compare_results, default_output, measure, run_scales, use_database, write_results
+from dataset import build_dataset, dataset_path
+
+DEFAULT_SCALES = "10000,100000"
+
+
+def bench_scale(scale, seed, repeat):
+    use_database(dataset_path(scale, seed))
+    build_dataset(scale, seed)
+
+    import app as app_module
+    from app import app, db
+    from models import VendorStats
+    import analytics
+    from revenue_explorer import explore_revenue
+
+    today = datetime.now().date()
+
+    results = []
+
+    with app.app_context():
+        engine = db.engine
+
+    def record(name, fn, kind, after=None):
+        row = measure(fn, engine, repeat=repeat, after=after)
+        row.update(scale=scale, name=name, kind=kind)
+        results.append(row)
+        print(f"  {scale:>8} {name:<40} {row['median_ms']:>10.2f} ms  {row['queries']:>4} queries")
+
+    helpers = {
+        "get_daily_revenue": lambda: analytics.get_daily_revenue(7),
+        "get_weekly_revenue": lambda: analytics.get_weekly_revenue(4),
+        "get_monthly_revenue": lambda: analytics.get_monthly_revenue(12),
+        "get_yearly_revenue": analytics.get_yearly_revenue,
+        "get_food_combo_matrix": lambda: analytics.get_food_combo_matrix(top_n=8),
+        "get_food_combo_matrix(days=30)": lambda: analytics.get_food_combo_matrix(top_n=8, days=30),
+        "get_food_popularity": analytics.get_food_popularity,
+        "get_vendor_popularity": analytics.get_vendor_popularity,
+        "get_kpis": analytics.get_kpis,
+        "build_analytics_payload": app_module.build_analytics_payload,
+        "explore_revenue(30 days)": lambda: explore_revenue(today - timedelta(days=29), today),
+        "explore_revenue(365 days)": lambda: explore_revenue(today - timedelta(days=364), today),
+    }
+
+    with app.app_context():
+        for name, fn in helpers.items():
+            record(name, fn, "helper", after=db.session.remove)
+
+        top_vendor = db.session.query(VendorStats.vendor_id).order_by(
+            VendorStats.order_count.desc()
+        ).limit(1).scalar()
+
+    # Routes run outside any app context, like real requests: each gets
+    # its own context (and its own current_user).
+    def client_for(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+        return client
+
+    admin, vendor = client_for(1), client_for(top_vendor)
+
+    routes = {
+        "GET /analytics": (admin, "/analytics"),
+        "GET /api/analytics/vendors": (admin, "/api/analytics/vendors"),
+        "GET /admin/admin_dashboard": (admin, "/admin/admin_dashboard"),
+        "GET /vendor/dashboard": (vendor, "/vendor/dashboard"),
+        "GET /vendor/analytics": (vendor, "/vendor/analytics"),
+    }
+
+    for name, (client, path) in routes.items():
+        def call(client=client, path=path):
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+        record(name, call, "route")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma separated order counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/analytics-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    if args.scale:
+        rows = bench_scale(args.scale, args.seed, args.repeat)
+        with open(args.child_output, "w") as fh:
+            json.dump(rows, fh)
+        return
+
+    scales = [int(s) for s in args.scales.split(",")]
+    results = run_scales(
+        os.path.abspath(__file__), scales,
+        ["--seed", str(args.seed), "--repeat", str(args.repeat)]
+    )
+    path = write_results(
+        args.output or default_output("analytics"), "analytics", results,
+        seed=args.seed, scales=scales
+    )
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
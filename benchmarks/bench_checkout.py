@@ -0,0 +1,120 @@
+"""
+Checkout throughput benchmark.
+
+Places orders with 1 to 20 line items through the real place_order and
+confirm_order views (test client, no network: the order stops at the
+payment page) against a fresh database holding one vendor with a
+20-item menu, and reports median latency, queries and orders per second
+for each cart size.
+
+    python benchmarks/bench_checkout.py
+    python benchmarks/bench_checkout.py --lines 1,2,5,10,20 --repeat 200
+    python benchmarks/bench_checkout.py --compare old.json new.json
+
+Results are written as JSON to benchmarks/results/checkout-<commit>.json
+unless --output is given.
+"""
+import argparse
+import os
+import re
+import sys
+
+from common import DATA_DIR, compare_results, default_output, measure, use_database, write_results
+
+DB_PATH = os.path.join(DATA_DIR, "checkout.db")
+MENU_SIZE = 20
+
+
+def setup():
+    """Fresh database with one vendor, one student and a MENU_SIZE menu."""
+    from app import app, db
+    from models import User, Food, FoodCategory
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        vendor = User(role="vendor", business_name="Bench Kitchen", email="vendor@bench",
+                      password="x", latitude=6.52, longitude=3.39, delivery_fee_km=200)
+        student = User(role="student", name="Bench Student", email="student@bench", password="x")
+        category = FoodCategory(name="Main Dish")
+        db.session.add_all([vendor, student, category])
+        db.session.flush()
+        db.session.add_all(
+            Food(name=f"Food {i}", price=100 + 50 * i, vendor_id=vendor.id, category_id=category.id)
+            for i in range(MENU_SIZE)
+        )
+        db.session.commit()
+        food_ids = [food.id for food in Food.query.order_by(Food.id)]
+        engine = db.engine
+        return vendor.id, student.id, food_ids, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", default="1,5,10,20", help="comma separated line item counts (max 20)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/checkout-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    use_database(DB_PATH)
+
+    from app import app
+    vendor_id, student_id, food_ids, engine = setup()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(student_id)
+
+    results = []
+    for lines in [int(n) for n in args.lines.split(",")]:
+        form = {
+            "vendor_id": vendor_id,
+            "customer_latitude": "6.5301",
+            "customer_longitude": "3.3795",
+            # two of each so quantities are exercised too
+            **{f"quantity_{food_id}": "2" for food_id in food_ids[:lines]},
+        }
+
+        def place():
+            response = client.post("/order/place", data=form)
+            assert response.status_code == 200, response.status_code
+            return re.search(r'name="quote" value="([^"]+)"', response.get_data(as_text=True)).group(1)
+
+        def confirm(quote):
+            response = client.post("/order/confirm", data={"quote": quote})
+            assert response.status_code == 302, response.status_code
+
+        quote = place()
+        steps = {
+            "place_order": place,
+            "confirm_order": lambda: confirm(quote),
+            "checkout": lambda: confirm(place()),
+        }
+        for step, fn in steps.items():
+            row = measure(fn, engine, repeat=args.repeat)
+            row.update(
+                name=f"{step} ({lines} items)",
+                lines=lines,
+                orders_per_second=round(1000 / row["median_ms"], 1),
+            )
+            results.append(row)
+            print(
+                f"  {row['name']:<26} {row['median_ms']:>8.2f} ms  {row['queries']:>3} queries  "
+                f"{row['orders_per_second']:>8.1f} /s"
+            )
+
+    path = write_results(args.output or default_output("checkout"), "checkout", results,
+                         repeat=args.repeat)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
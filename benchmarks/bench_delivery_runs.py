@@ -0,0 +1,83 @@
+"""
+Delivery run planner benchmark.
+
+Plans runs for one vendor with 50 to 1000 ready orders spread over a
+campus (about 6 km across, drop-offs clustered around hostels, waits up
+to an hour) and reports planning time, the number of runs and the
+average stops per run.
+
+    python benchmarks/bench_delivery_runs.py
+    python benchmarks/bench_delivery_runs.py --orders 100,500,2000 --repeat 20
+    python benchmarks/bench_delivery_runs.py --compare old.json new.json
+
+Results are written as JSON to benchmarks/results/delivery_runs-<commit>.json
+unless --output is given.
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from common import compare_results, default_output, measure, write_results
+
+CAMPUS = (6.52, 3.39)
+
+
+def build_orders(count, seed, now):
+    rnd = random.Random(seed)
+    hostels = [(CAMPUS[0] + rnd.uniform(-0.03, 0.03), CAMPUS[1] + rnd.uniform(-0.03, 0.03))
+               for _ in range(30)]
+    orders = []
+    for i in range(count):
+        lat, lng = rnd.choice(hostels)
+        orders.append(SimpleNamespace(
+            id=i + 1,
+            customer_latitude=lat + rnd.gauss(0, 0.002),
+            customer_longitude=lng + rnd.gauss(0, 0.002),
+            order_date=now - timedelta(minutes=rnd.uniform(0, 60)),
+        ))
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", default="50,100,300,1000", help="comma separated ready order counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/delivery_runs-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    from delivery_runs import plan_runs
+
+    vendor = SimpleNamespace(latitude=CAMPUS[0], longitude=CAMPUS[1])
+    now = datetime.utcnow()
+
+    results = []
+    for count in [int(n) for n in args.orders.split(",")]:
+        orders = build_orders(count, args.seed, now)
+        row = measure(lambda: plan_runs(vendor, orders, now), repeat=args.repeat)
+        runs = plan_runs(vendor, orders, now)
+        row.update(
+            name=f"plan_runs ({count} orders)",
+            orders=count,
+            runs=len(runs),
+            stops_per_run=round(count / len(runs), 2),
+            route_km_mean=round(sum(run["route_km"] for run in runs) / len(runs), 2),
+        )
+        results.append(row)
+        print(f"  {row['name']:<26} {row['median_ms']:>8.2f} ms  {row['runs']:>4} runs  "
+              f"{row['stops_per_run']:>5.2f} stops/run  {row['route_km_mean']:>5.2f} km/run")
+
+    path = write_results(args.output or default_output("delivery_runs"), "delivery_runs", results,
+                         seed=args.seed, repeat=args.repeat)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Distance engine benchmark.
+
+Times each DISTANCE_ENGINE mode on a deterministic campus-sized workload
+(vendors and customers within about 10 km, each order quoted twice, at
+review and at confirm) and reports per-call latency and how far its
+transportation fees deviate from the exact geodesic ones.
+
+    python benchmarks/bench_distance.py
+    python benchmarks/bench_distance.py --orders 20000 --fee-km 250
+    python benchmarks/bench_distance.py --compare old.json new.json
+
+Results are written as JSON to benchmarks/results/distance-<commit>.json
+unless --output is given.
+"""
+import argparse
+import random
+import sys
+from types import SimpleNamespace
+
+from common import compare_results, default_output, measure, write_results
+
+CAMPUS = (6.52, 3.39)
+
+
+def build_workload(orders, vendors, seed):
+    rnd = random.Random(seed)
+    vendor_rows = [
+        SimpleNamespace(id=i + 1,
+                        latitude=CAMPUS[0] + rnd.uniform(-0.03, 0.03),
+                        longitude=CAMPUS[1] + rnd.uniform(-0.03, 0.03))
+        for i in range(vendors)
+    ]
+    # customers cluster around a few dozen hostels and faculties
+    spots = [(CAMPUS[0] + rnd.uniform(-0.06, 0.06), CAMPUS[1] + rnd.uniform(-0.06, 0.06))
+             for _ in range(40)]
+    pairs = []
+    for _ in range(orders):
+        lat, lng = rnd.choice(spots)
+        pairs.append((rnd.choice(vendor_rows), lat + rnd.gauss(0, 0.0005), lng + rnd.gauss(0, 0.0005)))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--fee-km", type=float, default=200, help="delivery rate used for fee deviation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/distance-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    from geo import DISTANCE_ENGINES, _cell_distance_km
+
+    pairs = build_workload(args.orders, args.vendors, args.seed)
+    calls = 2 * len(pairs)
+
+    exact = [DISTANCE_ENGINES["exact"](vendor, lat, lng) for vendor, lat, lng in pairs]
+
+    runs = [(mode, mode, None) for mode in DISTANCE_ENGINES]
+    # cold: the LRU cache is emptied before every timed run
+    runs.append(("memoized (cold)", "memoized", _cell_distance_km.cache_clear))
+
+    results = []
+    for name, mode, after in runs:
+        distance = DISTANCE_ENGINES[mode]
+
+        def run():
+            for vendor, lat, lng in pairs:
+                distance(vendor, lat, lng)  # order review
+                distance(vendor, lat, lng)  # order confirm
+
+        _cell_distance_km.cache_clear()
+        row = measure(run, repeat=args.repeat, after=after)
+
+        fee_errors = [
+            abs(distance(vendor, lat, lng) - reference) * args.fee_km
+            for (vendor, lat, lng), reference in zip(pairs, exact)
+        ]
+        relative = [
+            abs(distance(vendor, lat, lng) - reference) / reference
+            for (vendor, lat, lng), reference in zip(pairs, exact) if reference > 0
+        ]
+        row.update(
+            name=name,
+            per_call_us=round(row["median_ms"] * 1000 / calls, 3),
+            fee_error_mean=round(sum(fee_errors) / len(fee_errors), 3),
+            fee_error_max=round(max(fee_errors), 3),
+            relative_error_max_pct=round(100 * max(relative), 4),
+            cache=_cell_distance_km.cache_info()._asdict() if mode == "memoized" else None,
+        )
+        results.append(row)
+        print(
+            f"  {name:<18} {row['per_call_us']:>9.2f} us/call   "
+            f"fee error mean ₦{row['fee_error_mean']:.2f} max ₦{row['fee_error_max']:.2f}   "
+            f"max {row['relative_error_max_pct']:.3f}%"
+        )
+
+    path = write_results(
+        args.output or default_output("distance"), "distance", results,
+        orders=args.orders, vendors=args.vendors, fee_km=args.fee_km, seed=args.seed
+    )
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
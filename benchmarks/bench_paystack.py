@@ -0,0 +1,177 @@
+"""
+Paystack client benchmark, against the local stand-in (paystack_stub.py).
+
+Resolves --calls account numbers the old way, a bare requests.get per
+call (a new connection each time), and through the pooled client, at
+each simulated Paystack latency; then with --fail-rate of responses
+failing, how many calls succeed with and without retries; then during
+an outage, how long a call takes once the circuit breaker is open.
+Finally it renders the vendor settings page with the bank list fetched
+on every request, as before the bank list cache, and from the cache,
+with Paystack answering in --page-latency-ms.
+
+    python benchmarks/bench_paystack.py
+    python benchmarks/bench_paystack.py --latency-ms 0,20,100 --calls 500
+    python benchmarks/bench_paystack.py --compare old.json new.json
+
+Results are written as JSON to benchmarks/results/paystack-<commit>.json
+unless --output is given.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+from common import DATA_DIR, compare_results, default_output, use_database, write_results
+from paystack_stub import StubPaystack
+
+ACCOUNT = "0123456789"
+BANK = "058"
+
+
+def timed_calls(fn, calls):
+    """Per-call timings (ms) and successes of `calls` calls to `fn`."""
+    timings, ok = [], 0
+    for _ in range(calls):
+        started = time.perf_counter()
+        try:
+            ok += bool(fn().get("status"))
+        except Exception:
+            pass
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, ok
+
+
+def row(name, timings, ok, connections, **extra):
+    timings = sorted(timings)
+    return {
+        "name": name,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "repeat": len(timings),
+        "queries": 0,
+        "succeeded": ok,
+        "connections": connections,
+        **extra,
+    }
+
+
+def settings_page(args):
+    """Vendor settings page timings without and with the bank list cache."""
+    stub = StubPaystack(port=0, latency_ms=args.page_latency_ms, seed=args.seed).start()
+    os.environ["PAYSTACK_BASE_URL"] = stub.base_url
+    os.environ["BANK_LIST_PATH"] = os.path.join(DATA_DIR, "paystack_banks.json")
+    os.makedirs(DATA_DIR, exist_ok=True)
+    use_database(os.path.join(DATA_DIR, "paystack.db"))
+    if os.path.exists(os.environ["BANK_LIST_PATH"]):
+        os.remove(os.environ["BANK_LIST_PATH"])
+
+    import app as seamless
+    from models import User
+
+    with seamless.app.app_context():
+        seamless.db.drop_all()
+        seamless.db.create_all()
+        vendor = User(role="vendor", name="Bench Vendor", email="vendor@bench.test", password="x",
+                      business_name="Bench Kitchen", bank_code="058", bank_name="Guaranty Trust Bank")
+        seamless.db.session.add(vendor)
+        seamless.db.session.commit()
+        vendor_id = vendor.id
+
+    client = seamless.app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(vendor_id)
+
+    def render():
+        response = client.get("/vendor/settings")
+        assert response.status_code == 200, response.status_code
+        return {"status": b"Guaranty Trust Bank" in response.data}
+
+    cached = seamless.list_banks
+    results = []
+    for name, list_banks in (("uncached", seamless.fetch_banks), ("cached", cached)):
+        seamless.list_banks = list_banks
+        before = stub.requests
+        if list_banks is cached:
+            seamless.bank_list.refresh()  # what the first render kicks off in the background
+        render()
+        timings, ok = timed_calls(render, args.calls)
+        results.append(row(f"vendor settings page, {name} @ {args.page_latency_ms:g} ms", timings, ok,
+                           stub.connections, requests=stub.requests - before))
+    seamless.list_banks = cached
+    stub.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", default="0,20", help="comma separated simulated Paystack latencies")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--fail-rate", type=float, default=0.2)
+    parser.add_argument("--page-latency-ms", type=float, default=150,
+                        help="simulated Paystack latency for the settings page runs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/paystack-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    from paystack_client import PaystackClient, CircuitBreaker
+
+    def bare(stub):
+        # what app.py did before the client: no session, no timeout
+        return lambda: requests.get(
+            f"{stub.base_url}/bank/resolve",
+            params={"account_number": ACCOUNT, "bank_code": BANK},
+            headers={"Authorization": "Bearer sk_test"}
+        ).json()
+
+    def pooled(stub, **kwargs):
+        client = PaystackClient("sk_test", base_url=stub.base_url, backoff=0.01, **kwargs)
+        return lambda: client.resolve_account(ACCOUNT, BANK)
+
+    results = []
+    for latency in [float(x) for x in args.latency_ms.split(",")]:
+        for method, make in (("requests.get", bare), ("client", pooled)):
+            stub = StubPaystack(port=0, latency_ms=latency, seed=args.seed).start()
+            timings, ok = timed_calls(make(stub), args.calls)
+            results.append(row(f"resolve {method} @ {latency:g} ms", timings, ok, stub.connections))
+            stub.stop()
+
+    for method, make in (("requests.get", bare),
+                         ("client, no retries", lambda stub: pooled(stub, retries=0,
+                                                                    breaker=CircuitBreaker(threshold=10**9))),
+                         ("client, 2 retries", lambda stub: pooled(stub, breaker=CircuitBreaker(threshold=10**9)))):
+        stub = StubPaystack(port=0, fail_rate=args.fail_rate, seed=args.seed).start()
+        timings, ok = timed_calls(make(stub), args.calls)
+        results.append(row(f"resolve {method} @ {args.fail_rate:.0%} failing", timings, ok, stub.connections,
+                           requests=stub.requests))
+        stub.stop()
+
+    for method, make in (("requests.get", bare), ("client", pooled)):
+        stub = StubPaystack(port=0, latency_ms=20, fail_rate=1.0, seed=args.seed).start()
+        timings, ok = timed_calls(make(stub), args.calls)
+        results.append(row(f"resolve {method} during outage", timings, ok, stub.connections,
+                           requests=stub.requests))
+        stub.stop()
+
+    results += settings_page(args)
+
+    for r in results:
+        print(f"  {r['name']:<48} p50 {r['median_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  "
+              f"{r['succeeded']:>4}/{r['repeat']} ok  {r['connections']:>4} connections")
+
+    path = write_results(args.output or default_output("paystack"), "paystack", results,
+                         calls=args.calls, fail_rate=args.fail_rate, seed=args.seed)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Receipt rendering benchmark.
+
+Renders a five-item receipt with a 1600x1600 vendor logo (a typical
+phone photo upload) and reports the time per receipt and PDF size as
+generate_receipt() built it inline (stylesheet rebuilt, full logo file
+embedded), with cold caches (logo decoded and downscaled) and with warm
+per-process caches, then receipts per second through a process pool of
+each --workers size, per worker process and so per core when there are
+at least that many cores.
+
+    python benchmarks/bench_receipts.py
+    python benchmarks/bench_receipts.py --workers 1,2,4,8 --count 400
+    python benchmarks/bench_receipts.py --compare old.json new.json
+
+Results are written as JSON to benchmarks/results/receipts-<commit>.json
+unless --output is given.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import DATA_DIR, compare_results, default_output, measure, write_results
+
+ITEMS = [("Jollof Rice", 1500), ("Fried Plantain", 500), ("Chicken", 1200), ("Zobo", 300), ("Moi Moi", 600)]
+
+
+def make_logo(path, size=1600, seed=42):
+    from PIL import Image
+    rnd = random.Random(seed)
+    img = Image.new("RGB", (size, size))
+    img.putdata([(x % 256, (x // size) % 256, rnd.randrange(256)) for x in range(size * size)])
+    img.save(path, "JPEG", quality=90)
+
+
+def snapshot(order_id, logo_path):
+    items = [(name, 2, price, 2 * price) for name, price in ITEMS]
+    return {
+        "order_id": order_id,
+        "date": "2026-10-18 12:30",
+        "vendor_name": "Mama Put Kitchen",
+        "logo_path": logo_path,
+        "transaction_ref": f"ORD_{order_id}_1792342139",
+        "items": items,
+        "transportation_fee": 350.0,
+        "total": sum(item[3] for item in items) + 350.0,
+    }
+
+
+def legacy_render(data, path):
+    """The receipt as generate_receipt() built it before receipts.py: fresh styles, logo file embedded as is."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+
+    styles = getSampleStyleSheet()
+    elements = [
+        Paragraph("SEAMLESS Receipt", styles["Title"]),
+        Paragraph("Food Order Receipt", styles["Normal"]),
+        Spacer(1, 10),
+        Paragraph(f"Vendor: {data['vendor_name']}", styles["Normal"]),
+        Image(data["logo_path"], width=80, height=80),
+        Spacer(1, 10),
+        Paragraph(f"Order ID: {data['order_id']}", styles["Normal"]),
+        Paragraph(f"Date: {data['date']}", styles["Normal"]),
+        Paragraph(f"Vendor: {data['vendor_name']}", styles["Normal"]),
+        Paragraph(f"Transaction Ref: {data['transaction_ref']}", styles["Normal"]),
+        Spacer(1, 10),
+    ]
+    rows = [["Item", "Qty", "Price (₦)", "Subtotal (₦)"]]
+    rows += [[name, str(qty), f"{price:.2f}", f"{subtotal:.2f}"] for name, qty, price, subtotal in data["items"]]
+    rows.append(["", "", "Total", f"{data['total']:.2f}"])
+    table = Table(rows, hAlign="LEFT")
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.darkgreen),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ]))
+    elements += [table, Spacer(1, 20), Paragraph("Thank you for ordering with CampusEats!", styles["Italic"])]
+    SimpleDocTemplate(path).build(elements)
+    return path
+
+
+def uncached_render(data, path):
+    from receipts import clear_caches, render_receipt
+    clear_caches()
+    return render_receipt(data, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})),
+                        help="comma separated pool sizes")
+    parser.add_argument("--count", type=int, default=200, help="receipts per pool run")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/receipts-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    from receipts import render_receipt
+
+    workdir = os.path.join(DATA_DIR, "receipts")
+    os.makedirs(workdir, exist_ok=True)
+    logo = os.path.join(workdir, "logo.jpg")
+    if not os.path.exists(logo):
+        make_logo(logo)
+    path = os.path.join(workdir, "receipt_bench.pdf")
+    data = snapshot(1, logo)
+
+    results = []
+    for name, render in (("render, before (inline)", legacy_render),
+                         ("render, cold caches", uncached_render),
+                         ("render, cached", render_receipt)):
+        row = measure(lambda: render(data, path), repeat=args.repeat)
+        row.update(name=name, bytes=os.path.getsize(path))
+        results.append(row)
+
+    for workers in [int(n) for n in args.workers.split(",")]:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # start every worker and fill its caches before timing
+            list(pool.map(render_receipt, [data] * workers, [path + f".warm{i}" for i in range(workers)]))
+            started = time.perf_counter()
+            list(pool.map(render_receipt,
+                          [snapshot(i, logo) for i in range(args.count)],
+                          [os.path.join(workdir, f"receipt_{i % 50}.pdf") for i in range(args.count)]))
+            seconds = time.perf_counter() - started
+        results.append({
+            "name": f"pool of {workers}",
+            "median_ms": round(seconds * 1000 / args.count, 3),
+            "repeat": args.count,
+            "queries": 0,
+            "per_second": round(args.count / seconds, 1),
+            "per_worker_per_second": round(args.count / seconds / workers, 1),
+            "cores": os.cpu_count(),
+        })
+
+    for r in results:
+        extra = r.get("per_second") and f"{r['per_second']:>7.1f}/s  {r['per_worker_per_second']:>6.1f}/s per worker"
+        size = f"{r['bytes'] // 1024:>6} KB" if "bytes" in r else ""
+        print(f"  {r['name']:<26} {r['median_ms']:>8.2f} ms/receipt  {size}{extra or ''}")
+
+    path = write_results(args.output or default_output("receipts"), "receipts", results,
+                         count=args.count, repeat=args.repeat, cores=os.cpu_count())
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Search benchmark.
+
+Fills a fresh database with --rows users and --rows foods (names drawn
+from small word lists, so common words match thousands of rows) and
+times each admin search the old way, a leading-wildcard ilike scan,
+against the full-text index, plus the student catalogue search.
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --rows 1000000 --repeat 10
+    python benchmarks/bench_search.py --compare old.json new.json
+
+Results are written as JSON to benchmarks/results/search-<commit>.json
+unless --output is given.
+"""
+import argparse
+import os
+import random
+import sys
+
+from common import DATA_DIR, compare_results, default_output, measure, use_database, write_results
+
+FIRST_NAMES = ["Chidinma", "Tunde", "Aisha", "Emeka", "Ngozi", "Bola", "Ifeanyi", "Kemi",
+               "Musa", "Funmi", "Obinna", "Zainab", "Segun", "Amaka", "Yusuf", "Tolu"]
+LAST_NAMES = ["Okafor", "Adeyemi", "Bello", "Eze", "Balogun", "Nwosu", "Ibrahim", "Ojo",
+              "Okeke", "Adebayo", "Lawal", "Obi", "Afolabi", "Umar", "Chukwu", "Alade"]
+BUSINESS_WORDS = ["Mama", "Kitchen", "Buka", "Grill", "Delight", "Chops", "Place", "Spot",
+                  "Express", "Cuisine", "Bites", "Corner"]
+HALLS = ["Moremi Hall", "Jaja Hall", "Eni Njoku Hall", "Fagunwa Hall", "Akoka", "Yaba"]
+FOODS = {
+    "Main Dish": ["Jollof Rice", "Fried Rice", "White Rice", "Spaghetti", "Beans", "Yam Porridge",
+                  "Ofada Rice", "Noodles", "Eba", "Pounded Yam", "Amala", "Semo"],
+    "Sauce": ["Tomato Stew", "Ofada Sauce", "Egusi", "Vegetable Soup", "Pepper Soup", "Okro"],
+    "Topping": ["Chicken", "Beef", "Fish", "Boiled Egg", "Plantain", "Moi Moi", "Coleslaw"],
+    "Drink": ["Coke", "Fanta", "Water", "Malt", "Zobo", "Chapman"],
+}
+VENDOR_SHARE = 0.02
+
+# (label, search text) per table, each timed with ilike and with the index
+QUERIES = {
+    "users": [
+        ("common word", "okafor"),
+        ("two words", "mama kitchen"),
+        ("email", "tunde.okafor12"),
+        ("no match", "shawarma"),
+    ],
+    "foods": [
+        ("common word", "jollof"),
+        ("rare prefix", "chapm"),
+        ("two words", "pepper soup"),
+        ("no match", "shawarma"),
+    ],
+}
+STUDENT_QUERIES = ["jollof", "jol ric", "mama", "pepper soup", "shawarma"]
+
+
+def setup(db_path, rows, seed):
+    from sqlalchemy import insert
+    from app import app, db
+    from models import User, Food, FoodCategory
+
+    rnd = random.Random(seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        users = []
+        for i in range(rows):
+            first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            vendor = rnd.random() < VENDOR_SHARE
+            users.append({
+                "role": "vendor" if vendor else "student",
+                "name": f"{first} {last}",
+                "email": f"{first}.{last}{i}@unilag.edu.ng".lower(),
+                "password": "x",
+                "business_name": " ".join(rnd.sample(BUSINESS_WORDS, 2)) if vendor else None,
+                "address": rnd.choice(HALLS) if vendor else None,
+            })
+        db.session.execute(insert(User), users)
+
+        categories = {name: FoodCategory(name=name) for name in FOODS}
+        db.session.add_all(categories.values())
+        db.session.flush()
+
+        vendor_ids = [id for (id,) in db.session.query(User.id).filter_by(role="vendor")]
+        foods = []
+        for _ in range(rows):
+            category = rnd.choice(list(FOODS))
+            foods.append({
+                "name": rnd.choice(FOODS[category]),
+                "price": rnd.randrange(200, 3000, 50),
+                "vendor_id": rnd.choice(vendor_ids),
+                "category_id": categories[category].id,
+                "availability": rnd.random() < 0.9,
+            })
+        db.session.execute(insert(Food), foods)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="users and foods each")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/search-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    db_path = os.path.join(DATA_DIR, f"search-{args.rows}-s{args.seed}.db")
+    os.makedirs(DATA_DIR, exist_ok=True)
+    use_database(db_path)
+
+    from sqlalchemy import or_
+    from app import app, db
+    from models import User, Food
+    from search import foods_matching, users_matching, search_catalogue
+
+    if not os.path.exists(db_path):
+        print(f"Building {args.rows} users and foods ...")
+        setup(db_path, args.rows, args.seed)
+
+    def ilike_users(text):
+        like = f"%{text}%"
+        return or_(User.name.ilike(like), User.business_name.ilike(like), User.email.ilike(like))
+
+    lookups = {
+        "users": (User, ilike_users, users_matching),
+        "foods": (Food, lambda text: Food.name.ilike(f"%{text}%"), foods_matching),
+    }
+
+    results = []
+    with app.app_context():
+        engine = db.engine
+        for table, (model, ilike, fts) in lookups.items():
+            for label, text in QUERIES[table]:
+                for method, where in (("ilike", ilike), ("fts", fts)):
+                    # the admin list pages load every match, newest first
+                    def run():
+                        return db.session.query(model.id).filter(where(text)).order_by(model.id.desc()).all()
+
+                    row = measure(run, engine, repeat=args.repeat, after=db.session.expunge_all)
+                    row.update(name=f"{table} {method}: {label}", matches=len(run()))
+                    results.append(row)
+
+        for text in STUDENT_QUERIES:
+            row = measure(lambda: search_catalogue(text), engine, repeat=args.repeat)
+            foods, vendors = search_catalogue(text)
+            row.update(name=f"student search: {text}", matches=len(foods) + len(vendors))
+            results.append(row)
+
+    for row in results:
+        print(f"  {row['name']:<34} {row['median_ms']:>9.2f} ms  {row['queries']:>2} queries  "
+              f"{row['matches']:>6} results")
+
+    path = write_results(args.output or default_output("search"), "search", results,
+                         rows=args.rows, seed=args.seed, repeat=args.repeat)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
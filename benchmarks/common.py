@@ -0,0 +1,148 @@
+"""
+Shared helpers for the benchmark scripts: pointing the app at a
+benchmark database, timing callables with query counts, and writing
+results as JSON that can be compared between commits.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+
+sys.path.insert(0, ROOT_DIR)
+
+
+def use_database(db_path):
+    """Must run before `import app`: the engine is bound at import time."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class QueryCounter:
+    """Counts SQL statements sent through the engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def measure(fn, engine=None, repeat=5, warmup=1, after=None):
+    """
+    Times `fn` `repeat` times after `warmup` untimed calls, counting the
+    queries it sends through `engine` if given. `after` runs between
+    calls (e.g. to reset the session) outside the timing.
+    """
+    for _ in range(warmup):
+        fn()
+        if after:
+            after()
+
+    timings, queries = [], 0
+    for _ in range(repeat):
+        with QueryCounter(engine) if engine is not None else nullcontext() as counter:
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = counter.count if counter else 0
+        if after:
+            after()
+
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "repeat": repeat,
+        "queries": queries,
+    }
+
+
+def default_output(suite):
+    return os.path.join(BENCH_DIR, "results", f"{suite}-{git_commit()}.json")
+
+
+def write_results(path, suite, results, **meta):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        "suite": suite,
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **meta,
+        "results": results,
+    }
+    with open(path, "w") as fh:
+        json.dump(payload, fh, indent=2)
+    return path
+
+
+def compare_results(old_path, new_path):
+    """Prints median time and query count changes between two result files."""
+    with open(old_path) as fh:
+        old = json.load(fh)
+    with open(new_path) as fh:
+        new = json.load(fh)
+
+    key = lambda r: (r.get("scale"), r["name"])
+    old_rows = {key(r): r for r in old["results"]}
+
+    print(f"{old['commit']} -> {new['commit']}")
+    for row in new["results"]:
+        before = old_rows.get(key(row))
+        if not before:
+            print(f"  {row.get('scale')!s:>8} {row['name']}: new ({row['median_ms']} ms)")
+            continue
+        ratio = row["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        print(
+            f"  {row.get('scale')!s:>8} {row['name']}: "
+            f"{before['median_ms']} -> {row['median_ms']} ms ({ratio:.2f}x), "
+            f"queries {before['queries']} -> {row['queries']}"
+        )
+
+
+def run_scales(script, scales, extra_args=()):
+    """
+    Runs `script --scale N` in a fresh interpreter per scale (the app can
+    only be bound to one database per process) and collects the rows each
+    child writes to its --child-output file.
+    """
+    results = []
+    for scale in scales:
+        out = os.path.join(DATA_DIR, f".child-{os.getpid()}-{scale}.json")
+        os.makedirs(DATA_DIR, exist_ok=True)
+        subprocess.run(
+            [sys.executable, script, "--scale", str(scale), "--child-output", out, *extra_args],
+            check=True
+        )
+        with open(out) as fh:
+            results.extend(json.load(fh))
+        os.remove(out)
+    return results
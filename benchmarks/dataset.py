@@ -0,0 +1,194 @@
+"""
+Deterministic synthetic dataset for benchmarks. The same (orders, seed)
+always produces the same database, so timings are comparable between
+commits.
+
+Shape: a few hundred vendors with Zipf-like popularity, each selling a
+handful of foods per category; orders spread over two years with a lunch
+peak, one main dish each plus optional sauce, topping and drink; most
+orders paid and delivered, some still pending; about a third rated.
+Dates are relative to the day the dataset is built, so the "last 7
+days" style charts always have data.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+from common import DATA_DIR, use_database
+
+CATALOGUE = {
+    "Main Dish": ["Jollof Rice", "Fried Rice", "White Rice", "Spaghetti", "Beans",
+                  "Yam Porridge", "Ofada Rice", "Noodles", "Eba", "Pounded Yam"],
+    "Sauce": ["Tomato Stew", "Ofada Sauce", "Egusi", "Vegetable Soup", "Pepper Soup", "Okro"],
+    "Topping": ["Chicken", "Beef", "Fish", "Boiled Egg", "Plantain", "Moi Moi", "Pork", "Coleslaw"],
+    "Drink": ["Coke", "Fanta", "Water", "Malt", "Zobo", "Chapman"],
+}
+
+# probability an order includes each non-main category
+EXTRA_CATEGORY_ODDS = {"Sauce": 0.7, "Topping": 0.6, "Drink": 0.5}
+
+STATUS_WEIGHTS = {"pending": 10, "paid": 15, "accepted": 5, "ready": 5, "delivered": 65}
+
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 1, 2, 4, 5, 6, 10, 16, 18, 12, 7, 6, 8, 10, 8, 5, 3, 1, 0]
+
+BATCH = 50000
+
+
+def dataset_path(orders, seed=42):
+    return os.path.join(DATA_DIR, f"bench-{orders}-s{seed}.db")
+
+
+def _zipf_weights(n, s=0.9):
+    return [1 / (rank + 1) ** s for rank in range(n)]
+
+
+def _insert(db, model, rows):
+    from sqlalchemy import insert
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(insert(model), rows[start:start + BATCH])
+
+
+def build_dataset(orders, seed=42):
+    """
+    Creates and fills the benchmark database for `orders` orders unless
+    it already exists, then rebuilds every aggregate. Call after
+    use_database(dataset_path(...)) and before timing anything.
+    """
+    from app import app, db
+    from models import User, Food, FoodCategory, Order, OrderItem, Payment, Rating
+
+    path = dataset_path(orders, seed)
+    if os.path.exists(path + ".ok"):
+        return path
+    if os.path.exists(path):
+        os.remove(path)  # left over from an interrupted build
+
+    rnd = random.Random(seed)
+    now = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(hours=12)
+
+    n_vendors = max(10, min(300, orders // 2000))
+    n_students = max(50, orders // 20)
+
+    with app.app_context():
+        db.create_all()
+
+        users = [{"id": 1, "role": "admin", "name": "Admin", "email": "admin@bench",
+                  "password": "x", "is_active": True}]
+        vendor_ids = []
+        for i in range(n_vendors):
+            uid = len(users) + 1
+            vendor_ids.append(uid)
+            users.append({
+                "id": uid, "role": "vendor", "business_name": f"Vendor {i:03d} Kitchen",
+                "email": f"vendor{i}@bench", "password": "x", "is_active": True,
+                "address": f"{rnd.randint(1, 200)} Campus Road",
+                "latitude": 6.52 + rnd.uniform(-0.03, 0.03),
+                "longitude": 3.39 + rnd.uniform(-0.03, 0.03),
+                "delivery_fee_km": rnd.choice([100, 150, 200, 250]),
+                "subaccount_code": f"ACCT_{i}", "account_verified": True,
+            })
+        student_ids = []
+        for i in range(n_students):
+            uid = len(users) + 1
+            student_ids.append(uid)
+            users.append({"id": uid, "role": "student", "name": f"Student {i}",
+                          "email": f"student{i}@bench", "password": "x", "is_active": True})
+        _insert(db, User, users)
+
+        categories = {name: i + 1 for i, name in enumerate(CATALOGUE)}
+        _insert(db, FoodCategory, [{"id": cid, "name": name} for name, cid in categories.items()])
+
+        foods, menu = [], {}
+        for vendor_id in vendor_ids:
+            menu[vendor_id] = {}
+            for category, names in CATALOGUE.items():
+                picked = rnd.sample(names, rnd.randint(2, min(5, len(names))))
+                menu[vendor_id][category] = []
+                for name in picked:
+                    food = {"id": len(foods) + 1, "name": name, "vendor_id": vendor_id,
+                            "category_id": categories[category], "availability": True,
+                            "is_active": True, "price": float(rnd.randint(2, 30) * 50)}
+                    foods.append(food)
+                    menu[vendor_id][category].append(food)
+        _insert(db, Food, foods)
+
+        vendor_weights = _zipf_weights(n_vendors)
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        fee_rate = {u["id"]: u["delivery_fee_km"] for u in users if u["role"] == "vendor"}
+
+        order_rows, item_rows, payment_rows, rating_rows = [], [], [], []
+        for order_id in range(1, orders + 1):
+            vendor_id = rnd.choices(vendor_ids, vendor_weights)[0]
+            day = now - timedelta(days=int(rnd.triangular(0, 730, 0)))
+            order_date = day.replace(hour=rnd.choices(range(24), HOUR_WEIGHTS)[0],
+                                     minute=rnd.randint(0, 59))
+
+            chosen = [rnd.choices(menu[vendor_id]["Main Dish"],
+                                  _zipf_weights(len(menu[vendor_id]["Main Dish"])))[0]]
+            for category, odds in EXTRA_CATEGORY_ODDS.items():
+                if rnd.random() < odds:
+                    chosen.append(rnd.choice(menu[vendor_id][category]))
+
+            distance = round(rnd.uniform(0.2, 5.0), 3)
+            fee = distance * fee_rate[vendor_id]
+            total = sum(f["price"] for f in chosen) + fee
+            status = rnd.choices(statuses, status_weights)[0]
+
+            order_rows.append({
+                "id": order_id, "order_date": order_date, "status": status,
+                "total_amount": total, "customer_id": rnd.choice(student_ids),
+                "vendor_id": vendor_id, "customer_latitude": 6.52 + rnd.uniform(-0.03, 0.03),
+                "customer_longitude": 3.39 + rnd.uniform(-0.03, 0.03),
+                "delivery_distance_km": distance, "transportation_fee": fee,
+                "transaction_ref": f"ORD_{order_id}_bench" if status != "pending" else None,
+            })
+            for food in chosen:
+                item_rows.append({"order_id": order_id, "food_id": food["id"],
+                                  "quantity": 1, "subtotal": food["price"]})
+
+            if status != "pending":
+                vendor_amount = total * 0.95
+                payment_rows.append({
+                    "order_id": order_id, "payment_method": "paystack",
+                    "payment_status": "successful", "vendor_amount": vendor_amount,
+                    "platform_amount": total - vendor_amount,
+                    "created_at": order_date + timedelta(minutes=2),
+                })
+                if rnd.random() < 0.33:
+                    rating_rows.append({
+                        "user_id": order_rows[-1]["customer_id"], "vendor_id": vendor_id,
+                        "order_id": order_id, "rating": rnd.choices([1, 2, 3, 4, 5], [1, 1, 3, 6, 6])[0],
+                        "created_at": order_date + timedelta(hours=1),
+                    })
+
+            if len(order_rows) >= BATCH:
+                _insert(db, Order, order_rows)
+                _insert(db, OrderItem, item_rows)
+                _insert(db, Payment, payment_rows)
+                _insert(db, Rating, rating_rows)
+                order_rows, item_rows, payment_rows, rating_rows = [], [], [], []
+
+        _insert(db, Order, order_rows)
+        _insert(db, OrderItem, item_rows)
+        _insert(db, Payment, payment_rows)
+        _insert(db, Rating, rating_rows)
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["rebuild-rollups"])
+    if result.exit_code != 0:
+        raise RuntimeError(f"rebuild-rollups failed: {result.output}") from result.exception
+
+    open(path + ".ok", "w").close()
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a benchmark database")
+    parser.add_argument("orders", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    use_database(dataset_path(args.orders, args.seed))
+    print(build_dataset(args.orders, args.seed))
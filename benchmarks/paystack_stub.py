@@ -0,0 +1,173 @@
+"""
+Local stand-in for the Paystack endpoints the app calls, for developing
+offline and for benchmarking the client. Point the app at it with
+PAYSTACK_BASE_URL=http://127.0.0.1:8765.
+
+    python benchmarks/paystack_stub.py
+    python benchmarks/paystack_stub.py --latency-ms 150 --fail-rate 0.2
+
+--latency-ms delays every response; --fail-rate answers that share of
+requests with a 503, as Paystack does when it is struggling. Account
+numbers ending in 0 do not resolve.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BANKS = [
+    {"id": 1, "name": "Access Bank", "code": "044"},
+    {"id": 2, "name": "First Bank of Nigeria", "code": "011"},
+    {"id": 3, "name": "Guaranty Trust Bank", "code": "058"},
+    {"id": 4, "name": "Kuda Bank", "code": "50211"},
+    {"id": 5, "name": "Opay", "code": "999992"},
+    {"id": 6, "name": "United Bank For Africa", "code": "033"},
+    {"id": 7, "name": "Zenith Bank", "code": "057"},
+]
+
+
+class StubPaystack:
+    def __init__(self, port=8765, latency_ms=0, fail_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.rnd = random.Random(seed)
+        self.transactions = {}
+        self.subaccounts = 0
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, method, path, query, body):
+        """(status, JSON body) for one request."""
+        if path == "/bank" and method == "GET":
+            return 200, {"status": True, "message": "Banks retrieved", "data": BANKS}
+
+        if path == "/bank/resolve" and method == "GET":
+            number = query.get("account_number", [""])[0]
+            if len(number) != 10 or number.endswith("0"):
+                return 422, {"status": False, "message": "Could not resolve account name. Check parameters or try again."}
+            return 200, {"status": True, "message": "Account number resolved",
+                         "data": {"account_number": number, "account_name": f"STUB ACCOUNT {number[-4:]}"}}
+
+        if path == "/subaccount" and method == "POST":
+            with self.lock:
+                self.subaccounts += 1
+                code = f"ACCT_stub{self.subaccounts}"
+            return 200, {"status": True, "message": "Subaccount created", "data": {"subaccount_code": code, **body}}
+
+        if path.startswith("/subaccount/") and method == "PUT":
+            code = path.rsplit("/", 1)[1]
+            return 200, {"status": True, "message": "Subaccount updated", "data": {"subaccount_code": code, **body}}
+
+        if path == "/transaction/initialize" and method == "POST":
+            reference = body.get("reference")
+            with self.lock:
+                if reference in self.transactions:
+                    return 400, {"status": False, "message": "Duplicate Transaction Reference"}
+                self.transactions[reference] = body
+            return 200, {"status": True, "message": "Authorization URL created",
+                         "data": {"authorization_url": f"{body.get('callback_url')}?reference={reference}",
+                                  "access_code": "stub", "reference": reference}}
+
+        if path.startswith("/transaction/verify/") and method == "GET":
+            reference = path.rsplit("/", 1)[1]
+            with self.lock:
+                transaction = self.transactions.get(reference)
+            if transaction is None:
+                return 400, {"status": False, "message": "Transaction reference not found"}
+            return 200, {"status": True, "message": "Verification successful",
+                         "data": {"status": "success", "reference": reference,
+                                  "amount": transaction.get("amount"),
+                                  "metadata": transaction.get("metadata"),
+                                  "paid_at": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())}}
+
+        return 404, {"status": False, "message": "Not found"}
+
+
+def _handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        # headers and body go out in separate writes; without this the
+        # client's delayed ACK adds ~40 ms to every kept-alive response
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with stub.lock:
+                stub.connections += 1
+
+        def handle_one(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            url = urlparse(self.path)
+            with stub.lock:
+                stub.requests += 1
+                fail = stub.rnd.random() < stub.fail_rate
+            if stub.latency_ms:
+                time.sleep(stub.latency_ms / 1000)
+
+            if fail:
+                status, payload = 503, {"status": False, "message": "Service unavailable"}
+            else:
+                status, payload = stub.respond(method, url.path, parse_qs(url.query), body)
+
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self.handle_one("GET")
+
+        def do_POST(self):
+            self.handle_one("POST")
+
+        def do_PUT(self):
+            self.handle_one("PUT")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    stub = StubPaystack(args.port, args.latency_ms, args.fail_rate, args.seed)
+    print(f"Paystack stand-in on {stub.base_url} (Ctrl+C to stop)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Paystack webhook replay, for load testing payment finalization.
+
+By default it runs in-process on a fresh database
+(benchmarks/data/webhooks.db): creates --orders pending orders, posts a
+signed charge.success webhook for each --duplicates times (Paystack
+retries deliveries) from --concurrency threads in random order, and
+reports acknowledgement latency, how long the payment worker takes to
+finalize them all, and checks that every order was paid exactly once.
+
+    python benchmarks/replay_webhooks.py
+    python benchmarks/replay_webhooks.py --orders 2000 --duplicates 3 --concurrency 16
+    python benchmarks/replay_webhooks.py --compare old.json new.json
+
+With --url it replays the events stored in the app's database
+(DATABASE_URL) to a running server instead, signed with
+PAYSTACK_SECRET_KEY, and reports acknowledgement latency only:
+
+    python benchmarks/replay_webhooks.py --url http://127.0.0.1:5000
+
+Results are written as JSON to benchmarks/results/webhooks-<commit>.json
+unless --output is given.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+from common import DATA_DIR, compare_results, default_output, use_database, write_results
+
+SECRET = "sk_test_webhook_replay"
+
+
+def post_all(bodies, concurrency, post):
+    """Posts every body with `post(body)` from `concurrency` threads; returns per-post ms and statuses."""
+    timings, statuses = [], []
+    lock = threading.Lock()
+    pending = list(bodies)
+
+    def run():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                body = pending.pop()
+            started = time.perf_counter()
+            status = post(body)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                timings.append(elapsed)
+                statuses.append(status)
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return timings, statuses
+
+
+def summary(name, timings, seconds, **extra):
+    timings = sorted(timings)
+    return {
+        "name": name,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "repeat": len(timings),
+        "queries": 0,
+        "per_second": round(len(timings) / seconds, 1),
+        **extra,
+    }
+
+
+def replay_to_server(args):
+    import requests
+    from app import app
+    from models import PaymentEvent
+    from payment_events import sign, SIGNATURE_HEADER
+
+    secret = os.environ.get("PAYSTACK_SECRET_KEY")
+    if not secret:
+        sys.exit("PAYSTACK_SECRET_KEY must be set to sign the replayed events")
+    with app.app_context():
+        bodies = [payload.encode() for (payload,) in
+                  PaymentEvent.query.with_entities(PaymentEvent.payload).order_by(PaymentEvent.id)]
+    if not bodies:
+        sys.exit("No stored payment events to replay")
+    bodies *= args.duplicates
+
+    session = requests.Session()
+    url = args.url.rstrip("/") + "/payment/webhook"
+
+    def post(body):
+        return session.post(url, data=body, timeout=10, headers={
+            "Content-Type": "application/json", SIGNATURE_HEADER: sign(body, secret)
+        }).status_code
+
+    started = time.perf_counter()
+    timings, statuses = post_all(bodies, args.concurrency, post)
+    seconds = time.perf_counter() - started
+    return [summary(f"replay {len(bodies)} events to {args.url}", timings, seconds,
+                    acknowledged=statuses.count(200))]
+
+
+def load_test(args):
+    os.environ["RECEIPT_DIR"] = os.path.join(DATA_DIR, "webhooks-receipts")
+    use_database(os.path.join(DATA_DIR, "webhooks.db"))
+    os.environ["PAYSTACK_SECRET_KEY"] = SECRET
+
+    import app as seamless
+    from models import db, User, Food, FoodCategory, Order, OrderItem, Payment, PaymentEvent
+    from payment_events import sign, SIGNATURE_HEADER
+
+    with seamless.app.app_context():
+        db.drop_all()
+        db.create_all()
+        vendor = User(role="vendor", name="Replay Vendor", email="vendor@replay.test", password="x",
+                      business_name="Replay Kitchen", subaccount_code="ACCT_replay")
+        student = User(role="student", name="Replay Student", email="student@replay.test", password="x")
+        category = FoodCategory(name="Main Dish")
+        db.session.add_all([vendor, student, category])
+        db.session.flush()
+        food = Food(name="Jollof Rice", price=1500, vendor_id=vendor.id, category_id=category.id)
+        db.session.add(food)
+        db.session.flush()
+
+        rnd = random.Random(args.seed)
+        bodies = []
+        for _ in range(args.orders):
+            quantity = rnd.randint(1, 3)
+            order = Order(customer_id=student.id, vendor_id=vendor.id, total_amount=1500 * quantity,
+                          status="pending")
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(OrderItem(order_id=order.id, food_id=food.id, quantity=quantity,
+                                     subtotal=1500 * quantity))
+            reference = f"ORD_{order.id}_{rnd.randrange(10**9)}"
+            bodies.append(json.dumps({"event": "charge.success", "data": {
+                "reference": reference, "status": "success", "amount": int(order.total_amount * 100),
+                "metadata": {"order_id": str(order.id)},
+            }}).encode())
+        db.session.commit()
+
+    bodies *= args.duplicates
+    rnd.shuffle(bodies)
+    local = threading.local()
+
+    def post(body):
+        if not hasattr(local, "client"):
+            local.client = seamless.app.test_client()
+        return local.client.post("/payment/webhook", data=body, content_type="application/json",
+                                 headers={SIGNATURE_HEADER: sign(body, SECRET)}).status_code
+
+    started = time.perf_counter()
+    timings, statuses = post_all(bodies, args.concurrency, post)
+    acked = time.perf_counter() - started
+
+    # the worker finalizes in the background; wait for it to drain
+    with seamless.app.app_context():
+        while PaymentEvent.query.filter(PaymentEvent.status.in_(["pending", "processing"])).count():
+            db.session.remove()
+            time.sleep(0.05)
+        drained = time.perf_counter() - started
+        payments = Payment.query.count()
+        paid = Order.query.filter_by(status="paid").count()
+        events = PaymentEvent.query.count()
+        failed = PaymentEvent.query.filter_by(status="failed").count()
+
+    ok = payments == paid == events == args.orders and not failed
+    return [
+        summary(f"acknowledge {len(bodies)} webhooks", timings, acked,
+                acknowledged=statuses.count(200), concurrency=args.concurrency),
+        {
+            "name": f"finalize {args.orders} orders",
+            "median_ms": round(drained * 1000, 3),
+            "repeat": 1,
+            "queries": 0,
+            "per_second": round(args.orders / drained, 1),
+            "events_stored": events,
+            "payments": payments,
+            "orders_paid": paid,
+            "failed": failed,
+            "exactly_once": ok,
+        },
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--duplicates", type=int, default=2, help="times each event is delivered")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="replay stored events to this running server instead")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/webhooks-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    output = args.output or default_output("webhooks")
+    results = replay_to_server(args) if args.url else load_test(args)
+
+    for r in results:
+        extra = {k: v for k, v in r.items() if k not in ("name", "median_ms", "mean_ms", "repeat", "queries")}
+        print(f"  {r['name']:<32} {r['median_ms']:>10.2f} ms  {extra}")
+
+    path = write_results(output, "webhooks", results, orders=args.orders, duplicates=args.duplicates,
+                         concurrency=args.concurrency, seed=args.seed)
+    print(f"Results written to {path}")
+    return 0 if args.url or results[-1]["exactly_once"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Delivery runs: a vendor's ready orders grouped into multi-drop trips.
+
+plan_runs() proposes runs. The longest-waiting order seeds each run,
+which takes the unassigned orders whose drop-off is within RUN_RADIUS_KM
+of the seed's, up to MAX_RUN_STOPS, preferring the closest and, among
+similar distances, those waiting longest. The stops are then ordered
+with a nearest-neighbour route from the vendor, improved with 2-opt and
+or-opt moves. Distances are haversine, like the dashboard estimates.
+
+A dispatched run keeps its orders "ready" (they are still paid orders
+in every report) but takes them off the planner until the vendor
+completes the run, which marks them all delivered.
+"""
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import joinedload
+
+from models import db, Order, DeliveryRun
+from geo import haversine_km_many, haversine_km_matrix
+from order_status import set_order_status
+
+RUN_RADIUS_KM = 1.5
+MAX_RUN_STOPS = 6
+
+# how much closer, in km, a minute of waiting makes an order look
+WAIT_KM_PER_MINUTE = 0.02
+
+
+def ready_orders(vendor_id):
+    """The vendor's ready orders not yet out on a run."""
+    return Order.query.options(joinedload(Order.customer)).filter(
+        Order.vendor_id == vendor_id,
+        Order.status == "ready",
+        Order.delivery_run_id.is_(None)
+    ).all()
+
+
+def _located(order):
+    return order.customer_latitude is not None and order.customer_longitude is not None
+
+
+def _waiting_minutes(orders, now):
+    return np.array([
+        max((now - order.order_date).total_seconds() / 60, 0) if order.order_date else 0
+        for order in orders
+    ])
+
+
+def route(start, distances):
+    """
+    (stop order, km) of an open route visiting every point once:
+    `start` holds the km from the starting point to each point (None to
+    start at the first point), `distances` the point-to-point km.
+    """
+    n = len(distances)
+    if n == 0:
+        return [], 0.0
+
+    # nearest neighbour
+    unvisited = set(range(n))
+    if start is None:
+        current = 0
+    else:
+        current = int(np.argmin(start))
+    path = [current]
+    unvisited.discard(current)
+    while unvisited:
+        current = min(unvisited, key=lambda j: distances[current][j])
+        path.append(current)
+        unvisited.discard(current)
+
+    def length(path):
+        km = start[path[0]] if start is not None else 0.0
+        return km + sum(distances[a][b] for a, b in zip(path, path[1:]))
+
+    def moves(path):
+        # 2-opt: reverse a stretch of the route
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                yield path[:i] + path[i:j + 1][::-1] + path[j + 1:]
+        # or-opt: move one stop elsewhere
+        for i in range(n):
+            rest = path[:i] + path[i + 1:]
+            for j in range(n):
+                if j != i:
+                    yield rest[:j] + [path[i]] + rest[j:]
+
+    best = length(path)
+    improved = True
+    while improved:
+        improved = False
+        for candidate in moves(path):
+            km = length(candidate)
+            if km < best - 1e-9:
+                path, best, improved = candidate, km, True
+                break
+    return path, float(best)
+
+
+def plan_runs(vendor, orders, now=None):
+    """
+    Proposed runs for `orders` from `vendor`'s location, longest waiting
+    first, as dicts with the orders in stop order, route_km and the
+    longest wait in minutes. Orders without a drop-off location get a
+    run of their own.
+    """
+    now = now or datetime.utcnow()
+    located = [order for order in orders if _located(order)]
+    unlocated = [order for order in orders if not _located(order)]
+    runs = [
+        {"orders": [order], "route_km": None, "waiting_minutes": int(wait)}
+        for order, wait in zip(unlocated, _waiting_minutes(unlocated, now))
+    ]
+    if not located:
+        return sorted(runs, key=lambda run: -run["waiting_minutes"])
+
+    lats = np.array([order.customer_latitude for order in located], dtype=np.float64)
+    lngs = np.array([order.customer_longitude for order in located], dtype=np.float64)
+    distances = haversine_km_matrix(lats, lngs)
+    waiting = _waiting_minutes(located, now)
+
+    has_origin = vendor.latitude is not None and vendor.longitude is not None
+    from_vendor = haversine_km_many(vendor.latitude, vendor.longitude, lats, lngs) if has_origin else None
+
+    unassigned = np.ones(len(located), dtype=bool)
+    for seed in np.argsort(-waiting, kind="stable"):
+        if not unassigned[seed]:
+            continue
+        unassigned[seed] = False
+
+        nearby = np.flatnonzero(unassigned & (distances[seed] <= RUN_RADIUS_KM))
+        score = distances[seed, nearby] - WAIT_KM_PER_MINUTE * waiting[nearby]
+        members = np.concatenate(([seed], nearby[np.argsort(score, kind="stable")[:MAX_RUN_STOPS - 1]]))
+        unassigned[members] = False
+
+        path, route_km = route(
+            from_vendor[members] if has_origin else None,
+            distances[np.ix_(members, members)]
+        )
+        runs.append({
+            "orders": [located[members[i]] for i in path],
+            "route_km": round(route_km, 2),
+            "waiting_minutes": int(waiting[members].max()),
+        })
+
+    return sorted(runs, key=lambda run: -run["waiting_minutes"])
+
+
+def dispatch_run(vendor, order_ids):
+    """
+    Sends the given ready orders out as one run, in route order, and
+    returns it; None unless every id is a ready order of this vendor not
+    already on a run, and there are at most MAX_RUN_STOPS of them (the
+    route search grows fast with the number of stops).
+    """
+    if len(set(order_ids)) > MAX_RUN_STOPS:
+        return None
+
+    orders = Order.query.filter(
+        Order.id.in_(order_ids),
+        Order.vendor_id == vendor.id,
+        Order.status == "ready",
+        Order.delivery_run_id.is_(None)
+    ).all()
+    if not orders or len(orders) != len(set(order_ids)):
+        return None
+
+    if all(_located(order) for order in orders):
+        lats = np.array([order.customer_latitude for order in orders], dtype=np.float64)
+        lngs = np.array([order.customer_longitude for order in orders], dtype=np.float64)
+        has_origin = vendor.latitude is not None and vendor.longitude is not None
+        path, route_km = route(
+            haversine_km_many(vendor.latitude, vendor.longitude, lats, lngs) if has_origin else None,
+            haversine_km_matrix(lats, lngs)
+        )
+        orders, route_km = [orders[i] for i in path], round(route_km, 2)
+    else:
+        orders, route_km = sorted(orders, key=lambda order: order.id), None
+
+    run = DeliveryRun(vendor_id=vendor.id, route_km=route_km)
+    db.session.add(run)
+    for stop, order in enumerate(orders, start=1):
+        order.delivery_run = run
+        order.run_stop = stop
+    return run
+
+
+def complete_run(run):
+    """Marks every order still ready on the run delivered, in the caller's transaction."""
+    for order in run.orders:
+        if order.status == "ready":
+            set_order_status(order, "delivered")
+    run.completed_at = datetime.utcnow()
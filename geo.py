@@ -0,0 +1,279 @@
+"""
+Vendor locations: great-circle distance, delivery fee estimates and an
+in-memory grid index answering "the nearest active vendors" for a
+student's position, plus batched fee quotes for every vendor at once.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from flask import current_app
+from geopy.distance import geodesic
+
+from models import db, User
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid cells are CELL_DEGREES on a side: about 1.1 km north-south, a
+# little less east-west away from the equator.
+CELL_DEGREES = 0.01
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+NEARBY_RADIUS_KM = 15
+
+# Batched quotes are cached per QUOTE_CELL_DEGREES cell of the customer's
+# position (about 110 m) and computed at the cell's rounded coordinates.
+QUOTE_CELL_DEGREES = 0.001
+QUOTE_TTL = 30
+QUOTE_CACHE_SIZE = 2048
+
+# The memoized distance engine quantizes customer positions to
+# MEMO_CELL_DEGREES cells (about 55 m), so its distances are within half
+# a cell diagonal (about 40 m) of the exact ones.
+MEMO_CELL_DEGREES = 0.0005
+MEMO_CACHE_SIZE = 8192
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_km_many(lat, lng, lats, lngs):
+    """haversine_km from one point to arrays of points, as an array."""
+    lat, lng = math.radians(lat), math.radians(lng)
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    a = (np.sin((lats - lat) / 2) ** 2
+         + math.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def haversine_km_matrix(lats, lngs):
+    """haversine_km between every pair of points, as an n x n array."""
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    a = (np.sin((lats[:, None] - lats[None, :]) / 2) ** 2
+         + np.cos(lats)[:, None] * np.cos(lats)[None, :]
+         * np.sin((lngs[:, None] - lngs[None, :]) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def delivery_fee(distance_km, fee_km):
+    """Transportation fee for a delivery of `distance_km` at the vendor's rate per km."""
+    return distance_km * (fee_km or 0)
+
+
+# =========================
+# DISTANCE ENGINES
+# =========================
+
+def exact_distance_km(vendor, lat, lng):
+    """Geodesic distance on the WGS-84 ellipsoid (Karney), to well under a millimetre."""
+    return geodesic((vendor.latitude, vendor.longitude), (lat, lng)).km
+
+
+def fast_distance_km(vendor, lat, lng):
+    """
+    Haversine distance on a sphere of the Earth's mean radius. Within
+    0.57% of the geodesic distance anywhere (the ellipsoid's flattening
+    bounds the error), so a ₦2,000 fee is off by ₦11 at worst. Over 100x
+    faster than geodesic.
+    """
+    return haversine_km(vendor.latitude, vendor.longitude, lat, lng)
+
+
+@lru_cache(maxsize=MEMO_CACHE_SIZE)
+def _cell_distance_km(vendor_id, vendor_lat, vendor_lng, cell_lat, cell_lng):
+    # the vendor's coordinates are part of the key so a moved vendor
+    # never gets a stale distance
+    return geodesic(
+        (vendor_lat, vendor_lng),
+        ((cell_lat + 0.5) * MEMO_CELL_DEGREES, (cell_lng + 0.5) * MEMO_CELL_DEGREES)
+    ).km
+
+
+def memoized_distance_km(vendor, lat, lng):
+    """
+    Geodesic distance from the vendor to the centre of the customer's
+    MEMO_CELL_DEGREES cell, cached per (vendor, cell) with LRU eviction,
+    so the review and confirm steps of one order, and repeat orders from
+    the same hostel, cost one geodesic between them.
+    """
+    return _cell_distance_km(
+        vendor.id, vendor.latitude, vendor.longitude,
+        math.floor(lat / MEMO_CELL_DEGREES), math.floor(lng / MEMO_CELL_DEGREES)
+    )
+
+
+DISTANCE_ENGINES = {
+    "exact": exact_distance_km,
+    "fast": fast_distance_km,
+    "memoized": memoized_distance_km,
+}
+
+
+def quote_delivery(vendor, customer_lat, customer_lng):
+    """
+    (distance_km, transportation_fee) for delivering from `vendor` to the
+    customer, using the DISTANCE_ENGINE configured on the app.
+    """
+    distance = DISTANCE_ENGINES[current_app.config["DISTANCE_ENGINE"]]
+    distance_km = distance(vendor, float(customer_lat), float(customer_lng))
+    return distance_km, delivery_fee(distance_km, vendor.delivery_fee_km)
+
+
+def location_cell(lat, lng):
+    return math.floor(lat / CELL_DEGREES), math.floor(lng / CELL_DEGREES)
+
+
+class VendorLocationIndex:
+    """
+    Active vendors that have set a location, bucketed by location_cell.
+    Built from the users table on first use and rebuilt after
+    invalidate() (called when a vendor's location, rate or status
+    changes) or after `ttl` seconds, so changes made by other workers
+    show up too.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._grid = None
+        self._columns = None
+        self._quotes = OrderedDict()
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._grid = None
+
+    def _build(self):
+        grid = {}
+        rows = db.session.query(
+            User.id, User.latitude, User.longitude, User.delivery_fee_km
+        ).filter(
+            User.role == "vendor",
+            User.is_active == True,
+            User.latitude.isnot(None),
+            User.longitude.isnot(None)
+        ).all()
+        for vendor_id, lat, lng, fee_km in rows:
+            grid.setdefault(location_cell(lat, lng), []).append((vendor_id, lat, lng, fee_km))
+
+        # the same vendors as columns, for batched quotes
+        ids, lats, lngs, fees = zip(*rows) if rows else ((), (), (), ())
+        columns = (
+            np.array(ids, dtype=np.int64),
+            np.array(lats, dtype=np.float64),
+            np.array(lngs, dtype=np.float64),
+            np.array([fee or 0 for fee in fees], dtype=np.float64),
+        )
+        return grid, columns
+
+    def _refresh(self):
+        # caller holds the lock
+        if self._grid is None or time.monotonic() - self._built_at > self.ttl:
+            self._grid, self._columns = self._build()
+            self._quotes.clear()
+            self._built_at = time.monotonic()
+
+    def grid(self):
+        with self._lock:
+            self._refresh()
+            return self._grid
+
+    def nearest(self, lat, lng, k=None, radius_km=NEARBY_RADIUS_KM):
+        """
+        Up to `k` (default all) active vendors within `radius_km` of
+        (lat, lng), nearest first, as dicts with vendor_id, distance_km
+        and the estimated delivery fee.
+
+        Searches rings of cells outward from the student's cell and stops
+        once no unsearched cell can hold anything closer than what has
+        been found.
+        """
+        grid = self.grid()
+        center_lat, center_lng = location_cell(lat, lng)
+
+        # every point in ring r is at least (r - 1) cell widths away; cells
+        # are narrowest east-west at the poleward edge of the search area
+        edge_lat = min(abs(lat) + radius_km / KM_PER_DEGREE, 89)
+        cell_km = CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+        max_ring = math.ceil(radius_km / cell_km) + 1
+
+        found = []
+        for ring in range(max_ring + 1):
+            for cell in _ring_cells(center_lat, center_lng, ring):
+                for vendor_id, v_lat, v_lng, fee_km in grid.get(cell, ()):
+                    distance = haversine_km(lat, lng, v_lat, v_lng)
+                    if distance <= radius_km:
+                        found.append((distance, vendor_id, fee_km))
+
+            if k and len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= ring * cell_km:
+                    break
+
+        found.sort()
+        return [
+            {
+                "vendor_id": vendor_id,
+                "distance_km": round(distance, 3),
+                "fee": round(delivery_fee(distance, fee_km), 2),
+            }
+            for distance, vendor_id, fee_km in found[:k]
+        ]
+
+    def quotes(self, lat, lng):
+        """
+        {vendor_id: {"distance_km", "fee"}} for every active vendor with a
+        location, computed in one vectorized pass at the customer's
+        rounded position and cached per QUOTE_CELL_DEGREES cell for
+        QUOTE_TTL seconds (and until the index is rebuilt).
+        """
+        cell = (round(lat / QUOTE_CELL_DEGREES), round(lng / QUOTE_CELL_DEGREES))
+        now = time.monotonic()
+
+        with self._lock:
+            self._refresh()
+            cached = self._quotes.get(cell)
+            if cached and cached[0] > now:
+                self._quotes.move_to_end(cell)
+                return cached[1]
+            ids, lats, lngs, fees = columns = self._columns
+
+        distances = haversine_km_many(
+            cell[0] * QUOTE_CELL_DEGREES, cell[1] * QUOTE_CELL_DEGREES, lats, lngs
+        )
+        quotes = {
+            vendor_id: {"distance_km": distance, "fee": fee}
+            for vendor_id, distance, fee in zip(
+                ids.tolist(),
+                np.round(distances, 3).tolist(),
+                np.round(distances * fees, 2).tolist()
+            )
+        }
+
+        with self._lock:
+            # skip caching if the index was rebuilt meanwhile
+            if self._columns is columns:
+                self._quotes[cell] = (now + QUOTE_TTL, quotes)
+                self._quotes.move_to_end(cell)
+                while len(self._quotes) > QUOTE_CACHE_SIZE:
+                    self._quotes.popitem(last=False)
+        return quotes
+
+
+def _ring_cells(center_lat, center_lng, ring):
+    if ring == 0:
+        yield center_lat, center_lng
+        return
+    for d in range(-ring, ring + 1):
+        yield center_lat - ring, center_lng + d
+        yield center_lat + ring, center_lng + d
+    for d in range(-ring + 1, ring):
+        yield center_lat + d, center_lng - ring
+        yield center_lat + d, center_lng + ring
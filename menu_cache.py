@@ -0,0 +1,99 @@
+"""
+Student menus, grouped by category and ready to render, cached in
+memory per vendor so a menu page costs no queries while the menu is
+unchanged.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from models import db, User, Food, FoodCategory
+
+MENU_CACHE_SIZE = 256  # vendors kept, least recently viewed evicted first
+MENU_TTL = 300
+
+# stu_food lists every vendor's foods under this key
+ALL_VENDORS = None
+
+
+class MenuCache:
+    """
+    Menus keyed by vendor id. Each vendor has a version counter that
+    invalidate() bumps after any write to their foods or account; an
+    entry is served only while it was built at the current version and
+    is younger than `ttl` seconds, so changes made by other workers show
+    up too. At most `size` menus are kept.
+    """
+
+    def __init__(self, size=MENU_CACHE_SIZE, ttl=MENU_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._menus = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, vendor_id):
+        """Call after committing a change to a vendor's foods, prices or account."""
+        with self._lock:
+            for key in (vendor_id, ALL_VENDORS):
+                self._versions[key] = self._versions.get(key, 0) + 1
+                self._menus.pop(key, None)
+
+    def _get(self, key, build):
+        now = time.monotonic()
+        with self._lock:
+            version = self._versions.get(key, 0)
+            cached = self._menus.get(key)
+            if cached and cached[0] == version and cached[1] > now:
+                self._menus.move_to_end(key)
+                return cached[2]
+
+        menu = build()
+
+        with self._lock:
+            # a write committed while building makes this menu stale already;
+            # unknown vendors are not cached, they may sign up any moment
+            if menu is not None and self._versions.get(key, 0) == version:
+                self._menus[key] = (version, now + self.ttl, menu)
+                self._menus.move_to_end(key)
+                while len(self._menus) > self.size:
+                    self._menus.popitem(last=False)
+        return menu
+
+    def vendor_menu(self, vendor_id):
+        """
+        {"vendor": {"id", "business_name"}, "categories": [(name, [food])]}
+        for an active vendor's available foods, or None if there is no
+        such vendor.
+        """
+        return self._get(vendor_id, lambda: _build_vendor_menu(vendor_id))
+
+    def all_foods(self):
+        """[(category name, [food])] of every available food, as stu_food lists them."""
+        return self._get(ALL_VENDORS, lambda: _group_foods(Food.availability == True))
+
+
+def _group_foods(*criteria):
+    rows = db.session.query(
+        FoodCategory.name, Food.id, Food.name, Food.price
+    ).join(Food.category).filter(*criteria).order_by(FoodCategory.name, Food.id).all()
+
+    categories = []
+    for category, food_id, name, price in rows:
+        if not categories or categories[-1][0] != category:
+            categories.append((category, []))
+        categories[-1][1].append({"id": food_id, "name": name, "price": price})
+    return categories
+
+
+def _build_vendor_menu(vendor_id):
+    vendor = db.session.query(User.id, User.business_name).filter_by(
+        id=vendor_id, role="vendor", is_active=True
+    ).first()
+    if vendor is None:
+        return None
+
+    return {
+        "vendor": {"id": vendor.id, "business_name": vendor.business_name},
+        "categories": _group_foods(Food.vendor_id == vendor_id, Food.availability == True),
+    }
@@ -30,6 +30,9 @@ class User(UserMixin, db.Model):
     delivery_fee_km = db.Column(db.Float, default = 200)
     is_active= db.Column(db.Boolean, default = True)
 
+    # bumped whenever the vendor's foods, prices or availability change
+    menu_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     # Vendor payout fields
     bank_name = db.Column(db.String(100))
     bank_code = db.Column(db.String(20))
@@ -72,9 +75,23 @@ class Order(db.Model):
     delivery_distance_km = db.Column(db.Float, default=0)
     transportation_fee = db.Column(db.Float, default=0)
 
+    # set while the order is out on a delivery run, with its place in the route
+    delivery_run_id = db.Column(db.Integer, db.ForeignKey("delivery_runs.id"), index=True)
+    run_stop = db.Column(db.Integer)
+
     customer = db.relationship("User", foreign_keys=[customer_id])
     vendor = db.relationship("User", foreign_keys=[vendor_id])
 
+    # analytics filter on paid statuses by date, and per vendor
+    __table_args__ = (
+        db.Index("ix_orders_status_order_date", "status", "order_date"),
+        db.Index("ix_orders_vendor_id_status", "vendor_id", "status"),
+        # keyset pagination of the order lists, newest first
+        db.Index("ix_orders_order_date", "order_date"),
+        db.Index("ix_orders_customer_id_order_date", "customer_id", "order_date"),
+        db.Index("ix_orders_vendor_id_order_date", "vendor_id", "order_date"),
+    )
+
 class OrderItem(db.Model):
     __tablename__ = "order_items"
 
@@ -90,6 +107,20 @@ class OrderItem(db.Model):
     food = db.relationship("Food")
 
 
+class DeliveryRun(db.Model):
+    """A trip dropping several of a vendor's ready orders, in route order."""
+    __tablename__ = "delivery_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    vendor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+
+    route_km = db.Column(db.Float)
+    dispatched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
+    orders = db.relationship("Order", backref="delivery_run", order_by="Order.run_stop")
+
+
 
 class FoodCategory(db.Model):
     __tablename__ = "food_categories"
@@ -114,6 +145,39 @@ class Payment(db.Model):
     platform_amount = db.Column(db.Float, default=0)
     subaccount_code = db.Column(db.String(100))
 
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+
+class PaymentEvent(db.Model):
+    """
+    A Paystack event to act on, stored once per (event, reference):
+    webhook deliveries, and charges found by verifying a reference the
+    student came back with. Worked through by payment_events.PaymentWorker.
+    """
+    __tablename__ = "payment_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)  # "charge.success", ...
+    reference = db.Column(db.String(100), nullable=False)
+    source = db.Column(db.String(20), nullable=False, default="webhook")  # "webhook" or "verify"
+    payload = db.Column(db.Text, nullable=False)
+
+    # pending -> processing -> processed / ignored / failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), index=True)
+
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint("event", "reference", name="one_event_per_reference"),
+        db.Index("ix_payment_events_reference", "reference"),
+        db.Index("ix_payment_events_status", "status"),
+    )
 
 
 class Rating(db.Model):
@@ -133,3 +197,94 @@ class Rating(db.Model):
     __table_args__ = (
         db.UniqueConstraint("user_id", "order_id", name="one_rating_per_order"),
     )
+
+
+class RevenueRollup(db.Model):
+    __tablename__ = "revenue_rollups"
+
+    # granularity: "day", "week", "month", "year"
+    # bucket: "2024-05-13" (day / Monday of week), "2024-05" (month), "2024" (year)
+    granularity = db.Column(db.String(10), primary_key=True)
+    bucket = db.Column(db.String(10), primary_key=True)
+
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class FoodOrderCount(db.Model):
+    __tablename__ = "food_order_counts"
+
+    # bucket: "all" for all-time totals, otherwise the order day "2024-05-13"
+    bucket = db.Column(db.String(10), primary_key=True)
+    food_name = db.Column(db.String(100), primary_key=True)
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class FoodPairCount(db.Model):
+    __tablename__ = "food_pair_counts"
+
+    # pairs are stored once, with food_a < food_b
+    bucket = db.Column(db.String(10), primary_key=True)
+    food_a = db.Column(db.String(100), primary_key=True)
+    food_b = db.Column(db.String(100), primary_key=True)
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VendorStats(db.Model):
+    __tablename__ = "vendor_stats"
+
+    vendor_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+
+    # totals over every paid order
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    earned = db.Column(db.Float, nullable=False, default=0)
+    payouts = db.Column(db.Integer, nullable=False, default=0)
+    distance_km_sum = db.Column(db.Float, nullable=False, default=0)
+    transport_fee_sum = db.Column(db.Float, nullable=False, default=0)
+
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_avg = db.Column(db.Float, nullable=False, default=0)
+
+    # paid orders currently in each delivery status
+    waiting_count = db.Column(db.Integer, nullable=False, default=0)
+    accepted_count = db.Column(db.Integer, nullable=False, default=0)
+    ready_count = db.Column(db.Integer, nullable=False, default=0)
+    delivered_count = db.Column(db.Integer, nullable=False, default=0)
+
+    vendor = db.relationship("User", backref=db.backref("stats", uselist=False))
+
+
+class VendorDailyStats(db.Model):
+    __tablename__ = "vendor_daily_stats"
+
+    vendor_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    day = db.Column(db.String(10), primary_key=True)  # "2024-05-13"
+
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VendorFoodCount(db.Model):
+    __tablename__ = "vendor_food_counts"
+
+    vendor_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    food_name = db.Column(db.String(100), primary_key=True)
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VendorFoodPairCount(db.Model):
+    __tablename__ = "vendor_food_pair_counts"
+
+    # pairs are stored once, with food_a < food_b
+    vendor_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    food_a = db.Column(db.String(100), primary_key=True)
+    food_b = db.Column(db.String(100), primary_key=True)
+
+    count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,132 @@
+"""
+Signed order quotes. place_order prices an order once and hands the
+result to the review page as a tamper-proof, short-lived token;
+confirm_order inserts the order straight from it while it is fresh and
+the vendor's menu has not changed since, and only prices the order
+again otherwise.
+"""
+from flask import current_app
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from models import db, User, Food
+from geo import quote_delivery
+
+QUOTE_MAX_AGE = 600  # seconds between order review and confirm
+QUOTE_SALT = "order-quote"
+
+MAX_ITEM_QUANTITY = 20
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt=QUOTE_SALT)
+
+
+def bump_menu_version(vendor_id):
+    """Call whenever a vendor's foods, prices or availability change."""
+    User.query.filter_by(id=vendor_id).update({User.menu_version: User.menu_version + 1})
+
+
+def read_cart(form):
+    """
+    {food_id: quantity} from the menu form's quantity_<food_id> fields
+    (plain food_ids count once each). Raises ValueError, with a message
+    for the student, for anything that is not a whole quantity from 0 to
+    MAX_ITEM_QUANTITY.
+    """
+    pairs = [(food_id, "1") for food_id in form.getlist("food_ids")] + [
+        (field[len("quantity_"):], value)
+        for field, value in form.items()
+        if field.startswith("quantity_") and value
+    ]
+
+    cart = {}
+    for food_id, value in pairs:
+        try:
+            food_id, quantity = int(food_id), int(value)
+        except ValueError:
+            quantity = -1
+        if quantity < 0:
+            raise ValueError("Invalid quantity")
+        if quantity:
+            cart[food_id] = cart.get(food_id, 0) + quantity
+
+    if any(quantity > MAX_ITEM_QUANTITY for quantity in cart.values()):
+        raise ValueError(f"You can order at most {MAX_ITEM_QUANTITY} of each item")
+    return cart
+
+
+def cart_foods(vendor_id, cart):
+    """
+    [(food, quantity)] for a cart, or None unless every item is an
+    available food from this one vendor.
+    """
+    foods = Food.query.filter(
+        Food.id.in_(cart), Food.vendor_id == vendor_id, Food.availability == True
+    ).all()
+    if len(foods) != len(cart):
+        return None
+    return [(food, cart[food.id]) for food in foods]
+
+
+def build_quote(customer_id, vendor, lines, customer_lat, customer_lng):
+    """Prices the (food, quantity) `lines` from `vendor` delivered to the customer."""
+    distance_km, fee = quote_delivery(vendor, customer_lat, customer_lng)
+    subtotal = sum(food.price * quantity for food, quantity in lines)
+
+    return {
+        "customer_id": customer_id,
+        "vendor_id": vendor.id,
+        "menu_version": vendor.menu_version,
+        "items": [[food.id, food.name, food.price, quantity] for food, quantity in lines],
+        "latitude": float(customer_lat),
+        "longitude": float(customer_lng),
+        "distance_km": distance_km,
+        "fee": fee,
+        "subtotal": subtotal,
+        "total": subtotal + fee,
+    }
+
+
+def price_again(quote):
+    """A fresh quote for the same cart and location, or None if it can no longer be ordered."""
+    cart = {food_id: quantity for food_id, _, _, quantity in quote["items"]}
+    lines = cart_foods(quote["vendor_id"], cart)
+    vendor = db.session.get(User, quote["vendor_id"])
+    if not lines or vendor is None or not vendor.is_active:
+        return None
+    return build_quote(quote["customer_id"], vendor, lines, quote["latitude"], quote["longitude"])
+
+
+def sign_quote(quote):
+    return _serializer().dumps(quote)
+
+
+def load_quote(token, customer_id):
+    """
+    (quote, fresh) from a signed token. fresh is False if the quote has
+    expired (it can still be priced again); quote is None if the token
+    is missing, forged or belongs to another customer.
+    """
+    if not token:
+        return None, False
+
+    serializer = _serializer()
+    try:
+        quote, fresh = serializer.loads(token, max_age=QUOTE_MAX_AGE), True
+    except SignatureExpired as expired:
+        # genuine but old: still good enough to price the same order again
+        quote, fresh = serializer.load_payload(expired.payload), False
+    except BadSignature:
+        return None, False
+
+    if quote.get("customer_id") != customer_id:
+        return None, False
+    return quote, fresh
+
+
+def quote_is_current(quote):
+    """True while the vendor is active and their menu is unchanged since the quote."""
+    current = db.session.query(User.menu_version, User.is_active).filter(
+        User.id == quote["vendor_id"]
+    ).first()
+    return current is not None and current.is_active and current.menu_version == quote["menu_version"]
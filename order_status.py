@@ -0,0 +1,41 @@
+"""
+Order status changes. Every change but the payment worker's
+pending -> paid goes through set_order_status(), which keeps the
+revenue rollups and vendor stats in step: an order moving into
+PAID_STATUSES is added to them and one moving out is taken back out.
+
+Only the payment path pays an order, so no status change may move an
+order without a successful payment into PAID_STATUSES, or an order back
+to "pending", where a late webhook would pay it again.
+"""
+from analytics import PAID_STATUSES, record_order_status
+from vendor_stats import record_status_change
+
+ORDER_STATUSES = ("pending", "paid", "accepted", "ready", "delivered", "cancelled")
+
+
+def status_change_error(order, status):
+    """Why `order` cannot be moved to `status`, or None if it can."""
+    if status not in ORDER_STATUSES:
+        return f"Unknown order status: {status}"
+    if status == order.status:
+        return None
+    if status == "pending":
+        return "An order cannot be moved back to pending"
+    if status in PAID_STATUSES and order.status not in PAID_STATUSES:
+        payment = order.payment
+        if payment is None or payment.payment_status != "successful":
+            return f"Order #{order.id} has no successful payment; only Paystack can mark it paid"
+    return None
+
+
+def set_order_status(order, status):
+    """Changes an order's status in the caller's transaction; ValueError if status_change_error() objects."""
+    error = status_change_error(order, status)
+    if error:
+        raise ValueError(error)
+
+    old_status = order.status
+    order.status = status
+    record_order_status(order, old_status)
+    record_status_change(order, old_status)
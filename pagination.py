@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination for the list pages. A page is the first rows
+ordered by its sort keys, newest first, that sort strictly after the
+last row of the previous page. The cursor carries that row's keys, so
+rows added meanwhile never shift later pages and deep pages cost the
+same as the first.
+"""
+import base64
+import json
+
+import sqlalchemy as sa
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """The key values in `cursor`, or ValueError if it is not one of ours."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if (not isinstance(values, list) or len(values) != length
+            or not all(isinstance(v, (int, str)) for v in values)):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_page(query, keys, cursor=None, size=DEFAULT_PAGE_SIZE):
+    """
+    Page of up to `size` rows of `query`, ordered by the `keys` columns
+    descending, after `cursor`. The last key must be unique (the primary
+    key). Rows come back as `query` would return them.
+    """
+    # Dates are compared as stored: SQLite keeps them as text, sometimes
+    # with and sometimes without microseconds, and a re-bound datetime
+    # would not compare equal to its own row.
+    stored = [sa.type_coerce(key, sa.String) if isinstance(key.type, sa.DateTime) else key
+              for key in keys]
+
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        query = query.filter(sa.tuple_(*stored) < sa.tuple_(*map(sa.literal, values)))
+
+    rows = query.add_columns(*stored).order_by(
+        *(key.desc() for key in keys)
+    ).limit(size + 1).all()
+
+    n = len(keys)
+    next_cursor = encode_cursor(list(rows[size - 1][-n:])) if len(rows) > size else None
+    items = [row[0] if len(row) == n + 1 else tuple(row[:-n]) for row in rows[:size]]
+    return Page(items, next_cursor)
@@ -0,0 +1,206 @@
+"""
+Paystack payment events, finalized off the request path.
+
+/payment/webhook checks the signature, stores the event (once per event
+and reference: Paystack retries deliveries) and answers at once. A
+PaymentWorker thread then hands each stored event to the app's
+`handle(event)`, which finalizes the order in the same transaction that
+marks the event done. Order finalization is itself conditional on the
+order still being pending, so an event handled twice, or a webhook and
+a verify lookup for the same charge, pay an order exactly once.
+
+An event whose handler raises is retried on the next sweep, up to
+MAX_ATTEMPTS; UnprocessableEvent fails it at once. Events left
+"processing" by a crashed worker are picked up again after STALE_AFTER.
+The worker sweeps as soon as it starts and every SWEEP_INTERVAL after,
+so events stored before a restart are not left waiting for the next
+webhook.
+
+When webhooks cannot reach the app (local development, an outage) the
+worker can also look a reference up itself: request_verify(reference)
+queues a call to the app's `verify(reference)`, which records what
+Paystack reports as an event of its own. A reference is looked up at
+most once every VERIFY_INTERVAL, however often it is requested.
+"""
+import hashlib
+import hmac
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, PaymentEvent
+
+SIGNATURE_HEADER = "X-Paystack-Signature"
+
+MAX_ATTEMPTS = 5
+STALE_AFTER = timedelta(minutes=5)
+SWEEP_INTERVAL = 5
+SWEEP_BATCH = 100
+VERIFY_INTERVAL = 10  # seconds
+
+
+class UnprocessableEvent(Exception):
+    """The event can never be applied (unknown order, wrong amount, ...)."""
+
+
+def sign(body, secret):
+    """Paystack's signature of a webhook body: hex HMAC-SHA512 with the secret key."""
+    return hmac.new((secret or "").encode(), body, hashlib.sha512).hexdigest()
+
+
+def valid_signature(body, signature, secret):
+    return bool(secret and signature) and hmac.compare_digest(sign(body, secret), signature)
+
+
+def record_event(event, reference, payload, source="webhook"):
+    """
+    Stores an event in the caller's transaction and returns its id, or
+    None if this event for this reference is already stored.
+    """
+    stmt = insert(PaymentEvent).values(
+        event=event, reference=reference, payload=payload, source=source,
+        status="pending", attempts=0, received_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=["event", "reference"])
+    result = db.session.execute(stmt)
+    return result.inserted_primary_key[0] if result.rowcount else None
+
+
+def event_data(event):
+    """The `data` object of a stored event's payload."""
+    return json.loads(event.payload).get("data") or {}
+
+
+class PaymentWorker:
+    """
+    One background thread applying stored events with `handle(event)`,
+    which returns the event's final status ("processed", "ignored", ...)
+    without committing, and running `verify(reference)` lookups.
+    `after(event)` runs once a processed event is committed (e.g. to
+    notify the vendor).
+    """
+
+    def __init__(self, app, handle, verify=None, after=None, interval=SWEEP_INTERVAL):
+        self.app = app
+        self.handle = handle
+        self.verify = verify
+        self.after = after
+        self.interval = interval
+
+        self._queue = queue.Queue()
+        self._verifying = set()
+        self._verified_at = {}  # reference -> when it was last looked up
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, event_id):
+        self.start()
+        self._queue.put(("event", event_id))
+
+    def request_verify(self, reference):
+        """
+        Queues one lookup of `reference`; repeat requests while it is
+        queued, or within VERIFY_INTERVAL of the last lookup, are dropped.
+        """
+        if self.verify is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if reference in self._verifying or now - self._verified_at.get(reference, -VERIFY_INTERVAL) < VERIFY_INTERVAL:
+                return
+            self._verifying.add(reference)
+            self._verified_at = {ref: at for ref, at in self._verified_at.items() if now - at < VERIFY_INTERVAL}
+        self.start()
+        self._queue.put(("verify", reference))
+
+    def process(self, event_id):
+        """Claims and applies one event; returns its status, or None if someone else has it."""
+        claimed = db.session.execute(
+            update(PaymentEvent)
+            .where(PaymentEvent.id == event_id, _claimable())
+            .values(status="processing", attempts=PaymentEvent.attempts + 1,
+                    claimed_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return None
+
+        event = db.session.get(PaymentEvent, event_id)
+        try:
+            status, error = self.handle(event), None
+        except UnprocessableEvent as e:
+            db.session.rollback()
+            status, error = "failed", str(e)
+        except Exception as e:
+            db.session.rollback()
+            event = db.session.get(PaymentEvent, event_id)
+            status = "failed" if event.attempts >= MAX_ATTEMPTS else "pending"
+            error = f"{type(e).__name__}: {e}"
+            print(f"Payment event {event_id} ({event.reference}) attempt {event.attempts} failed: {error}")
+
+        event.status = status
+        event.error = error
+        event.processed_at = datetime.utcnow() if status != "pending" else None
+        db.session.commit()
+
+        if status == "processed" and self.after:
+            self.after(event)
+        return status
+
+    def sweep(self):
+        """Processes pending events and stale claims; returns how many were handled."""
+        ids = [id for (id,) in db.session.query(PaymentEvent.id).filter(_claimable())
+               .order_by(PaymentEvent.id).limit(SWEEP_BATCH)]
+        db.session.commit()
+        return sum(self.process(id) is not None for id in ids)
+
+    def start(self):
+        """Starts the worker thread if it is not running; it sweeps straight away."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="payment-worker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        kind, value = "sweep", None
+        while True:
+            try:
+                with self.app.app_context():
+                    if kind == "event":
+                        self.process(value)
+                    elif kind == "verify":
+                        self._verify(value)
+                    else:
+                        self.sweep()
+            except Exception as e:
+                print(f"Payment worker: {kind} {value or ''} failed: {e}")
+
+            try:
+                kind, value = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                kind, value = "sweep", None
+
+    def _verify(self, reference):
+        try:
+            event_id = self.verify(reference)
+            db.session.commit()
+        finally:
+            with self._lock:
+                self._verifying.discard(reference)
+                self._verified_at[reference] = time.monotonic()
+        if event_id:
+            self.process(event_id)
+
+
+def _claimable():
+    return or_(
+        PaymentEvent.status == "pending",
+        (PaymentEvent.status == "processing") & (PaymentEvent.claimed_at < datetime.utcnow() - STALE_AFTER)
+    )
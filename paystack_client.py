@@ -0,0 +1,231 @@
+"""
+Paystack API client: one pooled keep-alive session, a (connect, read)
+timeout per endpoint, bounded retries with exponential backoff for
+idempotent calls only, a circuit breaker that fails fast while Paystack
+is down, and a latency histogram per endpoint.
+
+The base URL is configurable, so the whole client can be pointed at a
+local stand-in server (benchmarks/paystack_stub.py).
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "https://api.paystack.co"
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS = {
+    "bank.list": (3.05, 10),
+    "bank.resolve": (3.05, 8),
+    "subaccount.create": (3.05, 15),
+    "subaccount.update": (3.05, 15),
+    "transaction.initialize": (3.05, 10),
+    "transaction.verify": (3.05, 10),
+}
+
+IDEMPOTENT_METHODS = {"GET", "PUT"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# upper bounds in milliseconds; the last bucket catches the rest
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class PaystackError(Exception):
+    """Paystack could not be reached or kept failing."""
+
+
+class CircuitOpenError(PaystackError):
+    """Calls are being refused until Paystack has had time to recover."""
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, ms, error=False):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if ms <= bound:
+                    self.counts[i] += 1
+                    break
+            self.count += 1
+            self.total_ms += ms
+            self.errors += bool(error)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile call (None if none yet)."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank, seen = p / 100 * self.count, 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return self.buckets[-1]
+
+    def snapshot(self):
+        with self._lock:
+            counts, count, total_ms, errors = list(self.counts), self.count, self.total_ms, self.errors
+        return {
+            "count": count,
+            "errors": errors,
+            "mean_ms": round(total_ms / count, 2) if count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {("inf" if bound == float("inf") else str(bound)): n
+                        for bound, n in zip(self.buckets, counts)},
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and refuses calls for
+    `reset_after` seconds, then lets one trial call through: success
+    closes it again, failure re-opens it.
+    """
+
+    def __init__(self, threshold=5, reset_after=30):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def succeeded(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class PaystackClient:
+    def __init__(self, secret_key, base_url=DEFAULT_BASE_URL, retries=2, backoff=0.25,
+                 pool_size=10, timeouts=None, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.timeouts = {**ENDPOINT_TIMEOUTS, **(timeouts or {})}
+        self.breaker = breaker or CircuitBreaker()
+        self.histograms = {}
+        self._histograms_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {secret_key}",
+            "Content-Type": "application/json",
+        })
+
+    def _histogram(self, endpoint):
+        with self._histograms_lock:
+            return self.histograms.setdefault(endpoint, LatencyHistogram())
+
+    def request(self, method, path, endpoint, params=None, json=None):
+        """
+        Paystack's JSON response to `method` `path`. Transport errors,
+        timeouts, 429s and 5xx responses are retried up to `retries`
+        times for GET and PUT; anything else, or running out of retries,
+        raises PaystackError. 4xx responses are returned as they are:
+        Paystack explains them in the body.
+        """
+        attempts = 1 + (self.retries if method in IDEMPOTENT_METHODS else 0)
+        timeout = self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+        histogram = self._histogram(endpoint)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Paystack calls paused after repeated failures ({endpoint})")
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, self.base_url + path, params=params, json=json, timeout=timeout
+                )
+                failure = response.status_code in RETRY_STATUSES and f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                response, failure = None, f"{type(e).__name__}: {e}"
+            histogram.record((time.perf_counter() - started) * 1000, error=bool(failure))
+
+            if not failure:
+                self.breaker.succeeded()
+                try:
+                    return response.json()
+                except ValueError:
+                    raise PaystackError(f"{endpoint}: invalid JSON (HTTP {response.status_code})")
+
+            self.breaker.failed()
+            if attempt + 1 < attempts:
+                # full jitter: 0 to backoff * 2^attempt seconds
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+        raise PaystackError(f"{endpoint} failed after {attempts} attempt(s): {failure}")
+
+    def stats(self):
+        with self._histograms_lock:
+            histograms = dict(self.histograms)
+        return {
+            "circuit": self.breaker.state,
+            "endpoints": {endpoint: h.snapshot() for endpoint, h in sorted(histograms.items())},
+        }
+
+    # =========================
+    # ENDPOINTS
+    # =========================
+
+    def list_banks(self, country="nigeria"):
+        return self.request("GET", "/bank", "bank.list", params={"country": country})
+
+    def resolve_account(self, account_number, bank_code):
+        return self.request("GET", "/bank/resolve", "bank.resolve",
+                            params={"account_number": account_number, "bank_code": bank_code})
+
+    def create_subaccount(self, payload):
+        return self.request("POST", "/subaccount", "subaccount.create", json=payload)
+
+    def update_subaccount(self, subaccount_code, payload):
+        return self.request("PUT", f"/subaccount/{subaccount_code}", "subaccount.update", json=payload)
+
+    def initialize_transaction(self, payload):
+        return self.request("POST", "/transaction/initialize", "transaction.initialize", json=payload)
+
+    def verify_transaction(self, reference):
+        return self.request("GET", f"/transaction/verify/{reference}", "transaction.verify")
@@ -0,0 +1,57 @@
+"""
+Query budgets. While the app is in testing mode (or QUERY_BUDGET is
+set) every request counts the SQL statements it sends, and a request
+that sends more than its view's budget fails with QueryBudgetExceeded,
+so a lazy load creeping back into a listing page shows up as an error
+instead of as a slow page at scale.
+"""
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_QUERY_BUDGET = 25
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit):
+    """Caps a view at `limit` statements per request. Put it right under @app.route."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _count_query(*args):
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+
+
+def _reset_count():
+    # tests often wrap requests in one app context, so g outlives a request
+    g.query_count = 0
+
+
+def _check_budget(response):
+    if not (current_app.testing or current_app.config.get("QUERY_BUDGET")):
+        return response
+
+    view = current_app.view_functions.get(request.endpoint)
+    limit = (getattr(view, "query_budget", None)
+             or current_app.config.get("QUERY_BUDGET")
+             or DEFAULT_QUERY_BUDGET)
+    count = g.get("query_count", 0)
+    if count > limit:
+        raise QueryBudgetExceeded(
+            f"{request.method} {request.path} sent {count} queries, budget is {limit}"
+        )
+    return response
+
+
+def init_query_budget(app):
+    if not event.contains(Engine, "before_cursor_execute", _count_query):
+        event.listen(Engine, "before_cursor_execute", _count_query)
+    app.before_request(_reset_count)
+    app.after_request(_check_budget)
@@ -0,0 +1,218 @@
+"""
+Order receipts (PDF), rendered off the payment path.
+
+After a payment commits, ReceiptRenderer.prerender() queues the receipt
+on a small process pool (reportlab layout is CPU bound, so threads would
+only slow the app down). The download endpoint serves the file from
+disk, rendering it then and there if the pool has not (yet): a
+receipt failure never touches the payment.
+
+Rendering works from receipt_data(), a plain snapshot of the order, so
+it can cross into a worker process. Each process keeps the stylesheet
+and vendor logos, downscaled to the size they are drawn at, between
+renders.
+"""
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+
+RECEIPT_WORKERS = 2
+LOGO_SIZE = 80  # points
+LOGO_CACHE_SIZE = 128
+
+_styles = None
+_table_style = None
+_logos = OrderedDict()  # (path, mtime) -> PNG bytes
+_logos_lock = threading.Lock()
+
+
+def receipt_filename(order_id):
+    return f"receipt_{order_id}.pdf"
+
+
+def receipt_data(order, logo_dir):
+    """
+    Everything a receipt shows, as plain values. Prices come from the
+    order items, as charged, not the current menu, and items or a vendor
+    deleted since still print.
+    """
+    vendor = order.vendor
+    payment = order.payment
+    return {
+        "order_id": order.id,
+        "date": (payment.created_at if payment and payment.created_at else datetime.now()).strftime("%Y-%m-%d %H:%M"),
+        "vendor_name": vendor.business_name if vendor else "(removed vendor)",
+        "logo_path": os.path.join(logo_dir, vendor.logo) if vendor and vendor.logo else None,
+        "transaction_ref": order.transaction_ref or "N/A",
+        "items": [
+            (item.food.name if item.food else "(removed item)", item.quantity,
+             item.subtotal / item.quantity if item.quantity else item.subtotal, item.subtotal)
+            for item in order.items
+        ],
+        "transportation_fee": order.transportation_fee or 0,
+        "total": order.total_amount,
+    }
+
+
+def _stylesheet():
+    global _styles, _table_style
+    if _styles is None:
+        _styles = getSampleStyleSheet()
+        _table_style = TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.darkgreen),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ])
+    return _styles, _table_style
+
+
+def _logo(path):
+    """The logo at `path` as a small PNG, decoded and downscaled once per file version (None if unreadable)."""
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+
+    with _logos_lock:
+        if key in _logos:
+            _logos.move_to_end(key)
+            return _logos[key]
+
+    from PIL import Image as PILImage
+    try:
+        with PILImage.open(path) as img:
+            img = img.convert("RGBA")
+            img.thumbnail((LOGO_SIZE * 2, LOGO_SIZE * 2))  # 2x for print sharpness
+            buf = io.BytesIO()
+            img.save(buf, "PNG")
+    except (OSError, ValueError):
+        return None
+
+    with _logos_lock:
+        _logos[key] = buf.getvalue()
+        while len(_logos) > LOGO_CACHE_SIZE:
+            _logos.popitem(last=False)
+    return _logos[key]
+
+
+def clear_caches():
+    global _styles, _table_style
+    _styles = _table_style = None
+    with _logos_lock:
+        _logos.clear()
+
+
+def render_receipt(data, path):
+    """Writes the receipt PDF for a receipt_data() snapshot to `path` (atomically) and returns `path`."""
+    styles, table_style = _stylesheet()
+    elements = []
+
+    # title
+    elements.append(Paragraph("SEAMLESS Receipt", styles["Title"]))
+    elements.append(Paragraph("Food Order Receipt", styles["Normal"]))
+    elements.append(Spacer(1, 10))
+
+    # vendor info
+    elements.append(Paragraph(f"Vendor: {data['vendor_name']}", styles["Normal"]))
+    logo = _logo(data["logo_path"]) if data["logo_path"] else None
+    if logo:
+        elements.append(Image(io.BytesIO(logo), width=LOGO_SIZE, height=LOGO_SIZE))
+    elements.append(Spacer(1, 10))
+
+    # order info
+    elements.append(Paragraph(f"Order ID: {data['order_id']}", styles["Normal"]))
+    elements.append(Paragraph(f"Date: {data['date']}", styles["Normal"]))
+    elements.append(Paragraph(f"Vendor: {data['vendor_name']}", styles["Normal"]))
+    elements.append(Paragraph(f"Transaction Ref: {data['transaction_ref']}", styles["Normal"]))
+    elements.append(Spacer(1, 10))
+
+    rows = [["Item", "Qty", "Price (₦)", "Subtotal (₦)"]]
+    subtotal = 0
+    for name, quantity, price, item_subtotal in data["items"]:
+        rows.append([name, str(quantity), f"{price:.2f}", f"{item_subtotal:.2f}"])
+        subtotal += item_subtotal
+    rows.append(["", "", "Subtotal", f"{subtotal:.2f}"])
+    rows.append(["", "", "Transport", f"{data['transportation_fee']:.2f}"])
+    rows.append(["", "", "Total", f"{data['total']:.2f}"])
+
+    table = Table(rows, hAlign="LEFT")
+    table.setStyle(table_style)
+    elements.append(table)
+    elements.append(Spacer(1, 20))
+
+    # footer
+    elements.append(Paragraph("Thank you for ordering with CampusEats!", styles["Italic"]))
+    elements.append(Paragraph("Contact: support@campuseats.com", styles["Normal"]))
+
+    # rendered to a temporary file first, so a download never sees half a PDF
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".pdf.tmp")
+    os.close(fd)
+    try:
+        SimpleDocTemplate(tmp).build(elements)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+class ReceiptRenderer:
+    """
+    Receipts under `directory`: prerender() in a pool of `workers`
+    processes (0 renders only on download), render() in the caller.
+    """
+
+    def __init__(self, directory, logo_dir, workers=RECEIPT_WORKERS):
+        self.directory = directory
+        self.logo_dir = logo_dir
+        self.workers = workers
+
+        self._pool = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def path(self, order_id):
+        return os.path.join(self.directory, receipt_filename(order_id))
+
+    def render(self, order):
+        """The receipt's path, rendering it now if it is not on disk."""
+        path = self.path(order.id)
+        if not os.path.exists(path):
+            render_receipt(receipt_data(order, self.logo_dir), path)
+        return path
+
+    def prerender(self, order):
+        """Queues the receipt on the pool; returns the future, or None if not queued."""
+        if not self.workers:
+            return None
+        with self._lock:
+            if order.id in self._pending:
+                return None
+            self._pending.add(order.id)
+            if self._pool is None:
+                # spawn: the app process runs threads, which fork does not mix well with
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+        order_id = order.id
+        future = self._pool.submit(render_receipt, receipt_data(order, self.logo_dir), self.path(order_id))
+
+        def done(future):
+            with self._lock:
+                self._pending.discard(order_id)
+            if future.exception():
+                print(f"Receipt for order {order_id} not rendered: {future.exception()}")
+
+        future.add_done_callback(done)
+        return future
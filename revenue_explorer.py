@@ -0,0 +1,173 @@
+"""
+Revenue explorer: revenue series for an arbitrary date range and vendor
+filter, computed with NumPy over the paid orders in the range.
+
+Paid orders are read once, in chunks, as three columns (timestamp,
+amount, vendor id). Each chunk is folded into fixed-size accumulators
+(one slot per day, per weekday-hour and per vendor), so memory grows
+with the length of the range, not with the number of orders; only the
+order values kept for percentiles (4 bytes each) grow with the orders,
+which is why ranges are capped at MAX_RANGE_DAYS.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Integer, cast, func, select
+
+from models import db, User, Order
+from analytics import PAID_STATUSES
+
+MAX_RANGE_DAYS = 366
+ROLLING_WINDOWS = (7, 30)
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+CHUNK_SIZE = 50000
+
+DAY_SECONDS = 86400
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _epoch(day):
+    # order dates are naive; SQLite's strftime('%s') reads them as UTC,
+    # so day boundaries are computed the same way
+    return calendar.timegm(day.timetuple())
+
+
+def iter_paid_order_columns(start, end, vendor_ids=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields (timestamps, amounts, vendor_ids) NumPy arrays for paid orders
+    placed from `start` to `end` inclusive, at most `chunk_size` orders
+    at a time.
+    """
+    query = select(
+        cast(func.strftime("%s", Order.order_date), Integer),
+        Order.total_amount,
+        Order.vendor_id
+    ).where(
+        Order.status.in_(PAID_STATUSES),
+        Order.order_date >= datetime.combine(start, datetime.min.time()),
+        Order.order_date < datetime.combine(end + timedelta(days=1), datetime.min.time())
+    )
+    if vendor_ids:
+        query = query.where(Order.vendor_id.in_(vendor_ids))
+
+    # a Core result on the session's connection skips ORM row handling;
+    # zip(*rows) transposes a chunk into one plain tuple per column,
+    # which NumPy converts far faster than the Row objects themselves
+    result = db.session.connection().execution_options(yield_per=chunk_size).execute(query)
+    for rows in result.partitions():
+        timestamps, amounts, vendor_ids = zip(*rows)
+        yield (
+            np.array(timestamps, dtype=np.int64),
+            np.nan_to_num(np.array(amounts, dtype=np.float64)),
+            np.array(vendor_ids, dtype=np.int64),
+        )
+
+
+def _rolling_mean(values, window, offset):
+    """Trailing `window`-day means of `values`, from index `offset` on."""
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    means = (totals[window:] - totals[:-window]) / window
+    return means[offset - (window - 1):]
+
+
+def _rounded(array):
+    return np.round(array, 2).tolist()
+
+
+def explore_revenue(start, end, vendor_ids=None):
+    """
+    Daily revenue and order counts with rolling averages, order value
+    percentiles, a weekday x hour heatmap and per-vendor totals for paid
+    orders from `start` to `end` (dates, inclusive), optionally limited
+    to `vendor_ids`.
+    """
+    # rolling windows at the start of the range need the days before it
+    lookback = max(ROLLING_WINDOWS) - 1
+    load_start = start - timedelta(days=lookback)
+    n_days = (end - load_start).days + 1
+    base = _epoch(load_start)
+
+    daily_revenue = np.zeros(n_days)
+    daily_orders = np.zeros(n_days, dtype=np.int64)
+    heat_revenue = np.zeros(7 * 24)
+    heat_orders = np.zeros(7 * 24, dtype=np.int64)
+    vendor_revenue = np.zeros(0)
+    vendor_orders = np.zeros(0, dtype=np.int64)
+    order_values = []
+
+    for timestamps, amounts, vendors in iter_paid_order_columns(load_start, end, vendor_ids):
+        day = (timestamps - base) // DAY_SECONDS
+        daily_revenue += np.bincount(day, weights=amounts, minlength=n_days)
+        daily_orders += np.bincount(day, minlength=n_days)
+
+        in_range = day >= lookback
+        timestamps, amounts, vendors = timestamps[in_range], amounts[in_range], vendors[in_range]
+
+        # 1970-01-01 was a Thursday, so Monday-based weekday is (days + 3) % 7
+        slot = ((timestamps // DAY_SECONDS + 3) % 7) * 24 + (timestamps % DAY_SECONDS) // 3600
+        heat_revenue += np.bincount(slot, weights=amounts, minlength=7 * 24)
+        heat_orders += np.bincount(slot, minlength=7 * 24)
+
+        if len(vendors):
+            size = max(len(vendor_revenue), vendors.max() + 1)
+            vendor_revenue = np.pad(vendor_revenue, (0, size - len(vendor_revenue)))
+            vendor_orders = np.pad(vendor_orders, (0, size - len(vendor_orders)))
+            vendor_revenue += np.bincount(vendors, weights=amounts, minlength=size)
+            vendor_orders += np.bincount(vendors, minlength=size)
+
+        order_values.append(amounts.astype(np.float32))
+
+    values = np.concatenate(order_values) if order_values else np.zeros(0, dtype=np.float32)
+    quantiles = np.percentile(values, PERCENTILES) if len(values) else np.zeros(len(PERCENTILES))
+    total_orders = int(daily_orders[lookback:].sum())
+    total_revenue = float(daily_revenue[lookback:].sum())
+
+    vendor_ids_found = np.flatnonzero(vendor_orders)
+    names = dict(
+        db.session.query(User.id, User.business_name).filter(
+            User.id.in_(vendor_ids_found.tolist())
+        )
+    ) if len(vendor_ids_found) else {}
+    vendor_totals = sorted(
+        (
+            {
+                "vendor_id": int(vendor_id),
+                "business_name": names.get(int(vendor_id)),
+                "revenue": round(float(vendor_revenue[vendor_id]), 2),
+                "orders": int(vendor_orders[vendor_id]),
+            }
+            for vendor_id in vendor_ids_found
+        ),
+        key=lambda v: -v["revenue"]
+    )
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "vendor_ids": list(vendor_ids or []),
+        "summary": {
+            "total_orders": total_orders,
+            "total_revenue": round(total_revenue, 2),
+            "avg_order_value": round(total_revenue / total_orders, 2) if total_orders else 0,
+        },
+        "daily": {
+            "labels": [(start + timedelta(days=i)).isoformat() for i in range(n_days - lookback)],
+            "revenue": _rounded(daily_revenue[lookback:]),
+            "orders": daily_orders[lookback:].tolist(),
+            **{
+                f"rolling_{window}": _rounded(_rolling_mean(daily_revenue, window, lookback))
+                for window in ROLLING_WINDOWS
+            },
+        },
+        "order_value_percentiles": {
+            f"p{p}": round(float(q), 2) for p, q in zip(PERCENTILES, quantiles)
+        },
+        "heatmap": {
+            "days": WEEKDAY_NAMES,
+            "hours": list(range(24)),
+            "revenue": _rounded(heat_revenue.reshape(7, 24)),
+            "orders": heat_orders.reshape(7, 24).tolist(),
+        },
+        "vendors": vendor_totals,
+    }
@@ -0,0 +1,218 @@
+"""
+Full-text search over foods and users with SQLite FTS5.
+
+food_search holds every food's name and category name, user_search every
+user's name, business name, address and email, each keyed by the source
+row's id. Triggers on foods, food_categories and users keep them in step
+with every insert, update and delete, whether it comes from the ORM or a
+bulk statement. Both tables are created (and filled) along with the
+others by db.create_all(); `flask rebuild-search-index` adds them to an
+existing database. They are not part of db.metadata, so migrations must
+skip them (and FTS5's shadow tables) through include_in_migrations, or
+autogenerate would drop them and leave the triggers writing to nothing.
+
+Queries match every word as a prefix ("jol ric" finds "Jollof Rice") and
+rank by bm25, with names weighted above categories and addresses.
+"""
+import re
+
+import sqlalchemy as sa
+
+from models import db, User, Food, FoodCategory
+
+SEARCH_LIMIT = 50
+
+_fts = sa.MetaData()
+
+food_search = sa.Table(
+    "food_search", _fts,
+    sa.Column("rowid", sa.Integer, primary_key=True),
+    sa.Column("name", sa.Text),
+    sa.Column("category", sa.Text),
+    sa.Column("rank", sa.Float),
+)
+
+user_search = sa.Table(
+    "user_search", _fts,
+    sa.Column("rowid", sa.Integer, primary_key=True),
+    sa.Column("name", sa.Text),
+    sa.Column("business_name", sa.Text),
+    sa.Column("address", sa.Text),
+    sa.Column("email", sa.Text),
+    sa.Column("rank", sa.Float),
+)
+
+_TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+_CATEGORY_NAME = "(SELECT name FROM food_categories WHERE id = new.category_id)"
+
+SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS food_search USING fts5(name, category, {_TOKENIZE})",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5("
+    f"name, business_name, address, email, {_TOKENIZE})",
+    "INSERT INTO food_search(food_search, rank) VALUES ('rank', 'bm25(10.0, 2.0)')",
+    "INSERT INTO user_search(user_search, rank) VALUES ('rank', 'bm25(10.0, 10.0, 2.0, 5.0)')",
+
+    f"""CREATE TRIGGER IF NOT EXISTS foods_search_insert AFTER INSERT ON foods BEGIN
+        INSERT INTO food_search(rowid, name, category) VALUES (new.id, new.name, {_CATEGORY_NAME});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS foods_search_update
+    AFTER UPDATE OF name, category_id ON foods BEGIN
+        DELETE FROM food_search WHERE rowid = old.id;
+        INSERT INTO food_search(rowid, name, category) VALUES (new.id, new.name, {_CATEGORY_NAME});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS foods_search_delete AFTER DELETE ON foods BEGIN
+        DELETE FROM food_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS food_categories_search_update
+    AFTER UPDATE OF name ON food_categories BEGIN
+        DELETE FROM food_search WHERE rowid IN (SELECT id FROM foods WHERE category_id = new.id);
+        INSERT INTO food_search(rowid, name, category)
+            SELECT id, name, new.name FROM foods WHERE category_id = new.id;
+    END""",
+
+    """CREATE TRIGGER IF NOT EXISTS users_search_insert AFTER INSERT ON users BEGIN
+        INSERT INTO user_search(rowid, name, business_name, address, email)
+            VALUES (new.id, new.name, new.business_name, new.address, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_search_update
+    AFTER UPDATE OF name, business_name, address, email ON users BEGIN
+        DELETE FROM user_search WHERE rowid = old.id;
+        INSERT INTO user_search(rowid, name, business_name, address, email)
+            VALUES (new.id, new.name, new.business_name, new.address, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_search_delete AFTER DELETE ON users BEGIN
+        DELETE FROM user_search WHERE rowid = old.id;
+    END""",
+]
+
+REBUILD_SQL = [
+    "DELETE FROM food_search",
+    """INSERT INTO food_search(rowid, name, category)
+        SELECT foods.id, foods.name, food_categories.name
+        FROM foods LEFT JOIN food_categories ON food_categories.id = foods.category_id""",
+    "DELETE FROM user_search",
+    """INSERT INTO user_search(rowid, name, business_name, address, email)
+        SELECT id, name, business_name, address, email FROM users""",
+    "INSERT INTO food_search(food_search) VALUES ('optimize')",
+    "INSERT INTO user_search(user_search) VALUES ('optimize')",
+]
+
+
+def create_search_index(connection):
+    """Creates the search tables and triggers if missing and refills the tables."""
+    for statement in SEARCH_DDL + REBUILD_SQL:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index():
+    """(foods, users) indexed after creating or refilling the search tables."""
+    create_search_index(db.session.connection())
+    db.session.commit()
+    return (
+        db.session.query(sa.func.count()).select_from(food_search).scalar(),
+        db.session.query(sa.func.count()).select_from(user_search).scalar(),
+    )
+
+
+SEARCH_TABLES = ("food_search", "user_search")
+
+
+def include_in_migrations(object, name, type_, reflected, compare_to):
+    """Alembic include_object hook: leaves the search tables and their FTS5 shadow tables alone."""
+    if type_ == "table":
+        return not name.startswith(SEARCH_TABLES)
+    table = getattr(object, "table", None)
+    return table is None or not table.name.startswith(SEARCH_TABLES)
+
+
+@sa.event.listens_for(db.metadata, "after_create")
+def _create_with_tables(metadata, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_search_index(connection)
+
+
+@sa.event.listens_for(db.metadata, "after_drop")
+def _drop_with_tables(metadata, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS food_search")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS user_search")
+
+
+NEAR_ME = re.compile(r"\b(near me|nearby|around me|close by)\b", re.IGNORECASE)
+
+
+def split_near_me(text):
+    """("jollof", True) for "jollof near me": the search words, and whether to stay close."""
+    text, found = NEAR_ME.subn(" ", text)
+    return " ".join(text.split()), bool(found)
+
+
+def fts_query(text):
+    """
+    FTS5 query requiring every word of `text` as a prefix, or None if it
+    has no words. Punctuation only separates words, so emails and the
+    like need no escaping.
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def _matching(table, text):
+    query = fts_query(text)
+    if query is None:
+        return sa.select(table.c.rowid).where(sa.false())
+    return sa.select(table.c.rowid).where(sa.literal_column(table.name).op("MATCH")(query))
+
+
+def foods_matching(text):
+    """Filter for Food queries: the food's name or category matches `text`."""
+    return Food.id.in_(_matching(food_search, text))
+
+
+def users_matching(text):
+    """Filter for User queries: name, business name, address or email matches `text`."""
+    return User.id.in_(_matching(user_search, text))
+
+
+def search_catalogue(text, limit=SEARCH_LIMIT):
+    """
+    Available foods of active vendors and active vendors themselves
+    matching `text`, best match first, as (foods, vendors) lists of
+    dicts.
+    """
+    query = fts_query(text)
+    if query is None:
+        return [], []
+
+    foods = db.session.query(
+        Food.id, Food.name, Food.price, FoodCategory.name, User.id, User.business_name
+    ).join(
+        food_search, food_search.c.rowid == Food.id
+    ).join(Food.category).join(Food.vendor).filter(
+        sa.literal_column("food_search").op("MATCH")(query),
+        Food.availability == True,
+        User.is_active == True,
+    ).order_by(food_search.c.rank).limit(limit).all()
+
+    vendors = db.session.query(
+        User.id, User.business_name, User.address
+    ).join(
+        user_search, user_search.c.rowid == User.id
+    ).filter(
+        sa.literal_column("user_search").op("MATCH")(f"{{business_name address}} : ({query})"),
+        User.role == "vendor",
+        User.is_active == True,
+    ).order_by(user_search.c.rank).limit(limit).all()
+
+    return (
+        [
+            {"food_id": food_id, "name": name, "price": price, "category": category,
+             "vendor_id": vendor_id, "vendor_name": vendor_name}
+            for food_id, name, price, category, vendor_id, vendor_name in foods
+        ],
+        [
+            {"vendor_id": vendor_id, "business_name": business_name, "address": address}
+            for vendor_id, business_name, address in vendors
+        ],
+    )
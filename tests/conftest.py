@@ -0,0 +1,17 @@
+"""
+Test settings: a throwaway database, receipt folder and bank list, and
+a known Paystack secret, set before the app is imported.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="seamless-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "test.db")
+os.environ["RECEIPT_DIR"] = os.path.join(_tmp, "receipts")
+os.environ["RECEIPT_WORKERS"] = "0"
+os.environ["BANK_LIST_PATH"] = os.path.join(_tmp, "paystack_banks.json")
+os.environ["PAYSTACK_SECRET_KEY"] = "sk_test_seamless"
@@ -0,0 +1,111 @@
+"""
+The Paystack webhook path: signatures are checked, redeliveries are
+stored once, and however often an event is processed the order is paid,
+recorded and counted in the revenue rollups exactly once. Events are
+processed by calling PaymentWorker.process() directly; the worker
+thread is kept from starting.
+
+    python -m pytest tests
+"""
+import json
+
+import pytest
+from sqlalchemy import func
+
+from app import app, payments
+from models import db, User, Food, FoodCategory, Order, OrderItem, Payment, PaymentEvent, RevenueRollup
+from payment_events import sign, SIGNATURE_HEADER
+
+SECRET = "sk_test_seamless"
+
+
+@pytest.fixture
+def order_id(monkeypatch):
+    """A fresh database with one pending ₦1,500 order."""
+    app.config["TESTING"] = True
+    monkeypatch.setattr(payments, "start", lambda: None)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        vendor = User(role="vendor", name="Vendor", email="vendor@test", password="x",
+                      business_name="Test Kitchen", subaccount_code="ACCT_test")
+        student = User(role="student", name="Student", email="student@test", password="x")
+        category = FoodCategory(name="Main Dish")
+        db.session.add_all([vendor, student, category])
+        db.session.flush()
+        food = Food(name="Jollof Rice", price=1500, vendor_id=vendor.id, category_id=category.id)
+        db.session.add(food)
+        db.session.flush()
+        order = Order(customer_id=student.id, vendor_id=vendor.id, total_amount=1500, status="pending")
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderItem(order_id=order.id, food_id=food.id, quantity=1, subtotal=1500))
+        db.session.commit()
+        return order.id
+
+
+def charge(order_id, amount=150000):
+    return json.dumps({"event": "charge.success", "data": {
+        "reference": f"ORD_{order_id}_1", "status": "success", "amount": amount,
+        "metadata": {"order_id": str(order_id)},
+    }}).encode()
+
+
+def post_webhook(body, signature=None):
+    return app.test_client().post(
+        "/payment/webhook", data=body, content_type="application/json",
+        headers={SIGNATURE_HEADER: signature if signature is not None else sign(body, SECRET)}
+    )
+
+
+def stored_event_id():
+    with app.app_context():
+        return db.session.query(PaymentEvent.id).scalar()
+
+
+def test_bad_signature_is_rejected(order_id):
+    body = charge(order_id)
+    assert post_webhook(body, signature=sign(body, "sk_test_wrong")).status_code == 401
+    assert post_webhook(body, signature="").status_code == 401
+    with app.app_context():
+        assert PaymentEvent.query.count() == 0
+
+
+def test_redelivered_charge_is_stored_once(order_id):
+    body = charge(order_id)
+    assert post_webhook(body).status_code == 200
+    assert post_webhook(body).status_code == 200
+    with app.app_context():
+        assert PaymentEvent.query.count() == 1
+
+
+def test_charge_processed_twice_pays_once(order_id):
+    assert post_webhook(charge(order_id)).status_code == 200
+    event_id = stored_event_id()
+
+    with app.app_context():
+        assert payments.process(event_id) == "processed"
+        # already processed: not claimable again
+        assert payments.process(event_id) is None
+
+        # even handled again (a claim lost to a crash, say) the order is only paid once
+        db.session.get(PaymentEvent, event_id).status = "pending"
+        db.session.commit()
+        assert payments.process(event_id) == "ignored"
+
+        assert db.session.get(Order, order_id).status == "paid"
+        assert Payment.query.filter_by(order_id=order_id).count() == 1
+        assert db.session.query(func.sum(RevenueRollup.order_count)).filter(
+            RevenueRollup.granularity == "year").scalar() == 1
+
+
+def test_short_amount_fails(order_id):
+    assert post_webhook(charge(order_id, amount=100000)).status_code == 200
+    event_id = stored_event_id()
+
+    with app.app_context():
+        assert payments.process(event_id) == "failed"
+        event = db.session.get(PaymentEvent, event_id)
+        assert event.status == "failed" and event.error
+        assert db.session.get(Order, order_id).status == "pending"
+        assert Payment.query.count() == 0
@@ -0,0 +1,85 @@
+"""
+Query budgets of the order listing pages. Seeds more than a page of
+orders, with items, payments and ratings, and requests each page in
+testing mode, where a lazy load creeping back in raises
+QueryBudgetExceeded instead of passing unnoticed.
+
+    python -m pytest tests
+"""
+import pytest
+
+from app import app
+from models import db, User, Food, FoodCategory, Order, OrderItem, Payment, Rating
+from pagination import DEFAULT_PAGE_SIZE
+from query_budget import QueryBudgetExceeded
+
+# more than a page for the student too, who places every other order; the
+# rest come from many customers, so a lazy load costs a query per row
+ORDERS = 2 * DEFAULT_PAGE_SIZE + 10
+CUSTOMERS = 20
+STATUSES = ["pending", "paid", "accepted", "ready", "delivered"]
+
+
+@pytest.fixture(scope="module")
+def users():
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        admin = User(role="admin", name="Admin", email="admin@test", password="x")
+        vendor = User(role="vendor", name="Vendor", email="vendor@test", password="x",
+                      business_name="Test Kitchen", address="Campus")
+        student = User(role="student", name="Student", email="student@test", password="x")
+        customers = [User(role="student", name=f"Customer {i}", email=f"customer{i}@test", password="x")
+                     for i in range(CUSTOMERS)]
+        category = FoodCategory(name="Main Dish")
+        db.session.add_all([admin, vendor, student, category, *customers])
+        db.session.flush()
+
+        foods = [Food(name=f"Food {i}", price=500 + i, vendor_id=vendor.id, category_id=category.id)
+                 for i in range(10)]
+        db.session.add_all(foods)
+        db.session.flush()
+
+        for i in range(ORDERS):
+            status = STATUSES[i % len(STATUSES)]
+            customer = student if i % 2 == 0 else customers[i % CUSTOMERS]
+            order = Order(customer_id=customer.id, vendor_id=vendor.id, status=status,
+                          total_amount=1000, transportation_fee=100)
+            db.session.add(order)
+            db.session.flush()
+            db.session.add_all(OrderItem(order_id=order.id, food_id=food.id, quantity=1, subtotal=food.price)
+                               for food in foods[i % 8:i % 8 + 3])
+            if status != "pending":
+                db.session.add(Payment(order_id=order.id, payment_method="paystack",
+                                       payment_status="successful", vendor_amount=950, platform_amount=50))
+            if status == "delivered":
+                db.session.add(Rating(user_id=customer.id, vendor_id=vendor.id, order_id=order.id, rating=4))
+        db.session.commit()
+        ids = {"admin": admin.id, "vendor": vendor.id, "student": student.id}
+
+    # outside the app context: requests sharing one would share g, and with it the logged in user
+    return ids
+
+
+def get_as(user_id, path):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client.get(path)
+
+
+@pytest.mark.parametrize("role, endpoint", [
+    ("admin", "/admin/admin_orders"),
+    ("admin", "/admin/admin_vendor/{vendor}"),
+    ("vendor", "/vendor/vendor_orders"),
+    ("vendor", "/vendor/dashboard"),
+    ("student", "/student/orders"),
+])
+def test_order_pages_stay_within_budget(users, role, endpoint):
+    try:
+        response = get_as(users[role], endpoint.format(**users))
+    except QueryBudgetExceeded as exc:
+        pytest.fail(str(exc))
+    assert response.status_code == 200
@@ -0,0 +1,375 @@
+from datetime import datetime, timedelta
+from itertools import combinations
+
+from sqlalchemy import func
+
+from models import (
+    db, User, Order, OrderItem, Food, Payment, Rating,
+    VendorStats, VendorDailyStats, VendorFoodCount, VendorFoodPairCount
+)
+from analytics import PAID_STATUSES, MONTH_NAMES, upsert_counts
+
+# Order status -> VendorStats column counting paid orders in that status
+STATUS_COLUMNS = {
+    "paid": "waiting_count",
+    "accepted": "accepted_count",
+    "ready": "ready_count",
+    "delivered": "delivered_count",
+}
+
+# =========================
+# INCREMENTAL UPDATES
+# =========================
+
+def _zeroed(model, **key):
+    row = model(**key)
+    for column in model.__table__.columns:
+        if column.name not in key:
+            setattr(row, column.name, column.default.arg)
+    return row
+
+
+def _get_or_create(model, **key):
+    row = db.session.get(model, tuple(key.values()))
+    if row is None:
+        row = _zeroed(model, **key)
+        db.session.add(row)
+    return row
+
+
+def get_vendor_stats(vendor_id):
+    """The vendor's stats row, or an unsaved all-zero one if they have none yet."""
+    return db.session.get(VendorStats, vendor_id) or _zeroed(VendorStats, vendor_id=vendor_id)
+
+
+def _record_vendor_order(order, sign=1):
+    """Adds an order to its vendor's order totals; sign=-1 takes it back out."""
+    stats = _get_or_create(VendorStats, vendor_id=order.vendor_id)
+    stats.order_count += sign
+    stats.revenue += sign * (order.total_amount or 0)
+    stats.distance_km_sum += sign * (order.delivery_distance_km or 0)
+    stats.transport_fee_sum += sign * (order.transportation_fee or 0)
+
+    day = (order.order_date or datetime.now()).strftime("%Y-%m-%d")
+    daily = _get_or_create(VendorDailyStats, vendor_id=order.vendor_id, day=day)
+    daily.revenue += sign * (order.total_amount or 0)
+    daily.order_count += sign
+
+    # items whose food was deleted are not counted, as in rebuild_vendor_stats()
+    names = sorted({item.food.name for item in order.items if item.food})
+    upsert_counts(VendorFoodCount, [
+        {"vendor_id": order.vendor_id, "food_name": name, "count": sign}
+        for name in names
+    ])
+    upsert_counts(VendorFoodPairCount, [
+        {"vendor_id": order.vendor_id, "food_a": a, "food_b": b, "count": sign}
+        for a, b in combinations(names, 2)
+    ])
+    return stats
+
+
+def record_vendor_payment(order, payment):
+    """Adds a freshly paid order to its vendor's stats, in the caller's transaction."""
+    stats = _record_vendor_order(order)
+    stats.earned += payment.vendor_amount or 0
+    stats.payouts += 1
+    stats.waiting_count += 1
+
+
+def record_vendor_rating(rating, sign=1):
+    """Adds a new rating to its vendor's stats; sign=-1 takes a removed one back out."""
+    stats = _get_or_create(VendorStats, vendor_id=rating.vendor_id)
+    stats.rating_sum += sign * rating.rating
+    stats.rating_count += sign
+    stats.rating_avg = stats.rating_sum / stats.rating_count if stats.rating_count else 0
+
+    day = (rating.created_at or datetime.utcnow()).strftime("%Y-%m-%d")
+    daily = _get_or_create(VendorDailyStats, vendor_id=rating.vendor_id, day=day)
+    daily.rating_sum += sign * rating.rating
+    daily.rating_count += sign
+
+
+def record_status_change(order, old_status):
+    """
+    Moves a paid order between its vendor's per-status counts. A change
+    that takes an order out of PAID_STATUSES (a cancelled paid order)
+    takes it out of the vendor's order totals too, and one that takes it
+    in outside the payment worker adds it; earnings follow the payment,
+    not the order status, and stay as they are.
+    """
+    if old_status == order.status:
+        return
+
+    was_paid, is_paid = old_status in PAID_STATUSES, order.status in PAID_STATUSES
+    if was_paid != is_paid:
+        stats = _record_vendor_order(order, 1 if is_paid else -1)
+    else:
+        stats = db.session.get(VendorStats, order.vendor_id)
+        if stats is None:
+            return
+
+    if old_status in STATUS_COLUMNS:
+        column = STATUS_COLUMNS[old_status]
+        setattr(stats, column, getattr(stats, column) - 1)
+    if order.status in STATUS_COLUMNS:
+        column = STATUS_COLUMNS[order.status]
+        setattr(stats, column, getattr(stats, column) + 1)
+
+# =========================
+# REBUILD
+# =========================
+
+def rebuild_vendor_stats():
+    """Recomputes every vendor stats table from orders, payments and ratings."""
+    for model in (VendorStats, VendorDailyStats, VendorFoodCount, VendorFoodPairCount):
+        model.query.delete()
+
+    paid = Order.status.in_(PAID_STATUSES)
+    vendors, days = {}, {}
+
+    def stats_for(vendor_id):
+        if vendor_id not in vendors:
+            vendors[vendor_id] = _zeroed(VendorStats, vendor_id=vendor_id)
+        return vendors[vendor_id]
+
+    def daily_for(vendor_id, day):
+        if (vendor_id, day) not in days:
+            days[(vendor_id, day)] = _zeroed(VendorDailyStats, vendor_id=vendor_id, day=day)
+        return days[(vendor_id, day)]
+
+    for vendor_id, count, revenue, distance, fee in db.session.query(
+        Order.vendor_id,
+        func.count(Order.id),
+        func.sum(Order.total_amount),
+        func.sum(Order.delivery_distance_km),
+        func.sum(Order.transportation_fee)
+    ).filter(paid).group_by(Order.vendor_id):
+        stats = stats_for(vendor_id)
+        stats.order_count = count
+        stats.revenue = revenue or 0
+        stats.distance_km_sum = distance or 0
+        stats.transport_fee_sum = fee or 0
+
+    for vendor_id, earned, payouts in db.session.query(
+        Order.vendor_id,
+        func.sum(Payment.vendor_amount),
+        func.count(Payment.id)
+    ).join(Order).filter(
+        Payment.payment_status == "successful"
+    ).group_by(Order.vendor_id):
+        stats = stats_for(vendor_id)
+        stats.earned = earned or 0
+        stats.payouts = payouts
+
+    for vendor_id, status, count in db.session.query(
+        Order.vendor_id, Order.status, func.count(Order.id)
+    ).filter(paid).group_by(Order.vendor_id, Order.status):
+        setattr(stats_for(vendor_id), STATUS_COLUMNS[status], count)
+
+    for vendor_id, rating_sum, rating_count in db.session.query(
+        Rating.vendor_id, func.sum(Rating.rating), func.count(Rating.id)
+    ).group_by(Rating.vendor_id):
+        stats = stats_for(vendor_id)
+        stats.rating_sum = rating_sum
+        stats.rating_count = rating_count
+        stats.rating_avg = rating_sum / rating_count
+
+    for vendor_id, day, revenue, count in db.session.query(
+        Order.vendor_id,
+        func.strftime("%Y-%m-%d", Order.order_date).label("day"),
+        func.sum(Order.total_amount),
+        func.count(Order.id)
+    ).filter(paid).group_by(Order.vendor_id, "day"):
+        daily = daily_for(vendor_id, day)
+        daily.revenue = revenue or 0
+        daily.order_count = count
+
+    for vendor_id, day, rating_sum, rating_count in db.session.query(
+        Rating.vendor_id,
+        func.strftime("%Y-%m-%d", Rating.created_at).label("day"),
+        func.sum(Rating.rating),
+        func.count(Rating.id)
+    ).group_by(Rating.vendor_id, "day"):
+        daily = daily_for(vendor_id, day)
+        daily.rating_sum = rating_sum
+        daily.rating_count = rating_count
+
+    db.session.add_all(vendors.values())
+    db.session.add_all(days.values())
+
+    orders_foods = {}
+    for order_id, vendor_id, food_name in db.session.query(
+        Order.id, Order.vendor_id, Food.name
+    ).join(OrderItem, OrderItem.order_id == Order.id).join(
+        Food, OrderItem.food_id == Food.id
+    ).filter(paid):
+        orders_foods.setdefault((order_id, vendor_id), set()).add(food_name)
+
+    food_totals, pair_totals = {}, {}
+    for (_, vendor_id), names in orders_foods.items():
+        names = sorted(names)
+        for name in names:
+            food_totals[(vendor_id, name)] = food_totals.get((vendor_id, name), 0) + 1
+        for a, b in combinations(names, 2):
+            pair_totals[(vendor_id, a, b)] = pair_totals.get((vendor_id, a, b), 0) + 1
+
+    db.session.add_all(
+        VendorFoodCount(vendor_id=v, food_name=f, count=c)
+        for (v, f), c in food_totals.items()
+    )
+    db.session.add_all(
+        VendorFoodPairCount(vendor_id=v, food_a=a, food_b=b, count=c)
+        for (v, a, b), c in pair_totals.items()
+    )
+    db.session.commit()
+
+    return len(vendors)
+
+
+def recompute_vendor_ratings():
+    """
+    Resets every vendor's rating sum, count and average from the ratings
+    table, leaving the other stats alone. Returns how many vendors had
+    drifted.
+    """
+    actual = {
+        vendor_id: (rating_sum, rating_count)
+        for vendor_id, rating_sum, rating_count in db.session.query(
+            Rating.vendor_id, func.sum(Rating.rating), func.count(Rating.id)
+        ).group_by(Rating.vendor_id)
+    }
+
+    drifted = 0
+    for stats in VendorStats.query.all():
+        rating_sum, rating_count = actual.pop(stats.vendor_id, (0, 0))
+        if (stats.rating_sum, stats.rating_count) != (rating_sum, rating_count):
+            drifted += 1
+        stats.rating_sum = rating_sum
+        stats.rating_count = rating_count
+        stats.rating_avg = rating_sum / rating_count if rating_count else 0
+
+    for vendor_id, (rating_sum, rating_count) in actual.items():
+        stats = _zeroed(VendorStats, vendor_id=vendor_id)
+        stats.rating_sum = rating_sum
+        stats.rating_count = rating_count
+        stats.rating_avg = rating_sum / rating_count
+        db.session.add(stats)
+        drifted += 1
+
+    db.session.commit()
+    return drifted
+
+# =========================
+# VENDOR CARDS
+# =========================
+
+def vendor_card_query(query, with_counts=False):
+    """
+    Adds to a User query what vendor cards show: the rating average and
+    count from vendor_stats and, with_counts, order_count (all orders)
+    and food_count as correlated subqueries, all in the one SELECT.
+    """
+    columns = [VendorStats.rating_avg, VendorStats.rating_count]
+    if with_counts:
+        columns += [
+            db.session.query(func.count(Order.id)).filter(
+                Order.vendor_id == User.id
+            ).correlate(User).scalar_subquery(),
+            db.session.query(func.count(Food.id)).filter(
+                Food.vendor_id == User.id
+            ).correlate(User).scalar_subquery(),
+        ]
+    return query.outerjoin(VendorStats, VendorStats.vendor_id == User.id).add_columns(*columns)
+
+
+def vendor_cards(rows, with_counts=False):
+    """The vendors from vendor_card_query rows, with the card attributes set on each."""
+    vendors = []
+    for vendor, avg_rating, rating_count, *counts in rows:
+        vendor.avg_rating = avg_rating or 0
+        vendor.rating_count = rating_count or 0
+        if with_counts:
+            vendor.order_count, vendor.food_count = counts
+        vendors.append(vendor)
+    return vendors
+
+
+def load_vendor_cards(query, with_counts=False):
+    """Runs a User query for vendor cards as a single SELECT."""
+    return vendor_cards(vendor_card_query(query, with_counts), with_counts)
+
+# =========================
+# VENDOR ANALYTICS
+# =========================
+
+def get_vendor_analytics(vendor_id, days=30, weeks=12, top_n=8):
+    """
+    Everything on the vendor analytics page, read only from the vendor's
+    own stats rows: daily revenue for the last `days` days, the weekly
+    rating trend for the last `weeks` weeks, top items and how often
+    they are ordered together.
+    """
+    stats = get_vendor_stats(vendor_id)
+
+    today = datetime.now().date()
+    revenue_start = today - timedelta(days=days - 1)
+    rating_start = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks - 1)
+
+    daily_rows = {
+        row.day: row for row in VendorDailyStats.query.filter(
+            VendorDailyStats.vendor_id == vendor_id,
+            VendorDailyStats.day >= min(revenue_start, rating_start).strftime("%Y-%m-%d")
+        )
+    }
+
+    revenue_labels, revenue_values, order_values = [], [], []
+    for i in range(days):
+        d = revenue_start + timedelta(days=i)
+        row = daily_rows.get(d.strftime("%Y-%m-%d"))
+        revenue_labels.append(d.strftime("%d ") + MONTH_NAMES[d.month - 1])
+        revenue_values.append(row.revenue if row else 0)
+        order_values.append(row.order_count if row else 0)
+
+    week_sums = [[0, 0] for _ in range(weeks)]
+    for day, row in daily_rows.items():
+        index = (datetime.strptime(day, "%Y-%m-%d").date() - rating_start).days // 7
+        if 0 <= index < weeks:
+            week_sums[index][0] += row.rating_sum
+            week_sums[index][1] += row.rating_count
+
+    rating_labels = [
+        (rating_start + timedelta(weeks=i)).strftime("%b %d") for i in range(weeks)
+    ]
+    rating_values = [round(s / c, 2) if c else None for s, c in week_sums]
+
+    top_rows = VendorFoodCount.query.filter_by(vendor_id=vendor_id).order_by(
+        VendorFoodCount.count.desc(), VendorFoodCount.food_name
+    ).limit(top_n).all()
+    top_foods = [row.food_name for row in top_rows]
+
+    matrix = {f: {g: 0 for g in top_foods} for f in top_foods}
+    if top_foods:
+        for pair in VendorFoodPairCount.query.filter(
+            VendorFoodPairCount.vendor_id == vendor_id,
+            VendorFoodPairCount.food_a.in_(top_foods),
+            VendorFoodPairCount.food_b.in_(top_foods)
+        ):
+            matrix[pair.food_a][pair.food_b] = pair.count
+            matrix[pair.food_b][pair.food_a] = pair.count
+
+    return {
+        "stats": stats,
+        "avg_order_value": stats.revenue / stats.order_count if stats.order_count else 0,
+        "avg_distance_km": stats.distance_km_sum / stats.order_count if stats.order_count else 0,
+        "avg_transport_fee": stats.transport_fee_sum / stats.order_count if stats.order_count else 0,
+        "avg_rating": stats.rating_sum / stats.rating_count if stats.rating_count else 0,
+        "revenue_labels": revenue_labels,
+        "revenue_values": revenue_values,
+        "order_values": order_values,
+        "rating_labels": rating_labels,
+        "rating_values": rating_values,
+        "top_labels": top_foods,
+        "top_values": [row.count for row in top_rows],
+        "combo_labels": top_foods,
+        "combo_matrix": [[matrix[f1][f2] for f2 in top_foods] for f1 in top_foods],
+    }